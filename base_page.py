@@ -1,50 +1,436 @@
-
+import os
+import re
+import time
+from urllib.parse import urljoin, urlsplit
+from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from composite_actions import COMPOSITE_SCRIPT
+from locators import FIND_FIRST_SCRIPT, LOCATOR_STATS, MultiLocator
+from scheduler import deadline_of
+from timeline import timeline_of
+
+# Every wait performed through BasePage is recorded here as (name, seconds)
+WAIT_TIMINGS = []
+
+# Page loads performed by BasePage.open and the ones skipped because the browser was already there
+NAVIGATION_STATS = {"loads": 0, "skipped": 0}
+
+# Installs a MutationObserver that stamps the time of the last DOM change
+_DOM_OBSERVER_SCRIPT = """
+if (!window.__ebayLastMutation) {
+    window.__ebayLastMutation = performance.now();
+    new MutationObserver(function () {
+        window.__ebayLastMutation = performance.now();
+    }).observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+}
+return performance.now() - window.__ebayLastMutation;
+"""
+
+# Wraps XHR and fetch so the number of in-flight requests can be polled.
+# Injected into every new document by install_network_tracker, before the page's own scripts run.
+NETWORK_TRACKER_SCRIPT = """
+if (window.__ebayPendingRequests === undefined) {
+    window.__ebayPendingRequests = 0;
+    var done = function () { window.__ebayPendingRequests = Math.max(0, window.__ebayPendingRequests - 1); };
+    var send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        window.__ebayPendingRequests++;
+        this.addEventListener('loadend', done);
+        return send.apply(this, arguments);
+    };
+    if (window.fetch) {
+        var originalFetch = window.fetch;
+        window.fetch = function () {
+            window.__ebayPendingRequests++;
+            return originalFetch.apply(this, arguments).finally(done);
+        };
+    }
+}
+"""
+
+# Returns [readyState, pending requests]; installs the tracker first on a page loaded without it
+_NETWORK_IDLE_SCRIPT = NETWORK_TRACKER_SCRIPT + """
+return [document.readyState, window.__ebayPendingRequests];
+"""
+
+# Reads the number shown on the header cart badge (0 when the badge is absent)
+_CART_COUNT_SCRIPT = """
+var badge = document.querySelector('#gh-cart-n, .gh-cart__icon .badge, .gh-badge');
+if (badge && badge.textContent.trim()) {
+    return parseInt(badge.textContent.replace(/[^0-9]/g, ''), 10) || 0;
+}
+var link = document.querySelector("a[href*='cart.ebay.com']");
+var label = link ? (link.getAttribute('aria-label') || '') : '';
+var match = label.match(/(\\d+)\\s+item/);
+return match ? parseInt(match[1], 10) : 0;
+"""
+
+
+def format_wait_timings(timings=None):
+    """
+    Formats recorded wait timings as a human readable report.
+    """
+    timings = WAIT_TIMINGS if timings is None else timings
+    lines = [f"{name}: {elapsed:.2f}s" for name, elapsed in timings]
+    lines.append(f"Total waited: {sum(elapsed for _, elapsed in timings):.2f}s")
+    return "\n".join(lines)
+
+
+def format_navigation_stats(stats=None):
+    """
+    Formats the navigation counters as a human readable report.
+    """
+    stats = NAVIGATION_STATS if stats is None else stats
+    return f"Page loads: {stats['loads']}\nPage loads skipped: {stats['skipped']}"
+
+
+# Absolute or protocol-relative URLs on eBay's hosts
+_EBAY_URL_PATTERN = re.compile(r"(?:https?:)?//((?:[a-z0-9-]+\.)*(?:ebay|ebaystatic|ebayimg)\.com)", re.IGNORECASE)
+
+
+def rebase_urls(text, base_url):
+    """
+    Rewrites the eBay URLs in text to live under base_url: www.ebay.com maps to base_url
+    itself and every other eBay host to base_url/_host/<host>. Nothing changes when
+    base_url is the live site.
+    """
+    base = base_url.rstrip("/")
+    if urlsplit(base).netloc.lower() == "www.ebay.com":
+        return text
+
+    def replace(match):
+        host = match.group(1).lower()
+        return base if host == "www.ebay.com" else f"{base}/_host/{host}"
+
+    return _EBAY_URL_PATTERN.sub(replace, text)
+
+
+def set_base_url(base_url):
+    """
+    Points every page object created from now on at another site root, e.g. a local replay server.
+    """
+    BasePage.BASE_URL = base_url.rstrip("/") + "/"
+
+
+def install_network_tracker(driver):
+    """
+    Makes every document the driver's current tab loads from now on count its XHR/fetch
+    requests from the start, so wait_for_network_idle also sees requests sent before the
+    first poll (e.g. right after a click). Does nothing without DevTools.
+    """
+    if hasattr(driver, "execute_cdp_cmd"):
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": NETWORK_TRACKER_SCRIPT})
+
+
+def same_page(url_a, url_b):
+    """
+    True when both URLs point at the same host and path (query and fragment are ignored).
+    """
+    a, b = urlsplit(url_a or ""), urlsplit(url_b or "")
+    return a.netloc.lower() == b.netloc.lower() and a.path.rstrip("/") == b.path.rstrip("/")
+
 
 class BasePage:
     """
     Base class for all page objects.
     """
+    DEFAULT_TIMEOUT = 10
+    POLL_FREQUENCY = 0.1
+    # Site root, the BASE_URL environment variable points the page objects at another site
+    BASE_URL = os.environ.get("BASE_URL", "https://www.ebay.com").rstrip("/") + "/"
+    # Path of the page this object works on, relative to BASE_URL; subclasses may override is_loaded
+    PATH = None
+    URL = None
+
     def __init__(self, driver):
         self.driver = driver
-        self.wait = WebDriverWait(self.driver, 10)
+        if self.PATH is not None:
+            self.URL = urljoin(self.BASE_URL, self.PATH)
+
+    @property
+    def wait(self):
+        """
+        A WebDriverWait for DEFAULT_TIMEOUT, shortened to the driver's deadline.
+        """
+        return WebDriverWait(self.driver, self.wait_timeout())
+
+    def wait_timeout(self, timeout=None):
+        """
+        Returns timeout (default: DEFAULT_TIMEOUT) capped to what is left of the driver's deadline
+        (see scheduler.ItemScheduler), raising DeadlineExceeded when nothing is left.
+        """
+        timeout = self.DEFAULT_TIMEOUT if timeout is None else timeout
+        deadline = deadline_of(self.driver)
+        return timeout if deadline is None else min(timeout, deadline.check())
+
+    def site_url(self, url):
+        """
+        Maps a live eBay URL (e.g. on cart.ebay.com) onto the current BASE_URL.
+        """
+        return rebase_urls(url, self.BASE_URL)
+
+    @property
+    def timeline(self):
+        """
+        The Timeline instrumenting this page's driver (a no-op one if there is none).
+        """
+        return timeline_of(self.driver)
 
     def do_click(self, by_locator):
         """
         Performs a click on a web element.
         """
-        self.wait.until(EC.element_to_be_clickable(by_locator)).click()
+        with self.timeline.span("click", kind="click", locator=by_locator):
+            by_locator = self.resolve(by_locator)
+            self.wait.until(EC.element_to_be_clickable(by_locator)).click()
 
     def do_send_keys(self, by_locator, text):
         """
         Sends keys to a web element.
         """
-        element = self.wait.until(EC.visibility_of_element_located(by_locator))
-        element.clear()
-        element.send_keys(text)
+        with self.timeline.span("send_keys", kind="send_keys", locator=by_locator):
+            by_locator = self.resolve(by_locator)
+            element = self.wait.until(EC.visibility_of_element_located(by_locator))
+            element.clear()
+            element.send_keys(text)
 
     def get_element(self, by_locator):
         """
         Finds and returns a web element.
         """
-        return self.wait.until(EC.visibility_of_element_located(by_locator))
+        with self.timeline.span("find", kind="find", locator=by_locator):
+            by_locator = self.resolve(by_locator)
+            return self.wait.until(EC.visibility_of_element_located(by_locator))
 
     def get_elements(self, by_locator):
         """
         Finds and returns a list of web elements.
         """
-        return self.wait.until(EC.presence_of_all_elements_located(by_locator))
+        with self.timeline.span("find_all", kind="find", locator=by_locator):
+            by_locator = self.resolve(by_locator, visible=False)
+            return self.wait.until(EC.presence_of_all_elements_located(by_locator))
 
     def get_attribute(self, by_locator, attribute_name):
         """
         Gets an attribute of a web element.
         """
-        element = self.wait.until(EC.visibility_of_element_located(by_locator))
-        return element.get_attribute(attribute_name)
+        with self.timeline.span("get_attribute", kind="find", locator=by_locator, attribute=attribute_name):
+            by_locator = self.resolve(by_locator)
+            element = self.wait.until(EC.visibility_of_element_located(by_locator))
+            return element.get_attribute(attribute_name)
+
+    def execute_script(self, script, *args):
+        """
+        Executes JavaScript with the given arguments (elements, values), returns its result.
+        """
+        with self.timeline.span("script", kind="script"):
+            return self.driver.execute_script(script, *args)
+
+    def perform(self, action, timeout=None):
+        """
+        Runs a CompositeAction: one script call per batch of steps plus one WebDriver
+        command per native step, waiting until every element of a batch is usable.
+
+        Args:
+            action: The CompositeAction to run
+            timeout: Maximum seconds to wait for each batch's elements (default: DEFAULT_TIMEOUT)
+
+        Returns:
+            dict: Values stored by the action's read steps
+        """
+        results = {}
+        with self.timeline.span(action.name, kind="composite"):
+            for batch in action.batches():
+                steps = action.script_steps(batch)
+                outcome = self.wait_for(f"locate {action.name}",
+                                        lambda driver: driver.execute_script(COMPOSITE_SCRIPT, steps), timeout,
+                                        message=f"Not all elements of '{action.name}' were usable")
+                results.update(outcome["results"])
+                for step, script_step, winner in zip(batch, steps, outcome["winners"]):
+                    if isinstance(step["locator"], MultiLocator):
+                        LOCATOR_STATS.record_hit(step["locator"].name, tuple(script_step["candidates"][winner]))
+                last = batch[-1]
+                if last["native"]:
+                    if last["op"] == "fill":
+                        outcome["native"].send_keys(last["text"])
+                    else:
+                        outcome["native"].click()
+        return results
+
+    # --- Multi-candidate locators ---
+
+    def find_first(self, locator, visible=True, timeout=None):
+        """
+        Finds the first candidate of a MultiLocator (or a plain (By, value) tuple) that matches,
+        evaluating all candidates in one in-page query per poll, historical winners first.
+
+        Args:
+            locator: MultiLocator or (By, value) tuple
+            visible: Only accept visible elements (default: True)
+            timeout: Maximum seconds to wait (default: DEFAULT_TIMEOUT)
+
+        Returns:
+            tuple: (element, winning (By, value) candidate)
+        """
+        is_multi = isinstance(locator, MultiLocator)
+        candidates = locator.ordered_candidates() if is_multi else [locator]
+        name = locator.name if is_multi else locator[1]
+
+        def first_match(driver):
+            return driver.execute_script(FIND_FIRST_SCRIPT, [list(c) for c in candidates], visible)
+
+        index, element = self.wait_for(f"locate {name}", first_match, timeout,
+                                       message=f"No candidate of '{name}' matched")
+        winner = tuple(candidates[index])
+        if is_multi:
+            LOCATOR_STATS.record_hit(locator.name, winner)
+        return element, winner
+
+    def resolve(self, by_locator, visible=True):
+        """
+        Turns a MultiLocator into its currently matching (By, value) candidate.
+        Plain tuples are returned unchanged without touching the browser.
+        """
+        if not isinstance(by_locator, MultiLocator):
+            return by_locator
+        return self.find_first(by_locator, visible)[1]
+
+    # --- Navigation ---
+
+    def is_loaded(self):
+        """
+        Whether the browser is already on a page this object can work with.
+        By default that means being on URL.
+        """
+        return self.URL is not None and same_page(self.driver.current_url, self.URL)
+
+    def open(self, url=None, compare_query=False):
+        """
+        Navigates to url (default: URL) unless the browser is already there.
+
+        Args:
+            url: Page to load (default: URL)
+            compare_query: Also compare the query string, for pages told apart by it (e.g. result pages)
+
+        Returns:
+            bool: True if a page load happened, False if it was skipped
+        """
+        url = url or self.URL
+        current_url = self.driver.current_url
+        if same_page(current_url, url) and (not compare_query or urlsplit(current_url).query == urlsplit(url).query):
+            NAVIGATION_STATS["skipped"] += 1
+            return False
+        with self.timeline.span("navigate", kind="navigate", url=url):
+            self.driver.get(url)
+        NAVIGATION_STATS["loads"] += 1
+        return True
+
+    def ensure_loaded(self):
+        """
+        Loads URL only if the browser is not already on a page this object can work with.
+        """
+        if self.is_loaded():
+            NAVIGATION_STATS["skipped"] += 1
+            return False
+        return self.open()
+
+    def is_on_site(self):
+        """
+        True when the browser is on any page of the site under test (BASE_URL's domain).
+        """
+        host = urlsplit(self.driver.current_url).netloc.lower()
+        site = urlsplit(self.BASE_URL).netloc.lower()
+        site = site[4:] if site.startswith("www.") else site
+        return host == site or host.endswith("." + site)
+
+    def has_element_now(self, by_locator):
+        """
+        True if an element matching an ID or CSS locator is in the DOM right now.
+        A single script call, so a miss does not sit out the driver's implicit wait.
+        """
+        by, value = by_locator
+        selector = f"#{value}" if by == By.ID else value
+        return self.driver.execute_script("return !!document.querySelector(arguments[0]);", selector)
+
+    # --- Wait engine ---
+
+    def wait_for(self, name, condition, timeout=None, message=""):
+        """
+        Waits until a condition is met and records how long the wait took.
+
+        Args:
+            name: Label used when reporting the wait
+            condition: Callable taking the driver, as used by WebDriverWait
+            timeout: Maximum seconds to wait (default: DEFAULT_TIMEOUT)
+            message: Message for the TimeoutException raised on expiry
+
+        Returns:
+            The truthy value returned by the condition
+        """
+        timeout = self.wait_timeout(timeout)
+        start = time.monotonic()
+        try:
+            with self.timeline.span(name, kind="wait"):
+                return WebDriverWait(self.driver, timeout, poll_frequency=self.POLL_FREQUENCY).until(condition, message)
+        finally:
+            elapsed = time.monotonic() - start
+            WAIT_TIMINGS.append((name, elapsed))
+            print(f"Wait '{name}' took {elapsed:.2f}s")
+
+    def wait_for_url_change(self, old_url, timeout=None):
+        """
+        Waits until the browser navigates away from old_url.
+        """
+        return self.wait_for("url change", EC.url_changes(old_url), timeout,
+                             message=f"URL did not change from {old_url}")
+
+    def wait_for_staleness(self, element, timeout=None):
+        """
+        Waits until an element is detached from the DOM.
+        """
+        return self.wait_for("element staleness", EC.staleness_of(element), timeout,
+                             message="Element did not go stale")
+
+    def wait_for_dom_quiet(self, quiet_ms=300, timeout=None):
+        """
+        Waits until the DOM has not mutated for quiet_ms milliseconds.
+        """
+        def dom_is_quiet(driver):
+            return driver.execute_script(_DOM_OBSERVER_SCRIPT) >= quiet_ms
+
+        return self.wait_for("DOM quiescence", dom_is_quiet, timeout,
+                             message="DOM kept changing for longer than the timeout")
+
+    def wait_for_network_idle(self, timeout=None):
+        """
+        Waits until the document is loaded and no XHR/fetch requests are pending.
+        Requests are counted from the document's start when install_network_tracker was
+        called for the tab, otherwise only from the first poll.
+        """
+        def network_is_idle(driver):
+            ready_state, pending = driver.execute_script(_NETWORK_IDLE_SCRIPT)
+            return ready_state == "complete" and pending == 0
+
+        return self.wait_for("network idle", network_is_idle, timeout,
+                             message="Requests were still pending when the timeout expired")
+
+    def wait_for_page_ready(self, quiet_ms=300, timeout=None):
+        """
+        Waits for the network to go idle and the DOM to settle.
+        """
+        self.wait_for_network_idle(timeout)
+        self.wait_for_dom_quiet(quiet_ms, timeout)
+
+    def get_cart_count(self):
+        """
+        Returns the item count shown on the header cart badge.
+        """
+        return self.driver.execute_script(_CART_COUNT_SCRIPT)
 
-    def execute_script(self, script, element):
+    def wait_for_cart_count_change(self, old_count, timeout=None):
         """
-        Executes JavaScript on an element.
+        Waits until the header cart badge shows a count different from old_count.
         """
-        self.driver.execute_script(script, element)
+        return self.wait_for("cart count change", lambda driver: self.get_cart_count() != old_count, timeout,
+                             message=f"Cart count stayed at {old_count}")
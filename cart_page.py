@@ -1,29 +1,169 @@
-import time
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from base_page import BasePage
+from selenium.common.exceptions import TimeoutException
+from base_page import BasePage, same_page
+from locators import MultiLocator
+from prices import parse_price
+from timeline import traced
 import re
 from typing import Optional
 import allure
 
 
+# Reads every cart line item in one call: [{id, title, quantity, price}], price as displayed
+_EXTRACT_CART_SCRIPT = """
+var lineSelector = arguments[0];
+var text = function (root, selectors) {
+    for (var i = 0; i < selectors.length; i++) {
+        var el = root.querySelector(selectors[i]);
+        if (el && el.textContent.trim()) { return el.textContent.trim(); }
+    }
+    return null;
+};
+return Array.from(document.querySelectorAll(lineSelector)).map(function (line) {
+    var link = line.querySelector("a[href*='/itm/']");
+    var idMatch = link ? link.href.match(/\\/itm\\/(?:[^\\/]+\\/)?(\\d+)/) : null;
+    var quantityField = line.querySelector("select[data-test-id='qty-dropdown'], input[name*='quantity' i]");
+    var quantityText = quantityField ? quantityField.value : text(line, ['.quantity', "[data-test-id='qty']"]);
+    var quantity = parseInt((quantityText || '').replace(/[^0-9]/g, ''), 10);
+    return {
+        id: line.getAttribute('data-item-id') || (idMatch ? idMatch[1] : null),
+        title: text(line, ['.item-title', 'h3', "a[href*='/itm/']"]),
+        quantity: isNaN(quantity) ? 1 : quantity,
+        price: text(line, ['.item-price', "[data-test-id='cart-item-price']", '.price'])
+    };
+});
+"""
+
+# Number of cart line items rendered so far
+_LINE_ITEM_COUNT_SCRIPT = "return document.querySelectorAll(arguments[0]).length;"
+
+
+class CartMismatch(AssertionError):
+    """
+    Raised when the cart does not hold the number of items that were added.
+    """
+
+
+class CartModel:
+    """
+    The cart's line items as read from the cart page, with their running total.
+    """
+
+    def __init__(self, items=None):
+        """
+        Args:
+            items: Line item dicts with id, title, quantity, unit_price and currency
+        """
+        self.items = list(items or [])
+
+    @classmethod
+    def from_extracted(cls, lines):
+        """
+        Builds the model from the rows returned by the cart extraction script.
+        Rows whose price cannot be read are kept with a unit price of None.
+        """
+        items = []
+        for line in lines:
+            parsed = parse_price(line.get("price"))
+            currency, unit_price = parsed if parsed else ("", None)
+            items.append({"id": line.get("id"), "title": line.get("title"), "quantity": line.get("quantity") or 1,
+                          "unit_price": unit_price, "currency": currency})
+        return cls(items)
+
+    @property
+    def currencies(self):
+        return {item["currency"] for item in self.items if item["currency"]}
+
+    @property
+    def currency(self):
+        """
+        The cart's currency ("" when unknown).
+
+        Raises:
+            ValueError: If the line items are priced in several currencies
+        """
+        currencies = self.currencies
+        if len(currencies) > 1:
+            raise ValueError(f"Cart mixes currencies {sorted(currencies)}, its total cannot be compared")
+        return next(iter(currencies), "")
+
+    @property
+    def total(self):
+        """
+        Sum of unit price times quantity over the line items.
+
+        Raises:
+            ValueError: If a line item has no readable price or the currencies are mixed
+        """
+        if len(self.currencies) > 1:
+            raise ValueError(f"Cart mixes currencies {sorted(self.currencies)}, its total cannot be compared")
+        unpriced = [item["title"] for item in self.items if item["unit_price"] is None]
+        if unpriced:
+            raise ValueError(f"No price could be read for {unpriced}")
+        return round(sum(item["unit_price"] * item["quantity"] for item in self.items), 2)
+
+    def exceeds(self, budget):
+        return self.total > budget
+
+    def __len__(self):
+        return sum(item["quantity"] for item in self.items)
+
+    def __repr__(self):
+        return f"CartModel({len(self.items)} line items)"
+
+
 class CartPage(BasePage):
     # Locators
     # Using a robust CSS selector for the cart icon link
-    CART_ICON = (By.CSS_SELECTOR, "a.gh-flyout__target[href='https://cart.ebay.com']")
+    CART_ICON = (By.CSS_SELECTOR, "a.gh-flyout__target[href*='cart.ebay.com']")
     # Using the stable ID for the internal content body of the mini-cart flyout.
     MINI_CART = (By.ID, "gh-minicart-hover-body")
-    # Fallback locator for the cart total
-    CART_TOTAL = (By.CSS_SELECTOR, "span.total-val")
+    # Candidates for the cart total, resolved together in one in-page query
+    CART_TOTAL = MultiLocator("cart.total",
+                              (By.CSS_SELECTOR, "div.gh-subtotal"),
+                              (By.CSS_SELECTOR, "span.total-val"),
+                              (By.CSS_SELECTOR, "span[class*='total']"),
+                              (By.CSS_SELECTOR, "span[data-test-id='cart-total']"),
+                              (By.CSS_SELECTOR, "span.gh-ebayui-cart-total"))
+    REMOVE_ITEM_BUTTON = (By.CSS_SELECTOR, "button[data-test-id='cart-remove-item']")
+    LINE_ITEM_SELECTOR = "div.cart-bucket-lineitem"
+    CART_URL = "https://cart.ebay.com/"
+
+    PATH = "/"
 
-    def __init__(self, driver):
+    def __init__(self, driver, screenshots=None):
+        """
+        Args:
+            driver: The WebDriver to use
+            screenshots: Optional ScreenshotService, screenshots are attached synchronously without it
+        """
         super().__init__(driver)
-        # Navigate to the eBay homepage upon initialization
-        self.driver.get("https://www.ebay.com/")
+        self.screenshots = screenshots
         self.cart_total = None
+        self.model = CartModel()
+        # The cart before this run added anything, see read_starting_cart
+        self.start = CartModel()
+
+    def _attach_screenshot(self, name, failure=False, element=None):
+        if self.screenshots:
+            self.screenshots.capture(self.driver, name, failure=failure, element=element)
+        else:
+            allure.attach(
+                self.driver.get_screenshot_as_png(),
+                name=f"{name}.png",
+                attachment_type=allure.attachment_type.PNG
+            )
 
+    def is_loaded(self):
+        """
+        The mini-cart hangs off the header cart icon, so any eBay page showing it will do.
+        """
+        return self.is_on_site() and self.has_element_now(self.CART_ICON)
+
+    @traced("get cart total")
     def get_cart_total(self, take_screenshot: bool = False) -> Optional[float]:
         """
         Hovers over the cart icon to view the mini-cart and retrieves the cart total.
@@ -36,6 +176,7 @@ class CartPage(BasePage):
         """
         try:
             print("Attempting to get cart total...")
+            self.ensure_loaded()
             wait = WebDriverWait(self.driver, 10)
 
             # 1. Wait for the cart icon to be present and hover over it
@@ -46,51 +187,29 @@ class CartPage(BasePage):
             )
             print("Cart icon found. Performing hover...")
             ActionChains(self.driver).move_to_element(cart_icon).perform()
-            
-            # Brief pause for animation
-            time.sleep(0.5)
 
-            # 2. Wait for the mini-cart to become visible
+            # 2. Wait for the mini-cart to become visible and its open animation to settle
             print("Waiting for mini-cart to be visible...")
-            wait.until(
+            mini_cart = self.wait_for(
+                "mini-cart visible",
                 EC.visibility_of_element_located(self.MINI_CART),
                 message="Mini-cart did not become visible after hover"
             )
+            self.wait_for_dom_quiet(quiet_ms=150)
             print("Mini-cart is visible")
 
             # Take screenshot if requested
             if take_screenshot:
                 print("Taking screenshot of mini-cart...")
-                allure.attach(
-                    self.driver.get_screenshot_as_png(),
-                    name="mini_cart_hover.png",
-                    attachment_type=allure.attachment_type.PNG
-                )
+                self._attach_screenshot("mini_cart_hover", element=mini_cart)
 
-            # 3. Find the price element using multiple selectors for robustness
+            # 3. Find the price element, all candidate selectors are raced in one query
             print("Searching for price element...")
-            selectors_to_try = [
-                (By.CSS_SELECTOR, "div.gh-subtotal"),
-                self.CART_TOTAL, # Using the class property
-                (By.CSS_SELECTOR, "span[class*='total']"),
-                (By.CSS_SELECTOR, "span[data-test-id='cart-total']"),
-                (By.CSS_SELECTOR, "span.gh-ebayui-cart-total")
-            ]
-            
-            price_element = None
-            for selector in selectors_to_try:
-                try:
-                    # Use a shorter wait here as the element should already be visible
-                    price_element = WebDriverWait(self.driver, 2).until(
-                        EC.visibility_of_element_located(selector)
-                    )
-                    print(f"Found price element with selector: {selector}")
-                    break
-                except:
-                    continue
-            
-            if not price_element:
+            try:
+                price_element, selector = self.find_first(self.CART_TOTAL, timeout=2)
+            except TimeoutException:
                 raise Exception("Could not find price element with any selector")
+            print(f"Found price element with selector: {selector}")
 
             price_text = price_element.text.strip()
             #print(f"Raw price text: '{price_text}'")
@@ -104,31 +223,104 @@ class CartPage(BasePage):
         except Exception as e:
             print(f"An error occurred: {str(e)}")
             # Take a screenshot on failure for debugging
-            allure.attach(
-                self.driver.get_screenshot_as_png(),
-                name="cart_total_error.png",
-                attachment_type=allure.attachment_type.PNG
-            )
+            self._attach_screenshot("cart_total_error", failure=True)
             # Re-raise the exception to ensure the test fails
             raise Exception(f"Failed to get cart total. URL: {self.driver.current_url}, Error: {str(e)}")
             
-    def assert_cart_total_not_exceeds(self, max_budget: float) -> None:
+    @traced("clear cart")
+    def clear_cart(self) -> int:
+        """
+        Removes every item from the cart.
+
+        Returns:
+            int: The number of items removed
+        """
+        self.open(self.site_url(self.CART_URL))
+        removed = 0
+        while True:
+            # Queried by script so an empty cart does not sit out the implicit wait
+            button = self.driver.execute_script("return document.querySelector(arguments[0]);",
+                                                self.REMOVE_ITEM_BUTTON[1])
+            if button is None:
+                break
+            self.execute_script("arguments[0].click();", button)
+            self.wait_for_staleness(button)
+            removed += 1
+        print(f"Removed {removed} items from the cart")
+        return removed
+
+    def is_on_cart_page(self):
+        return same_page(self.driver.current_url, self.site_url(self.CART_URL))
+
+    @traced("read cart")
+    def read_cart(self, added_items=None) -> CartModel:
+        """
+        Reads all cart line items (title, quantity, unit price, currency) with one script call.
+        The cart page is loaded unless adding the item already redirected to it.
+
+        Args:
+            added_items: Number of items added since read_starting_cart, compared with the
+                quantities the cart gained
+
+        Returns:
+            CartModel: The cart, also kept as self.model
+
+        Raises:
+            TimeoutException: If no line items render although the cart should hold some
+            CartMismatch: If the cart did not gain added_items items
+        """
+        self.open(self.site_url(self.CART_URL))
+        expected = self.get_cart_count() if added_items is None else len(self.start) + added_items
+        if expected:
+            # The line items are rendered after the page load, an empty read would pass any budget
+            self.wait_for("cart line items",
+                          lambda driver: driver.execute_script(_LINE_ITEM_COUNT_SCRIPT, self.LINE_ITEM_SELECTOR) > 0,
+                          message="No line items were found in the cart")
+        lines = self.driver.execute_script(_EXTRACT_CART_SCRIPT, self.LINE_ITEM_SELECTOR)
+        self.model = CartModel.from_extracted(lines)
+        self.cart_total = self.model.total
+        print(f"Cart holds {len(self.model)} items, total {self.model.currency} {self.cart_total:.2f}")
+        if added_items is not None and len(self.model) - len(self.start) != added_items:
+            raise CartMismatch(f"Cart gained {len(self.model) - len(self.start)} items "
+                               f"(from {len(self.start)} to {len(self.model)}), {added_items} were added")
+        return self.model
+
+    def read_starting_cart(self) -> CartModel:
+        """
+        Reads the cart before any item is added, items left from earlier runs are then not
+        counted as added by this one (see read_cart and added_total).
         """
-        Asserts that the cart total does not exceed the specified maximum budget.
+        self.start = self.read_cart()
+        if self.start.items:
+            print(f"Cart already holds {len(self.start)} items, only the ones added from now on are checked")
+        return self.start
+
+    @property
+    def added_total(self):
+        """
+        What the items added since read_starting_cart cost, as of the last read_cart.
+        """
+        return round(self.model.total - self.start.total, 2)
+
+    def assert_cart_total_not_exceeds(self, max_budget: float, added_items: Optional[int] = None) -> None:
+        """
+        Asserts that the items added since read_starting_cart do not cost more than the maximum budget.
         
         Args:
-            max_budget: The maximum allowed cart total
+            max_budget: The maximum allowed total of the added items
+            added_items: Number of items that were added, the cart must have gained exactly these
             
         Raises:
-            AssertionError: If the cart total exceeds the max budget
+            AssertionError: If the added items exceed the max budget or the cart did not gain the added items
         """
-        # Get cart total with screenshot
-        cart_total = self.get_cart_total(take_screenshot=True)
-        
+        cart = self.read_cart(added_items)
+        self._attach_screenshot("cart")
+
         # Additional info for the report
-        print(f"Cart Total: ILS{cart_total:.2f}")
-        print(f"Max Budget: ILS{max_budget:.2f}")
-        
-        # Assertions
-        assert cart_total is not None, "Cart total could not be determined."
-        assert cart_total <= max_budget, f"Cart total {cart_total} exceeds max allowed budget {max_budget}"
\ No newline at end of file
+        print(f"Cart Total: {cart.currency}{self.cart_total:.2f}")
+        if self.start.items:
+            print(f"Added items total: {cart.currency}{self.added_total:.2f}")
+        print(f"Max Budget: {cart.currency}{max_budget:.2f}")
+
+        assert self.added_total <= max_budget, \
+            f"Added items total {cart.currency} {self.added_total} exceeds max allowed budget {max_budget}"
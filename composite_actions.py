@@ -0,0 +1,123 @@
+from locators import QUERY_FUNCTIONS, MultiLocator
+
+# Runs a batch of steps: first every element is located, then the steps act in order.
+# Nothing is done unless all elements are there, so a batch can simply be retried while waiting.
+# arguments: steps as [{op, candidates, text, attribute, key, native}], a native step can only be last.
+# Returns null when an element is missing, else {results, winners: candidate index per step,
+# native: element of the trailing native step (already cleared for a fill) or null}.
+COMPOSITE_SCRIPT = QUERY_FUNCTIONS + """
+var steps = arguments[0];
+var needsInteraction = function (step) { return step.op === 'fill' || step.op === 'click'; };
+var located = [];
+for (var i = 0; i < steps.length; i++) {
+    var step = steps[i], match = null;
+    for (var c = 0; c < step.candidates.length && !match; c++) {
+        var elements = query(step.candidates[c][0], step.candidates[c][1]);
+        for (var j = 0; j < elements.length; j++) {
+            var el = elements[j];
+            if (!needsInteraction(step) || (isVisible(el) && !el.disabled)) { match = [c, el]; break; }
+        }
+    }
+    if (!match) { return null; }
+    located.push(match);
+}
+var setValue = function (el, text) {
+    var prototype = el instanceof HTMLTextAreaElement ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+    Object.getOwnPropertyDescriptor(prototype, 'value').set.call(el, text);
+    el.dispatchEvent(new Event('input', {bubbles: true}));
+    el.dispatchEvent(new Event('change', {bubbles: true}));
+};
+var results = {};
+var winners = located.map(function (match) { return match[0]; });
+for (var i = 0; i < steps.length; i++) {
+    var step = steps[i], el = located[i][1];
+    if (step.native) {
+        if (step.op === 'fill') { setValue(el, ''); }
+        return {results: results, winners: winners, native: el};
+    }
+    switch (step.op) {
+        case 'fill': el.focus(); setValue(el, step.text); break;
+        case 'click': el.click(); break;
+        case 'text': results[step.key] = el.textContent.trim(); break;
+        case 'attribute': results[step.key] = el.getAttribute(step.attribute); break;
+    }
+}
+return {results: results, winners: winners, native: null};
+"""
+
+
+class CompositeAction:
+    """
+    A short sequence of find / fill / click / read steps that BasePage.perform() runs
+    in as few WebDriver commands as possible.
+
+    Steps run as one in-page script. A step marked native is done with real WebDriver
+    input instead (for fields and buttons that reject synthetic events), which ends the
+    current script call; the steps after it continue in the next one.
+    """
+
+    def __init__(self, name):
+        """
+        Args:
+            name: Label of the action in the timeline and wait reports
+        """
+        self.name = name
+        self.steps = []
+
+    def _add(self, op, locator, native=False, **values):
+        self.steps.append({"op": op, "locator": locator, "native": native, **values})
+        return self
+
+    def fill(self, locator, text, native=False):
+        """
+        Replaces the value of a visible, enabled input.
+        """
+        return self._add("fill", locator, native, text=str(text))
+
+    def click(self, locator, native=False):
+        """
+        Clicks a visible, enabled element.
+        """
+        return self._add("click", locator, native)
+
+    def read_text(self, key, locator):
+        """
+        Stores the element's text under key in the results.
+        """
+        return self._add("text", locator, key=key)
+
+    def read_attribute(self, key, locator, attribute):
+        """
+        Stores one attribute of the element under key in the results.
+        """
+        return self._add("attribute", locator, key=key, attribute=attribute)
+
+    def batches(self):
+        """
+        Splits the steps into script calls, each one ending at a native step or at the last step.
+        """
+        batches, current = [], []
+        for step in self.steps:
+            current.append(step)
+            if step["native"]:
+                batches.append(current)
+                current = []
+        if current:
+            batches.append(current)
+        return batches
+
+    @staticmethod
+    def script_steps(batch):
+        """
+        The batch as passed to COMPOSITE_SCRIPT, with each locator's candidates in ranked order.
+        """
+        steps = []
+        for step in batch:
+            locator = step["locator"]
+            candidates = locator.ordered_candidates() if isinstance(locator, MultiLocator) else [locator]
+            steps.append({**{k: v for k, v in step.items() if k != "locator"},
+                          "candidates": [list(candidate) for candidate in candidates]})
+        return steps
+
+    def __repr__(self):
+        return f"CompositeAction({self.name!r}, {len(self.steps)} steps)"
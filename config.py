@@ -0,0 +1,80 @@
+import json
+
+# Run settings used when data.json does not override them
+DEFAULT_SETTINGS = {
+    # Number of WebDriver sessions used to add items to the cart in parallel (1 = sequential)
+    "workers": 1,
+    # "thread" or "process"
+    "worker_backend": "thread",
+    # Product pages a worker visits before its browser is restarted
+    "pages_per_worker": 10,
+    # "browser" drives the search UI, "http" fetches filtered results without the browser
+    "search_backend": "browser",
+    # Resource types the browsers never download: any of "images", "media", "fonts", "ads"
+    "block_resources": [],
+    # "normal" waits for the full load event on navigation, "eager" only for DOMContentLoaded
+    "page_load_strategy": "normal",
+    # Product pages loaded ahead in background tabs while the current item is added (0 = off, sequential runs only)
+    "prefetch_depth": 0,
+    # Prewarmed Chrome profile every browser starts from a copy of (None = empty profiles)
+    "profile_template_dir": None,
+    # Hours before the profile template is built again
+    "profile_template_max_age_hours": 24,
+    # Prefilter and rank result cards by their shown prices: None, "price" or "price+shipping"
+    "price_screening": None,
+    # Currency max_price is in, e.g. "ILS" (None = the most common currency among the result cards)
+    "budget_currency": None,
+    # Extra search results kept to replace items that fail or time out
+    "replacement_candidates": 2,
+    # Seconds one item may take to be added, retries included
+    "item_timeout_seconds": 60,
+    # Seconds adding all items may take (0 = no limit)
+    "run_timeout_seconds": 0,
+    # Further attempts for an item after a transient failure (slow load, stale or covered element)
+    "item_retries": 1,
+    # Delay before the first retry, doubled for every further one
+    "retry_backoff_seconds": 2,
+    # Where logged-in sessions are cached, a shared path lets several workers reuse one session
+    "session_cache_dir": ".session_cache",
+    # Minutes a cached session is reused before signing in again
+    "session_ttl_minutes": 720,
+    # Where the item URLs of recent searches are cached, keyed by term, max price, item limit and site
+    "search_cache_file": ".search_cache.json",
+    # Minutes a cached search is reused before searching again
+    "search_cache_ttl_minutes": 60,
+    # Searches kept in the cache, the least recently used ones are evicted first
+    "search_cache_max_entries": 50,
+    # Always search again (the fresh results still replace the cached ones)
+    "search_cache_bypass": False,
+    # Screenshot attachments: "JPEG", "WEBP" or "PNG" (re-encoding needs Pillow)
+    "screenshot_format": "JPEG",
+    "screenshot_quality": 70,
+    # Wider screenshots are downscaled to this width (0 keeps the original size)
+    "screenshot_max_width": 1280,
+    # Keep one success screenshot out of N (0 keeps none), failure screenshots are always kept
+    "screenshot_every_nth_success": 1,
+    # Where the per-run JSON timelines are written
+    "timeline_dir": "timelines",
+    # Maximum seconds per timeline step name, e.g. {"add item to cart": 15}
+    "step_budgets": {},
+    # Fail the run when a step exceeds its budget (otherwise violations are only reported)
+    "fail_on_budget": False,
+    # Record the pages the run visits into this directory (see replay.py)
+    "record_dir": None,
+    # Replay a recording from this directory on a local server instead of using ebay.com
+    "replay_dir": None,
+    # Artificial delay the replay server adds to every response
+    "replay_latency_ms": 0,
+}
+
+
+def load_settings(file_path="data.json"):
+    """
+    Loads the optional "settings" section of the test data merged over DEFAULT_SETTINGS.
+    """
+    try:
+        with open(file_path, 'r') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        data = {}
+    return {**DEFAULT_SETTINGS, **data.get("settings", {})}
@@ -0,0 +1,178 @@
+import json
+import os
+import time
+import allure
+import pytest
+
+from base_page import BasePage, NAVIGATION_STATS, WAIT_TIMINGS, set_base_url
+from cart_page import CartPage
+from config import load_settings
+from driver_factory import create_driver, reset_driver
+from profile_template import ProfileTemplate
+from scenarios import ScenarioDurations, load_scenarios, shard_scenarios
+
+# Test data with the scenarios the journey is parametrized over
+TEST_DATA_FILE = "data.json"
+
+# Saved eBay pages served by the offline tests
+SAVED_PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "saved_pages")
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("sharding", "split the scenarios of data.json across parallel pytest runs")
+    group.addoption("--shard-count", type=int, default=1, help="number of parallel pytest runs")
+    group.addoption("--shard-index", type=int, default=0, help="which shard this run executes (0-based)")
+
+
+def pytest_configure(config):
+    config.scenario_durations = ScenarioDurations()
+
+
+def pytest_generate_tests(metafunc):
+    """
+    Parametrizes tests taking a `scenario` over this shard's scenarios.
+    """
+    if "scenario" not in metafunc.fixturenames:
+        return
+    shard_count = metafunc.config.getoption("shard_count")
+    shard_index = metafunc.config.getoption("shard_index")
+    if not 0 <= shard_index < shard_count:
+        raise pytest.UsageError(f"--shard-index must be between 0 and {shard_count - 1}")
+    with open(TEST_DATA_FILE, 'r') as f:
+        scenarios = load_scenarios(json.load(f))
+    shard = shard_scenarios(scenarios, shard_count, metafunc.config.scenario_durations)[shard_index]
+    metafunc.parametrize("scenario", shard, ids=[scenario["name"] for scenario in shard])
+
+
+def pytest_runtest_makereport(item, call):
+    # Remember how long each passing scenario ran, so the next split is balanced
+    callspec = getattr(item, "callspec", None)
+    if call.when == "call" and call.excinfo is None and callspec is not None and "scenario" in callspec.params:
+        item.config.scenario_durations.record(callspec.params["scenario"]["name"], call.duration)
+
+
+def pytest_sessionfinish(session):
+    session.config.scenario_durations.save()
+
+
+class WarmDriverPool:
+    """
+    Keeps browsers alive for the whole pytest session and lends them to one test at a time.
+    """
+
+    def __init__(self, block_resources=(), page_load_strategy="normal", profile_template=None):
+        """
+        Args:
+            block_resources: Blocking profiles applied to every browser (see driver_factory.BLOCKING_PROFILES)
+            page_load_strategy: "normal" or "eager"
+            profile_template: Built ProfileTemplate directory the browsers start from (None: empty profiles)
+        """
+        self.block_resources = block_resources
+        self.page_load_strategy = page_load_strategy
+        self.profile_template = profile_template
+        self._idle = []
+        self._all = []
+
+    def acquire(self):
+        """
+        Returns an idle browser, launching a new one only when none is available.
+        """
+        if self._idle:
+            return self._idle.pop()
+        driver = create_driver(self.block_resources, self.page_load_strategy, self.profile_template)
+        self._all.append(driver)
+        return driver
+
+    def release(self, driver):
+        """
+        Resets a browser and makes it available to the next test.
+        A browser that cannot be reset is quit instead of being reused.
+        """
+        try:
+            CartPage(driver).clear_cart()
+            reset_driver(driver)
+            self._idle.append(driver)
+        except Exception as e:
+            print(f"Could not reset driver, discarding it: {e}")
+            self._all.remove(driver)
+            driver.quit()
+
+    def close(self):
+        for driver in self._all:
+            try:
+                driver.quit()
+            except Exception as e:
+                print(f"Error quitting driver: {e}")
+        self._all.clear()
+        self._idle.clear()
+
+
+@pytest.fixture(scope="session")
+def warm_drivers():
+    """Session-wide pool of warm browsers."""
+    settings = load_settings()
+    profile_template = None
+    # A replayed site is local, there is nothing worth prewarming
+    if settings['profile_template_dir'] and not settings['replay_dir']:
+        template = ProfileTemplate(settings['profile_template_dir'],
+                                   max_age_seconds=settings['profile_template_max_age_hours'] * 60 * 60)
+        profile_template = template.ensure(BasePage.BASE_URL, settings['block_resources'],
+                                           settings['page_load_strategy'])
+    pool = WarmDriverPool(settings['block_resources'], settings['page_load_strategy'], profile_template)
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def site():
+    """
+    The site a test runs against: a local replay of settings' replay_dir when set (yielding the
+    ReplayServer), otherwise live eBay (yielding None). The driver fixture depends on it, so the
+    cart is cleared on the same site before the replay stops and BASE_URL is restored.
+    """
+    settings = load_settings()
+    if not settings['replay_dir']:
+        yield None
+        return
+    from replay import ReplayServer
+    live_base_url = BasePage.BASE_URL
+    with ReplayServer(settings['replay_dir'], latency_ms=settings['replay_latency_ms']) as server:
+        set_base_url(server.base_url)
+        try:
+            yield server
+        finally:
+            set_base_url(live_base_url)
+
+
+@pytest.fixture
+def driver(request, warm_drivers, site):
+    """A ready-to-use browser from the warm pool, reset and returned to the pool after the test."""
+    start = time.monotonic()
+    driver = warm_drivers.acquire()
+    startup_time = time.monotonic() - start
+    request.node.user_properties.append(("driver_startup_seconds", round(startup_time, 3)))
+    allure.attach(f"{startup_time:.2f}s", name="Driver Startup Time")
+    print(f"Driver ready in {startup_time:.2f}s")
+    request.node.user_properties.append(("load_profile", driver.load_profile))
+    allure.attach(json.dumps(driver.load_profile, indent=2), name="Browser Load Profile",
+                  attachment_type=allure.attachment_type.JSON)
+    # Per-test wait and navigation reports start from zero
+    WAIT_TIMINGS.clear()
+    NAVIGATION_STATS.update(loads=0, skipped=0)
+
+    yield driver
+
+    start = time.monotonic()
+    warm_drivers.release(driver)
+    reset_time = time.monotonic() - start
+    request.node.user_properties.append(("driver_reset_seconds", round(reset_time, 3)))
+    allure.attach(f"{reset_time:.2f}s", name="Driver Reset Time")
+    print(f"Driver reset in {reset_time:.2f}s")
+
+
+@pytest.fixture
+def replay_server():
+    """Replays the saved pages from a local server."""
+    from replay import ReplayServer
+    with ReplayServer(SAVED_PAGES_DIR) as server:
+        yield server
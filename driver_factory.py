@@ -0,0 +1,187 @@
+import json
+import os
+import shutil
+from selenium import webdriver
+from selenium.common.exceptions import SessionNotCreatedException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.remote.webdriver import WebDriver
+from base_page import install_network_tracker
+from profile_template import clone_profile
+
+# Remembers the chromedriver resolved by webdriver-manager so later launches skip the lookup
+DRIVER_CACHE_FILE = ".driver_cache.json"
+
+# eBay cookies that carry the signed-in session, kept when a driver is reset
+AUTH_COOKIE_NAMES = {"s", "ds1", "ds2", "shs", "nonsession", "dp1", "cid", "ebay", "ns1"}
+
+# Resources the flow never reads, blocked by URL pattern (DevTools Network.setBlockedURLs, * is a wildcard)
+BLOCKING_PROFILES = {
+    "images": ["*i.ebayimg.com/*", "*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.avif*", "*.ico*"],
+    "media": ["*.mp4*", "*.webm*", "*.m3u8*", "*.mp3*"],
+    "fonts": ["*.woff*", "*.ttf*", "*.otf*", "*.eot*"],
+    "ads": ["*doubleclick.net*", "*googlesyndication.com*", "*googleadservices.com*", "*google-analytics.com*",
+            "*googletagmanager.com*", "*scorecardresearch.com*", "*adnxs.com*", "*criteo.com*", "*criteo.net*",
+            "*facebook.net*", "*bing.com/bat*", "*amazon-adsystem.com*", "*taboola.com*", "*outbrain.com*"],
+}
+
+PAGE_LOAD_STRATEGIES = ("normal", "eager")
+
+
+def resolve_chromedriver(refresh: bool = False) -> str:
+    """
+    Returns the path of the chromedriver binary, resolving it with webdriver-manager
+    only when no cached path exists (or refresh is True).
+    """
+    if not refresh:
+        try:
+            with open(DRIVER_CACHE_FILE, 'r') as f:
+                path = json.load(f).get("chromedriver")
+            if path and os.access(path, os.X_OK):
+                return path
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+    from webdriver_manager.chrome import ChromeDriverManager
+    path = ChromeDriverManager().install()
+    with open(DRIVER_CACHE_FILE, 'w') as f:
+        json.dump({"chromedriver": path}, f)
+    return path
+
+
+def blocked_url_patterns(profiles) -> list:
+    """
+    Returns the URL patterns blocked by a list of BLOCKING_PROFILES names.
+    """
+    patterns = []
+    for profile in profiles:
+        if profile not in BLOCKING_PROFILES:
+            raise ValueError(f"Unknown blocking profile '{profile}', expected one of {list(BLOCKING_PROFILES)}")
+        patterns.extend(p for p in BLOCKING_PROFILES[profile] if p not in patterns)
+    return patterns
+
+
+def _chrome_options(page_load_strategy: str, user_data_dir: str = None) -> Options:
+    if page_load_strategy not in PAGE_LOAD_STRATEGIES:
+        raise ValueError(f"Unknown page load strategy '{page_load_strategy}', expected one of {list(PAGE_LOAD_STRATEGIES)}")
+    options = Options()
+    # "eager" returns from navigation at DOMContentLoaded instead of waiting for every image and iframe
+    options.page_load_strategy = page_load_strategy
+    # HEADLESS=True runs Chrome without a window, e.g. on a CI box
+    if os.environ.get("HEADLESS", "False").lower() in ("1", "true", "yes"):
+        options.add_argument("--headless=new")
+        options.add_argument("--window-size=1920,1080")
+    if user_data_dir:
+        options.add_argument(f"--user-data-dir={user_data_dir}")
+        # A copied profile would otherwise greet every browser with the first run pages
+        options.add_argument("--no-first-run")
+        options.add_argument("--no-default-browser-check")
+    return options
+
+
+def _start_chrome(options: Options) -> WebDriver:
+    try:
+        path = resolve_chromedriver()
+    except Exception as e:
+        # webdriver-manager could not resolve a driver, let Selenium Manager find one
+        print(f"Could not resolve chromedriver with webdriver-manager: {e}")
+        return webdriver.Chrome(options=options)
+    try:
+        return webdriver.Chrome(service=Service(executable_path=path), options=options)
+    except SessionNotCreatedException:
+        # Chrome was updated since the driver was cached
+        return webdriver.Chrome(service=Service(executable_path=resolve_chromedriver(refresh=True)),
+                                options=options)
+
+
+def _remove_profile_on_quit(driver: WebDriver, profile_dir: str) -> None:
+    quit_driver = driver.quit
+
+    def quit_and_remove_profile():
+        try:
+            quit_driver()
+        finally:
+            shutil.rmtree(os.path.dirname(profile_dir), ignore_errors=True)
+
+    driver.quit = quit_and_remove_profile
+
+
+def create_driver(block_resources=(), page_load_strategy: str = "normal", profile_template: str = None,
+                  user_data_dir: str = None) -> WebDriver:
+    """
+    Creates a maximized Chrome WebDriver configured the way the page objects expect.
+
+    Args:
+        block_resources: BLOCKING_PROFILES names whose requests the browser never sends,
+            e.g. ["images", "fonts", "ads"]
+        page_load_strategy: "normal" or "eager"
+        profile_template: Directory of a built ProfileTemplate, the browser starts from a
+            clone of it that is deleted when the driver quits
+        user_data_dir: Profile directory used as is (ignored when profile_template is set)
+
+    The applied settings are kept on the driver as load_profile for the report.
+    """
+    patterns = blocked_url_patterns(block_resources)
+    if profile_template:
+        user_data_dir = clone_profile(profile_template)
+    try:
+        driver = _start_chrome(_chrome_options(page_load_strategy, user_data_dir))
+    except Exception:
+        if profile_template:
+            shutil.rmtree(os.path.dirname(user_data_dir), ignore_errors=True)
+        raise
+    if profile_template:
+        _remove_profile_on_quit(driver, user_data_dir)
+    if patterns:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+    install_network_tracker(driver)
+    driver.load_profile = {"block_resources": list(block_resources), "blocked_url_patterns": patterns,
+                           "page_load_strategy": page_load_strategy, "profile_template": profile_template}
+    driver.maximize_window()
+    driver.implicitly_wait(10)
+    return driver
+
+
+def copy_session_cookies(driver: WebDriver, cookies: list, base_url: str = "https://www.ebay.com/") -> None:
+    """
+    Loads another session's cookies into a driver so it shares that session's login.
+
+    Args:
+        driver: The WebDriver receiving the cookies
+        cookies: Cookies as returned by driver.get_cookies() on the source session
+        base_url: Page opened first, cookies can only be set for the current domain
+    """
+    driver.get(base_url)
+    for cookie in cookies:
+        try:
+            driver.add_cookie(cookie)
+        except Exception as e:
+            print(f"Could not copy cookie '{cookie.get('name')}': {e}")
+    driver.refresh()
+
+
+def reset_driver(driver: WebDriver, keep_auth: bool = True) -> None:
+    """
+    Returns a used driver to a clean state without relaunching the browser:
+    extra tabs are closed, web storage is cleared and cookies are deleted
+    (except the sign-in cookies when keep_auth is True).
+    """
+    handles = driver.window_handles
+    for handle in handles[1:]:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(handles[0])
+
+    try:
+        driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+    except Exception:
+        # about:blank and data: pages have no storage
+        pass
+
+    if keep_auth:
+        for cookie in driver.get_cookies():
+            if cookie["name"] not in AUTH_COOKIE_NAMES:
+                driver.delete_cookie(cookie["name"])
+    else:
+        driver.delete_all_cookies()
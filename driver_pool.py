@@ -0,0 +1,166 @@
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from multiprocessing import util
+
+from base_page import BasePage, set_base_url
+from driver_factory import create_driver, copy_session_cookies
+from product_page import ProductPage
+
+# Per-worker state. Thread-local so it works for both backends: every thread of a
+# thread pool and the single thread of every pool process gets its own browser.
+_worker = threading.local()
+
+# Drivers started by thread workers, quit by DriverPool.close()
+_thread_drivers = []
+_thread_drivers_lock = threading.Lock()
+
+
+def _init_worker(cookies, pages_per_worker, base_url, block_resources, page_load_strategy, profile_template):
+    """
+    Pool initializer: stores the session to clone into this worker's browser.
+    """
+    # Pool processes do not inherit a base URL set at runtime (e.g. a replay server)
+    set_base_url(base_url)
+    _worker.cookies = cookies
+    _worker.base_url = base_url
+    _worker.block_resources = block_resources
+    _worker.page_load_strategy = page_load_strategy
+    _worker.profile_template = profile_template
+    _worker.pages_per_worker = pages_per_worker
+    _worker.driver = None
+    _worker.pages_visited = 0
+
+
+def _quit_worker_driver():
+    if _worker.driver is not None:
+        try:
+            _worker.driver.quit()
+        except Exception as e:
+            print(f"Error quitting worker driver: {e}")
+        _worker.driver = None
+
+
+def _get_worker_driver():
+    """
+    Returns this worker's authenticated driver, restarting it once it has visited
+    pages_per_worker product pages to bound Chrome's memory growth.
+    """
+    if _worker.driver is not None and _worker.pages_visited >= _worker.pages_per_worker:
+        print(f"Recycling worker browser after {_worker.pages_visited} pages")
+        driver = _worker.driver
+        _quit_worker_driver()
+        with _thread_drivers_lock:
+            if driver in _thread_drivers:
+                _thread_drivers.remove(driver)
+
+    if _worker.driver is None:
+        driver = create_driver(_worker.block_resources, _worker.page_load_strategy, _worker.profile_template)
+        copy_session_cookies(driver, _worker.cookies, _worker.base_url)
+        _worker.driver = driver
+        _worker.pages_visited = 0
+        if multiprocessing.parent_process() is None:
+            with _thread_drivers_lock:
+                _thread_drivers.append(driver)
+        else:
+            # Pool processes exit without running atexit hooks, Finalize still runs
+            util.Finalize(None, _quit_worker_driver, exitpriority=10)
+
+    return _worker.driver
+
+
+def _add_item(index, url):
+    """
+    Adds one product to the cart in this worker's browser.
+
+    Returns:
+        dict: index, url, success, error, elapsed seconds and a screenshot (PNG bytes)
+    """
+    start = time.monotonic()
+    driver = _get_worker_driver()
+    _worker.pages_visited += 1
+    result = {"index": index, "url": url, "success": False, "error": None, "screenshot": None}
+    try:
+        product_page = ProductPage(driver, url)
+        product_page.add_item_to_cart(index)
+        result["success"] = True
+    except Exception as e:
+        print(f"Error adding item {index}: {e}")
+        result["error"] = str(e)
+    try:
+        result["screenshot"] = driver.get_screenshot_as_png()
+    except Exception as e:
+        print(f"Could not take screenshot for item {index}: {e}")
+    result["elapsed"] = time.monotonic() - start
+    return result
+
+
+class DriverPool:
+    """
+    A pool of WebDriver sessions sharing one login, used to add products to the cart in parallel.
+    """
+    BACKENDS = {"thread": ThreadPoolExecutor, "process": ProcessPoolExecutor}
+
+    def __init__(self, cookies, size=2, backend="thread", pages_per_worker=10, base_url=None,
+                 block_resources=(), page_load_strategy="normal", profile_template=None):
+        """
+        Args:
+            cookies: Cookies of an authenticated session (driver.get_cookies())
+            size: Number of parallel browsers
+            backend: "thread" or "process"
+            pages_per_worker: Product pages a browser visits before it is restarted
+            base_url: Site the workers browse (default: BasePage.BASE_URL)
+            block_resources: Blocking profiles applied to the workers' browsers
+            page_load_strategy: "normal" or "eager"
+            profile_template: Built ProfileTemplate directory the workers' browsers start from
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown worker backend '{backend}', expected one of {list(self.BACKENDS)}")
+        self.size = size
+        self.backend = backend
+        self._executor = self.BACKENDS[backend](
+            max_workers=size,
+            initializer=_init_worker,
+            initargs=(cookies, pages_per_worker, base_url or BasePage.BASE_URL,
+                      list(block_resources), page_load_strategy, profile_template),
+        )
+
+    def add_items_to_cart(self, item_urls):
+        """
+        Spreads ProductPage.add_item_to_cart over the pool's browsers.
+
+        Args:
+            item_urls: Product URLs to add, numbered from 1 in the results
+
+        Returns:
+            list: One result dict per URL (see _add_item), in the order of item_urls
+        """
+        futures = [self._executor.submit(_add_item, index, url)
+                   for index, url in enumerate(item_urls, start=1)]
+        results = []
+        for future in as_completed(futures):
+            result = future.result()
+            status = "added" if result["success"] else "failed"
+            print(f"Item {result['index']} {status} in {result['elapsed']:.2f}s")
+            results.append(result)
+        return sorted(results, key=lambda r: r["index"])
+
+    def close(self):
+        """
+        Shuts the workers down and quits their browsers.
+        """
+        self._executor.shutdown(wait=True)
+        with _thread_drivers_lock:
+            for driver in _thread_drivers:
+                try:
+                    driver.quit()
+                except Exception as e:
+                    print(f"Error quitting worker driver: {e}")
+            _thread_drivers.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
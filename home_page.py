@@ -1,20 +1,29 @@
 from selenium.webdriver.common.by import By
 from base_page import BasePage
+from timeline import traced
 
 class HomePage(BasePage):
     # Locators
     SEARCH_BOX = (By.ID, "gh-ac")
     SEARCH_BUTTON = (By.ID, "gh-search-btn")
 
-    def __init__(self, driver):
-        super().__init__(driver)
-        self.driver.get("https://www.ebay.com/")
+    PATH = "/"
 
+    def is_loaded(self):
+        """
+        The search box is part of the header, so any eBay page will do.
+        """
+        return self.is_on_site() and self.has_element_now(self.SEARCH_BOX)
+
+    @traced("search")
     def search_for_item(self, item_name):
         """
         Searches for an item on the home page and proceeds to the search results page.
         """
+        self.ensure_loaded()
         self.do_send_keys(self.SEARCH_BOX, item_name)
+        page_url = self.driver.current_url
         self.do_click(self.SEARCH_BUTTON)
+        self.wait_for_url_change(page_url)
         # This action navigates to the search results page, so we can return an instance of it.
         # We will import SearchResultsPage in the main script to avoid circular dependencies here.
\ No newline at end of file
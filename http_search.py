@@ -0,0 +1,192 @@
+import re
+from html.parser import HTMLParser
+from urllib.parse import urlencode, urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Elements that never have a closing tag and must not be pushed on the parser stack
+_VOID_ELEMENTS = {"area", "base", "br", "col", "embed", "hr", "img", "input",
+                  "link", "meta", "param", "source", "track", "wbr"}
+
+# Class name -> card field collected from the element's text
+_TEXT_FIELDS = {
+    "s-card__title": "title",
+    "s-card__price": "price",
+    "s-item__price": "price",
+    "s-card__attribute-row": "attribute",
+    "s-item__shipping": "attribute",
+    "s-card__footer": "footer",
+}
+
+
+class _ResultCardParser(HTMLParser):
+    """
+    Collects the result cards of an eBay search page in the same shape as
+    SearchResultsPage.extract_items.
+    """
+
+    def __init__(self, base_url):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.items = []
+        self.next_page_url = None
+        self._card = None
+        # Open elements inside the current card: (tag, field collected from its text or None)
+        self._stack = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get("class") or "").split()
+
+        if tag == "a" and "pagination__next" in classes and attrs.get("href") \
+                and attrs.get("aria-disabled") != "true":
+            self.next_page_url = urljoin(self.base_url, attrs["href"])
+
+        if self._card is None:
+            if "s-card" in classes and tag not in _VOID_ELEMENTS:
+                self._card = {"url": None, "texts": {}, "sponsored": False}
+                self._stack = [(tag, None)]
+            return
+
+        if tag == "a" and "su-link" in classes and self._card["url"] is None:
+            self._card["url"] = urljoin(self.base_url, attrs.get("href", ""))
+        if "Sponsored" in (attrs.get("aria-label") or "") or "s-card__footer--sponsored" in classes:
+            self._card["sponsored"] = True
+
+        if tag in _VOID_ELEMENTS:
+            return
+        field = next((_TEXT_FIELDS[name] for name in classes if name in _TEXT_FIELDS), None)
+        if field == "attribute":
+            # Every attribute row is collected separately to find the shipping line
+            self._card["texts"].setdefault("attribute", []).append("")
+        self._stack.append((tag, field))
+
+    def handle_endtag(self, tag):
+        if self._card is None:
+            return
+        # Pop up to the matching tag, tolerating unclosed children
+        for position in range(len(self._stack) - 1, -1, -1):
+            if self._stack[position][0] == tag:
+                del self._stack[position:]
+                break
+        if not self._stack:
+            self._finish_card()
+
+    def handle_data(self, data):
+        if self._card is None:
+            return
+        texts = self._card["texts"]
+        for _, field in self._stack:
+            if field == "attribute":
+                texts["attribute"][-1] += data
+            elif field:
+                texts[field] = texts.get(field, "") + data
+
+    def _finish_card(self):
+        texts = self._card["texts"]
+        title = " ".join(texts.get("title", "").split())
+        title = re.sub(r"^New Listing", "", title)
+        title = re.sub(r"Opens in a new window or tab$", "", title).strip()
+        shipping = next((" ".join(row.split()) for row in texts.get("attribute", [])
+                         if re.search(r"delivery|shipping", row, re.IGNORECASE)), "")
+        sponsored = (self._card["sponsored"]
+                     or title.startswith("Shop on eBay")
+                     or texts.get("footer", "").strip().startswith("Sponsored"))
+        self.items.append({
+            "url": self._card["url"],
+            "title": title,
+            "price": " ".join(texts.get("price", "").split()),
+            "shipping": shipping,
+            "sponsored": sponsored,
+        })
+        self._card = None
+        self._stack = []
+
+
+class HttpSearchClient:
+    """
+    Runs eBay searches over plain HTTP, without a browser.
+
+    A single keep-alive session with a pooled adapter is reused for every page fetched.
+    """
+    HEADERS = {
+        "User-Agent": ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                       "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"),
+        "Accept": "text/html,application/xhtml+xml",
+        "Accept-Language": "en-US,en;q=0.9",
+    }
+
+    def __init__(self, base_url="https://www.ebay.com", pool_size=10, timeout=10):
+        """
+        Args:
+            base_url: Site root, can point at a local stand-in server
+            pool_size: Number of keep-alive connections kept per host
+            timeout: Seconds to wait for each response
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(self.HEADERS)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                              max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504)))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def build_search_url(self, item_name, max_price, page=1):
+        """
+        Builds the results URL for a search filtered by maximum price.
+        """
+        params = {"_nkw": item_name, "_udhi": max_price}
+        if page > 1:
+            params["_pgn"] = page
+        return f"{self.base_url}/sch/i.html?{urlencode(params)}"
+
+    def fetch_page(self, url):
+        """
+        Fetches and parses one results page.
+
+        Returns:
+            tuple: (items, next_page_url) where items has the shape of SearchResultsPage.extract_items
+        """
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        parser = _ResultCardParser(response.url)
+        parser.feed(response.text)
+        parser.close()
+        return parser.items, parser.next_page_url
+
+    def search_items(self, item_name, max_price, limit=5, max_pages=5):
+        """
+        Returns organic items under max_price, following result pages until limit is met.
+
+        Returns:
+            list: Items in the shape of SearchResultsPage.extract_items
+        """
+        found = {}
+        url = self.build_search_url(item_name, max_price)
+        for page_number in range(1, max_pages + 1):
+            if not url or len(found) >= limit:
+                break
+            items, url = self.fetch_page(url)
+            print(f"Results page {page_number}: {len(items)} cards")
+            for item in items:
+                if not item["sponsored"] and item["url"] and item["url"] not in found:
+                    found[item["url"]] = item
+        return list(found.values())[:limit]
+
+    def search_item_urls(self, item_name, max_price, limit=5, max_pages=5):
+        """
+        Returns the URLs of organic items under max_price, following result pages until limit is met.
+        """
+        return [item["url"] for item in self.search_items(item_name, max_price, limit, max_pages)]
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,31 @@
+import json
+import os
+import tempfile
+
+
+def read_json(file_path, default=None):
+    """
+    Returns the content of a JSON file, or default when it is missing or unreadable.
+    """
+    try:
+        with open(file_path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
+
+
+def write_json_atomic(file_path, data, indent=2):
+    """
+    Replaces a JSON file in one step, so a concurrent reader never sees a partial file.
+    Every call writes its own temp file next to the target, so concurrent writers do not collide.
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(file_path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=indent)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
@@ -0,0 +1,117 @@
+import atexit
+import threading
+
+from json_files import read_json, write_json_atomic
+
+# Hit counts of multi-candidate locators, persisted between runs
+LOCATOR_STATS_FILE = ".locator_stats.json"
+
+# Shared by the in-page lookups: isVisible(el) and query(by, value) for Selenium's By strategies
+QUERY_FUNCTIONS = """
+var isVisible = function (el) {
+    var style = window.getComputedStyle(el);
+    return style.visibility !== 'hidden' && style.display !== 'none' &&
+        !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+};
+var query = function (by, value) {
+    switch (by) {
+        case 'id': return [document.getElementById(value)].filter(Boolean);
+        case 'name': return Array.from(document.getElementsByName(value));
+        case 'class name': return Array.from(document.getElementsByClassName(value));
+        case 'link text': return Array.from(document.links).filter(function (a) { return a.textContent.trim() === value; });
+        case 'xpath':
+            var snapshot = document.evaluate(value, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            var nodes = [];
+            for (var i = 0; i < snapshot.snapshotLength; i++) { nodes.push(snapshot.snapshotItem(i)); }
+            return nodes;
+        default: return Array.from(document.querySelectorAll(value));
+    }
+};
+"""
+
+# Evaluates candidates in order and returns [index, element] for the first match.
+# arguments: list of [by, value] pairs, whether the match must be visible
+FIND_FIRST_SCRIPT = QUERY_FUNCTIONS + """
+var candidates = arguments[0], mustBeVisible = arguments[1];
+for (var i = 0; i < candidates.length; i++) {
+    var matches = query(candidates[i][0], candidates[i][1]);
+    for (var j = 0; j < matches.length; j++) {
+        if (!mustBeVisible || isVisible(matches[j])) { return [i, matches[j]]; }
+    }
+}
+return null;
+"""
+
+
+class LocatorStats:
+    """
+    Counts which candidate of each MultiLocator matched, so the usual winner is tried first.
+    """
+
+    def __init__(self, file_path=LOCATOR_STATS_FILE):
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        # Hits recorded by this process since the last save, added to the file's counts on save
+        self._new_hits = {}
+        self.hits = read_json(file_path, {})
+
+    def record_hit(self, locator_name, candidate):
+        key = f"{candidate[0]}={candidate[1]}"
+        with self._lock:
+            for hits in (self.hits, self._new_hits):
+                counts = hits.setdefault(locator_name, {})
+                counts[key] = counts.get(key, 0) + 1
+
+    def hit_count(self, locator_name, candidate):
+        return self.hits.get(locator_name, {}).get(f"{candidate[0]}={candidate[1]}", 0)
+
+    def save(self):
+        """
+        Adds this process's new hits to the counts in the file, so parallel workers' hits are kept.
+        """
+        with self._lock:
+            if not self._new_hits:
+                return
+            hits = read_json(self.file_path, {})
+            for locator_name, new_counts in self._new_hits.items():
+                counts = hits.setdefault(locator_name, {})
+                for key, count in new_counts.items():
+                    counts[key] = counts.get(key, 0) + count
+            write_json_atomic(self.file_path, hits)
+            self.hits = hits
+            self._new_hits = {}
+
+
+LOCATOR_STATS = LocatorStats()
+atexit.register(LOCATOR_STATS.save)
+
+
+class MultiLocator:
+    """
+    A ranked list of (By, value) candidates that all describe the same element.
+
+    BasePage resolves it with one in-page query and learns which candidate wins.
+    """
+
+    def __init__(self, name, *candidates):
+        """
+        Args:
+            name: Unique key under which hit statistics are stored, e.g. "cart.total"
+            candidates: (By, value) tuples, most likely first
+        """
+        if not candidates:
+            raise ValueError(f"Locator '{name}' needs at least one candidate")
+        self.name = name
+        self.candidates = list(candidates)
+
+    def ordered_candidates(self, stats=LOCATOR_STATS):
+        """
+        Candidates with the most historical hits first, ties keep the declared order.
+        """
+        ranked = sorted(enumerate(self.candidates),
+                        key=lambda pair: (-stats.hit_count(self.name, pair[1]), pair[0]))
+        return [candidate for _, candidate in ranked]
+
+    def __repr__(self):
+        return f"MultiLocator({self.name!r}, {len(self.candidates)} candidates)"
+
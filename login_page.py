@@ -1,45 +1,108 @@
+from urllib.parse import urlsplit
 from selenium.webdriver.common.by import By
 from base_page import BasePage
-import time
+from locators import MultiLocator
+from composite_actions import CompositeAction
+from timeline import traced
+
+# Dumps both web storages of the current origin
+_READ_STORAGE_SCRIPT = """
+return [Object.assign({}, window.localStorage), Object.assign({}, window.sessionStorage)];
+"""
+
+# arguments: localStorage items, sessionStorage items
+_WRITE_STORAGE_SCRIPT = """
+var local = arguments[0], session = arguments[1];
+Object.keys(local).forEach(function (key) { window.localStorage.setItem(key, local[key]); });
+Object.keys(session).forEach(function (key) { window.sessionStorage.setItem(key, session[key]); });
+"""
 
 class LoginPage(BasePage):
     # Locators
-    SIGN_IN_LINK = (By.LINK_TEXT, "Sign in")
-    USERNAME_FIELD = (By.ID, "userid")
-    CONTINUE_BUTTON = (By.ID, "signin-continue-btn")
-    PASSWORD_FIELD = (By.ID, "pass")
-    SIGN_IN_BUTTON = (By.ID, "sgnBt")
+    SIGN_IN_LINK = MultiLocator("login.sign_in_link",
+                                (By.LINK_TEXT, "Sign in"),
+                                (By.CSS_SELECTOR, "a[href*='signin.ebay.com']"))
+    USERNAME_FIELD = MultiLocator("login.username",
+                                  (By.ID, "userid"),
+                                  (By.CSS_SELECTOR, "input[name='userid']"),
+                                  (By.CSS_SELECTOR, "input[autocomplete='username']"))
+    CONTINUE_BUTTON = MultiLocator("login.continue_button",
+                                   (By.ID, "signin-continue-btn"),
+                                   (By.CSS_SELECTOR, "button[name='signin-continue-btn']"))
+    PASSWORD_FIELD = MultiLocator("login.password",
+                                  (By.ID, "pass"),
+                                  (By.CSS_SELECTOR, "input[type='password']"))
+    SIGN_IN_BUTTON = MultiLocator("login.sign_in_button",
+                                  (By.ID, "sgnBt"),
+                                  (By.CSS_SELECTOR, "button[name='sgnBt']"))
     USER_MENU = (By.ID, "gh-ug")
+
+    PATH = "/"
     
-    def __init__(self, driver):
+    def __init__(self, driver, session_cache=None):
+        """
+        Args:
+            driver: The WebDriver to log in with
+            session_cache: Optional SessionCache used to skip the interactive sign-in
+        """
         super().__init__(driver)
-        self.driver.get("https://www.ebay.com/")
-        
+        self.session_cache = session_cache
+
+    def is_loaded(self):
+        """
+        Sign-in starts from the header of any page on the main host,
+        which is also the origin the cached web storage belongs to.
+        """
+        return urlsplit(self.driver.current_url).netloc == urlsplit(self.URL).netloc
+
+    @traced("login")
     def login(self, username, password):
         """
         Attempt to log in with the provided credentials.
+        A cached session is restored first when available, the interactive
+        sign-in only runs when there is none or it is rejected.
         Returns True if login was successful, False otherwise.
         """
+        self.ensure_loaded()
+        # A reused browser may still be signed in to another scenario's account
+        signed_in_as = getattr(self.driver, "signed_in_as", None)
+        if signed_in_as not in (None, username):
+            print(f"Signing out {signed_in_as} before logging in as {username}.")
+            self.driver.delete_all_cookies()
+            self.driver.refresh()
+            self.driver.signed_in_as = None
+        if self.restore_session(username):
+            print("Logged in from cached session.")
+            self.driver.signed_in_as = username
+            return True
+
         try:
             # Click sign in link
-            self.do_click(self.SIGN_IN_LINK)
-            
-            # Enter username and continue
-            self.do_send_keys(self.USERNAME_FIELD, username)
-            self.do_click(self.CONTINUE_BUTTON)
-            
-            # Wait for password field and enter password
-            time.sleep(2)  # Wait for page transition
-            self.do_send_keys(self.PASSWORD_FIELD, password)
-            self.do_click(self.SIGN_IN_BUTTON)
+            self.perform(CompositeAction("open sign in").click(self.SIGN_IN_LINK))
+
+            # The sign-in form watches for synthetic input, so the fields are typed and submitted natively;
+            # each step still only costs one lookup script plus the input command itself
+            self.perform(CompositeAction("enter username")
+                         .fill(self.USERNAME_FIELD, username, native=True)
+                         .click(self.CONTINUE_BUTTON, native=True))
+
+            # The password step becomes interactive after the username is accepted
+            sign_in_url = self.driver.current_url
+            self.perform(CompositeAction("enter password")
+                         .fill(self.PASSWORD_FIELD, password, native=True)
+                         .click(self.SIGN_IN_BUTTON, native=True))
             
-            # Verify login was successful
-            time.sleep(2)  # Wait for page to load
-            return self.is_logged_in()
+            # Verify login was successful once we have left the sign-in page
+            self.wait_for_url_change(sign_in_url)
+            logged_in = self.is_logged_in()
+            if logged_in:
+                self.save_session(username)
+                self.driver.signed_in_as = username
+            return logged_in
             
         except Exception as e:
             print(f"Login error: {str(e)}")
-            self.driver.get("https://www.ebay.com/")
+            self.open(self.URL)
             return False
             
     def is_logged_in(self):
@@ -48,3 +111,54 @@ class LoginPage(BasePage):
             return self.get_element(self.USER_MENU).is_displayed()
         except:
             return False
+
+    def _has_user_menu(self):
+        """Cheap login check: a single script call, no waiting."""
+        return self.driver.execute_script("return !!document.getElementById(arguments[0]);", self.USER_MENU[1])
+
+    def restore_session(self, username):
+        """
+        Loads the cached session for username into the browser.
+        Returns True if the restored session is logged in, False otherwise.
+        """
+        if self.session_cache is None:
+            return False
+        session = self.session_cache.load(username)
+        if not session:
+            return False
+
+        try:
+            for cookie in session["cookies"]:
+                try:
+                    self.driver.add_cookie(cookie)
+                except Exception:
+                    # Cookies of other eBay hosts cannot be set from the home page
+                    continue
+            self.driver.execute_script(_WRITE_STORAGE_SCRIPT, session["local_storage"], session["session_storage"])
+            self.driver.refresh()
+        except Exception as e:
+            print(f"Could not restore cached session: {e}")
+            return False
+
+        if self._has_user_menu():
+            return True
+        print("Cached session was rejected, invalidating it.")
+        self.invalidate_session(username)
+        self.driver.delete_all_cookies()
+        self.driver.refresh()
+        return False
+
+    def save_session(self, username):
+        """Stores the current browser session in the session cache."""
+        if self.session_cache is None:
+            return
+        try:
+            local_storage, session_storage = self.driver.execute_script(_READ_STORAGE_SCRIPT)
+            self.session_cache.save(username, self.driver.get_cookies(), local_storage, session_storage)
+        except Exception as e:
+            print(f"Could not cache session: {e}")
+
+    def invalidate_session(self, username):
+        """Drops the cached session, forcing the next login to be interactive."""
+        if self.session_cache is not None:
+            self.session_cache.invalidate(username)
@@ -0,0 +1,111 @@
+import time
+
+from base_page import install_network_tracker
+
+# [url, readyState, ms from navigation start until the page finished loading (0 while loading)]
+_LOAD_STATE_SCRIPT = """
+var entry = performance.getEntriesByType('navigation')[0];
+return [window.location.href, document.readyState, entry ? (entry.loadEventEnd || entry.domContentLoadedEventEnd) : 0];
+"""
+
+
+class TabPrefetcher:
+    """
+    Loads upcoming product pages in background tabs of the same session.
+
+    While item N is being worked on in its tab, the tabs of the next `depth` items are
+    already loading. Each tab is closed once its item is done, so at most depth + 1
+    product tabs are open next to the main tab.
+    """
+
+    def __init__(self, driver, urls, depth=2):
+        """
+        Args:
+            driver: The WebDriver whose session opens the tabs
+            urls: Product URLs, in the order they are processed
+            depth: Number of items loaded ahead of the current one
+        """
+        self.driver = driver
+        self.urls = list(urls)
+        self.depth = depth
+        self.main_handle = driver.current_window_handle
+        self.tabs = {}
+        self.stats = {"items": 0, "load_seconds": 0.0, "hidden_seconds": 0.0}
+
+    def _open(self, index):
+        """
+        Opens a tab for urls[index] and starts loading it without waiting, then switches back.
+        """
+        current = self.driver.current_window_handle
+        self.driver.switch_to.new_window('tab')
+        handle = self.driver.current_window_handle
+        # DevTools request blocking is per tab, apply the driver's load profile to the new one
+        patterns = getattr(self.driver, "load_profile", {}).get("blocked_url_patterns")
+        if patterns:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+        # So is the injected network tracker
+        install_network_tracker(self.driver)
+        self.driver.execute_script("window.location.href = arguments[0];", self.urls[index])
+        self.tabs[index] = {"handle": handle, "opened": time.monotonic()}
+        self.driver.switch_to.window(current)
+
+    def activate(self, index):
+        """
+        Switches to the tab of urls[index] (0-based) and starts loading the next depth items.
+
+        Returns:
+            float: Seconds of this page's load that happened before it was needed
+        """
+        if index not in self.tabs:
+            self._open(index)
+        for ahead in range(index + 1, min(index + 1 + self.depth, len(self.urls))):
+            if ahead not in self.tabs:
+                self._open(ahead)
+
+        tab = self.tabs[index]
+        self.driver.switch_to.window(tab["handle"])
+        url, ready_state, load_ms = self.driver.execute_script(_LOAD_STATE_SCRIPT)
+        waited = time.monotonic() - tab["opened"]
+        if url == "about:blank":
+            # The navigation has not even started
+            hidden = 0.0
+        elif ready_state == "complete" and load_ms:
+            hidden = min(load_ms / 1000, waited)
+            self.stats["load_seconds"] += load_ms / 1000
+        else:
+            hidden = waited
+        self.stats["items"] += 1
+        self.stats["hidden_seconds"] += hidden
+        print(f"Switched to prefetched tab for item {index + 1}, {hidden:.2f}s of its load was hidden")
+        return hidden
+
+    def finish(self, index):
+        """
+        Closes the tab of urls[index] and returns to the main tab.
+        """
+        tab = self.tabs.pop(index, None)
+        if tab is not None:
+            try:
+                self.driver.switch_to.window(tab["handle"])
+                self.driver.close()
+            except Exception as e:
+                print(f"Could not close tab of item {index + 1}: {e}")
+        self.driver.switch_to.window(self.main_handle)
+
+    def close(self):
+        """
+        Closes every remaining prefetch tab.
+        """
+        for index in list(self.tabs):
+            self.finish(index)
+
+    def format_stats(self):
+        """
+        Formats how much page load time the pipeline hid as a human readable report.
+        """
+        stats = self.stats
+        return (f"Items loaded in background tabs: {stats['items']}\n"
+                f"Prefetch depth: {self.depth}\n"
+                f"Measured page load time: {stats['load_seconds']:.2f}s\n"
+                f"Load time hidden by prefetching: {stats['hidden_seconds']:.2f}s")
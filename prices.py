@@ -0,0 +1,196 @@
+import re
+from collections import Counter
+
+# Optional currency code or prefix (e.g. "ILS", "US", "C"), optional symbol, then the amount
+_PRICE = re.compile(r"(?:\b([A-Z]{1,3})\s?)?([$€£])?\s*(\d[\d,]*(?:\.\d+)?)")
+
+# Symbols, alone or after a country prefix, mapped to currency codes
+_SYMBOLS = {
+    ("", "$"): "USD", ("US", "$"): "USD", ("C", "$"): "CAD", ("AU", "$"): "AUD",
+    ("", "€"): "EUR", ("", "£"): "GBP",
+}
+
+_FREE_SHIPPING = re.compile(r"\bfree\b", re.IGNORECASE)
+
+
+def _currency(prefix, symbol):
+    if not symbol:
+        return prefix or ""
+    return _SYMBOLS.get((prefix or "", symbol), (prefix or "") + symbol)
+
+
+def parse_prices(text):
+    """
+    Returns every (currency, amount) pair in a displayed text, e.g. both ends of "ILS 30.00 to ILS 55.00".
+    Symbols become currency codes ("$" and "US $" are "USD"), a missing currency is "".
+    """
+    return [(_currency(prefix, symbol), float(amount.replace(",", "")))
+            for prefix, symbol, amount in _PRICE.findall(text or "")]
+
+
+def parse_price(text):
+    """
+    Splits a displayed price such as "ILS 1,045.00" into ("ILS", 1045.0).
+
+    Returns:
+        tuple: (currency or "", amount), or None if text holds no number
+    """
+    prices = parse_prices(text)
+    return prices[0] if prices else None
+
+
+def parse_price_range(text):
+    """
+    Splits a displayed price or price range such as "ILS 30.00 to ILS 55.00" into ("ILS", 30.0, 55.0).
+    A single price is a range from itself to itself.
+
+    Returns:
+        tuple: (currency, low, high), or None if text holds no number or mixes currencies
+    """
+    prices = parse_prices(text)
+    if not prices:
+        return None
+    currencies = {currency for currency, _ in prices if currency}
+    if len(currencies) > 1:
+        return None
+    amounts = [amount for _, amount in prices]
+    return (currencies.pop() if currencies else ""), min(amounts), max(amounts)
+
+
+def parse_shipping(text):
+    """
+    Reads a card's shipping line: "Free delivery" is ("", 0.0), "+ILS 12.50 delivery" is ("ILS", 12.5).
+
+    Returns:
+        tuple: (currency, amount), or None if the cost is not shown
+    """
+    if _FREE_SHIPPING.search(text or ""):
+        return "", 0.0
+    return parse_price(text)
+
+
+def quote_item(item):
+    """
+    Turns the price and shipping texts of a result card (see SearchResultsPage.extract_items)
+    into numbers.
+
+    Returns:
+        dict: currency, low, high (None when the price is unknown) and shipping (None when not shown)
+    """
+    price = parse_price_range(item.get("price"))
+    shipping = parse_shipping(item.get("shipping"))
+    currency, low, high = price if price else (None, None, None)
+    if shipping and shipping[0] and currency and shipping[0] != currency:
+        # Shipping quoted in another currency cannot be added up
+        shipping = None
+    return {"currency": currency, "low": low, "high": high, "shipping": shipping[1] if shipping else None}
+
+
+class BudgetScreen:
+    """
+    Prefilters and ranks search results against the budget before any product page is opened.
+
+    A card whose lowest price is over the per-item budget is rejected. The others are ranked:
+    cards entirely within the budget first, then price ranges whose dearer variants are over
+    it, then cards whose price cannot be compared; eBay's order is kept within each group.
+    """
+    WITHIN, PARTLY_OVER, UNKNOWN = range(3)
+
+    def __init__(self, max_price, total_budget=None, currency=None, include_shipping=False):
+        """
+        Args:
+            max_price: Budget for one item
+            total_budget: Budget for all items, items alone above it are rejected too (None: no limit)
+            currency: Currency of the budget (default: the most common currency among the cards)
+            include_shipping: Count the shipping shown on the card as part of an item's cost
+        """
+        self.max_price = float(max_price)
+        self.total_budget = None if total_budget is None else float(total_budget)
+        self.currency = currency
+        self.include_shipping = include_shipping
+        self.rejected = []
+        self.screened = 0
+        # Cards seen per currency, the budget is in the most common one unless currency is set
+        self.card_currencies = Counter()
+
+    @property
+    def budget_currency(self):
+        if self.currency or not self.card_currencies:
+            return self.currency
+        return self.card_currencies.most_common(1)[0][0]
+
+    @property
+    def item_budget(self):
+        if self.total_budget is None:
+            return self.max_price
+        return min(self.max_price, self.total_budget)
+
+    def cost(self, item, end):
+        """
+        The card's "low" or "high" price, plus its shipping when include_shipping is set.
+        """
+        quote = item["quote"]
+        shipping = quote["shipping"] if self.include_shipping and quote["shipping"] else 0.0
+        return quote[end] + shipping
+
+    def tier(self, item):
+        """
+        Returns WITHIN, PARTLY_OVER or UNKNOWN for a card with a "quote" (see quote_item).
+        """
+        quote = item["quote"]
+        currency = self.budget_currency
+        if quote["low"] is None or (quote["currency"] and currency and quote["currency"] != currency):
+            return self.UNKNOWN
+        return self.WITHIN if self.cost(item, "high") <= self.item_budget else self.PARTLY_OVER
+
+    def accept(self, item):
+        """
+        Quotes a card (stored as item["quote"]) and returns False if it is over the per-item budget.
+        """
+        self.screened += 1
+        item["quote"] = quote = quote_item(item)
+        if quote["currency"]:
+            self.card_currencies[quote["currency"]] += 1
+        if self.is_over_budget(item):
+            self.rejected.append(item)
+            print(f"Skipping {item['url']}: {item['price']} {item['shipping']} is over the budget of "
+                  f"{self.item_budget:.2f}")
+            return False
+        return True
+
+    def is_over_budget(self, item):
+        return self.tier(item) != self.UNKNOWN and self.cost(item, "low") > self.item_budget
+
+    def worst_case(self, item):
+        """
+        The most the item can cost, None if that is unknown.
+        """
+        return None if self.tier(item) == self.UNKNOWN else self.cost(item, "high")
+
+    def rank(self, items, slots=None):
+        """
+        Orders accepted cards by tier. If the first `slots` of them could cost more than the
+        total budget at worst, the cheapest cards are put first instead.
+
+        The budget currency may have changed since a card was accepted, cards it now puts over
+        the budget are rejected here.
+        """
+        for item in items:
+            if self.is_over_budget(item) and all(item is not rejected for rejected in self.rejected):
+                self.rejected.append(item)
+        ranked = sorted((item for item in items if not self.is_over_budget(item)), key=self.tier)
+        if self.total_budget is not None and slots:
+            costs = [self.worst_case(item) for item in ranked[:slots]]
+            if None not in costs and sum(costs) > self.total_budget:
+                ranked = sorted(ranked, key=lambda item: (self.worst_case(item) is None, self.worst_case(item) or 0.0))
+        return ranked
+
+    def format_report(self):
+        """
+        Formats the screening result as a human readable report.
+        """
+        lines = [f"Cards screened: {self.screened}",
+                 f"Rejected before opening: {len(self.rejected)}",
+                 f"Budget per item: {self.item_budget:.2f} {self.budget_currency or ''}".rstrip()]
+        lines.extend(f"  {item['price']} {item['shipping']} {item['url']}" for item in self.rejected)
+        return "\n".join(lines)
@@ -1,73 +1,303 @@
 
-import time
-import allure
+import re
+import threading
+from urllib.parse import urlsplit
+
+from selenium.common.exceptions import (ElementClickInterceptedException, StaleElementReferenceException,
+                                        TimeoutException)
 from selenium.webdriver.common.by import By
-from selenium.common.exceptions import TimeoutException
-from base_page import BasePage
+from selenium.webdriver.support import expected_conditions as EC
+from base_page import BasePage, same_page
+from json_files import read_json, write_json_atomic
+from locators import LOCATOR_STATS, MultiLocator
+from prices import parse_price, parse_shipping
+from timeline import traced
+
+# Variant combinations chosen per listing, persisted between runs
+VARIANT_CACHE_FILE = ".variant_cache.json"
+
+_LISTING_ID = re.compile(r"/itm/(?:[^/]+/)?(\d+)")
+
+# Selects one option in every variant dropdown, run with execute_async_script.
+# arguments: CSS selectors for the dropdown buttons (first one that matches wins), cached option texts or null.
+# After each choice the script yields until the page has applied it (option selected, DOM quiet for 100 ms,
+# at most 2 s), and the next dropdown is looked up again, so options an earlier choice re-rendered or
+# disabled are seen as such.
+# Returns {selector: index of the matching selector, chosen: [{label, option, applied}]} or null without dropdowns.
+_SELECT_VARIANTS_SCRIPT = """
+var selectors = arguments[0], preferred = arguments[1] || [], done = arguments[arguments.length - 1];
+var selector = -1, found = 0;
+for (var s = 0; s < selectors.length && !found; s++) {
+    found = document.querySelectorAll(selectors[s]).length;
+    selector = s;
+}
+if (!found) { done(null); return; }
+var isSelectable = function (option) {
+    return option.getAttribute('aria-disabled') !== 'true' && !/out of stock/i.test(option.textContent);
+};
+var lastChange = performance.now();
+var observer = new MutationObserver(function () { lastChange = performance.now(); });
+observer.observe(document.body, {childList: true, subtree: true, attributes: true, characterData: true});
+var chosen = [];
+var settle = function (option, next) {
+    var start = performance.now();
+    var poll = function () {
+        var now = performance.now();
+        var applied = !option.isConnected || option.getAttribute('aria-selected') === 'true';
+        if ((applied && now - lastChange >= 100) || now - start >= 2000) {
+            chosen[chosen.length - 1].applied = applied;
+            next();
+        } else {
+            setTimeout(poll, 50);
+        }
+    };
+    setTimeout(poll, 0);
+};
+var step = function (i) {
+    var button = document.querySelectorAll(selectors[selector])[i];
+    if (!button) {
+        observer.disconnect();
+        done({selector: selector, chosen: chosen});
+        return;
+    }
+    var label = (button.getAttribute('aria-label') || button.textContent).trim();
+    var listbox = document.getElementById(button.getAttribute('aria-controls'));
+    if (!listbox) {
+        chosen.push({label: label, option: null, applied: false});
+        step(i + 1);
+        return;
+    }
+    button.click();
+    // The first option is the "Select" placeholder
+    var options = Array.from(listbox.querySelectorAll('div.listbox__option')).slice(1).filter(isSelectable);
+    var option = options.filter(function (o) { return o.textContent.trim() === preferred[i]; })[0] || options[0];
+    if (!option) {
+        chosen.push({label: label, option: null, applied: false});
+        step(i + 1);
+        return;
+    }
+    option.click();
+    chosen.push({label: label, option: option.textContent.trim(), applied: false});
+    settle(option, function () { step(i + 1); });
+};
+step(0);
+"""
+
+# True once the product's variant dropdowns or add to cart control are rendered
+_PRODUCT_CONTROLS_SCRIPT = """
+return [arguments[0]].concat(arguments[1]).some(function (selector) { return !!document.querySelector(selector); });
+"""
+
+# True once the element matching the CSS selector exists and is not disabled
+_CONTROL_ENABLED_SCRIPT = """
+var el = document.querySelector(arguments[0]);
+return !!el && !el.disabled && el.getAttribute('aria-disabled') !== 'true' && !/\\bbtn--disabled\\b/.test(el.className);
+"""
+
+# Texts of the first elements matching each CSS selector, null where nothing matches
+_TEXTS_SCRIPT = """
+return Array.from(arguments).map(function (selector) {
+    var el = document.querySelector(selector);
+    return el ? el.textContent.trim() : null;
+});
+"""
+
+
+class PriceAboveBudget(Exception):
+    """
+    Raised instead of adding an item whose selected variant costs more than the budget.
+    """
+
+
+class VariantCache:
+    """
+    Remembers the variant options that could be added to the cart for each listing.
+    """
+
+    def __init__(self, file_path=VARIANT_CACHE_FILE):
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        self.combinations = self._read()
+
+    def _read(self):
+        return read_json(self.file_path, {})
+
+    def get(self, listing_id):
+        return self.combinations.get(listing_id)
+
+    def store(self, listing_id, options):
+        """
+        Records a listing's combination, written right away so pool processes share it too.
+        """
+        with self._lock:
+            if self.combinations.get(listing_id) == options:
+                return
+            self.combinations[listing_id] = options
+            write_json_atomic(self.file_path, {**self._read(), listing_id: options})
+
+
+VARIANT_CACHE = VariantCache()
+
 
 class ProductPage(BasePage):
     # Locators
-    DROPDOWN_BUTTONS = (By.CSS_SELECTOR, "div.x-msku-evo button.listbox-button__control")
-    ADD_TO_CART_BUTTON = (By.CSS_SELECTOR, "a[href*='https://cart.payments.ebay.com/sc/add']")
+    DROPDOWN_BUTTONS = MultiLocator("product.variant_dropdowns",
+                                    (By.CSS_SELECTOR, "div.x-msku-evo button.listbox-button__control"),
+                                    (By.CSS_SELECTOR, "div.x-msku-evo button[aria-haspopup='listbox']"))
+    ADD_TO_CART_BUTTON = (By.CSS_SELECTOR, "a[href*='cart.payments.ebay.com/sc/add']")
+    PRICE = (By.CSS_SELECTOR, ".x-price-primary")
+    SHIPPING = (By.CSS_SELECTOR, "div.d-shipping-minview .ux-labels-values__values, "
+                                 ".ux-labels-values--shipping .ux-labels-values__values")
 
-    def __init__(self, driver, url):
+    def __init__(self, driver, url, max_price=None, include_shipping=False, currency=None):
+        """
+        Args:
+            driver: The WebDriver showing the product
+            url: The product's listing URL
+            max_price: If set, the item is not added when its selected variant costs more
+            include_shipping: Add the shipping shown on the page to the price compared with max_price
+            currency: Currency of max_price, a price shown in another one is not compared (None: any)
+        """
         super().__init__(driver)
-        self.driver.get(url)
-        print(f"\n--- Navigated to Product Page ---")
-        print(f"URL: {url}")
+        self.URL = url
+        self.max_price = None if max_price is None else float(max_price)
+        self.include_shipping = include_shipping
+        self.currency = currency
+        # Set once the add to cart click went through, from then on the item may be in the cart
+        self.add_clicked = False
+
+    def is_loaded(self):
+        """
+        Product URLs carry tracking parameters, so only the listing path is compared.
+        """
+        return same_page(self.driver.current_url, self.URL)
 
+    @property
+    def listing_id(self):
+        match = _LISTING_ID.search(urlsplit(self.URL).path)
+        return match.group(1) if match else self.URL
+
+    @traced("select variants")
     def _select_variants(self):
         """
-        Private method to find and select options from all variant dropdowns.
+        Private method to pick an in-stock option in every variant dropdown.
+        Reading the dropdowns, choosing and selecting all happen in one asynchronous script call,
+        which lets the page apply each choice before the next dropdown is read.
+
+        Returns:
+            list: The options chosen, or None if the listing has no dropdowns or a dropdown had no option
         """
-        try:
-            dropdown_buttons = self.get_elements(self.DROPDOWN_BUTTONS)
-            if not dropdown_buttons:
-                print("No variant dropdowns found.")
-                return
+        listing_id = self.listing_id
+        candidates = self.DROPDOWN_BUTTONS.ordered_candidates()
+        selectors = [value for _, value in candidates]
+        # With the "eager" page load strategy the controls may not be rendered yet
+        self.wait_for("product controls rendered",
+                      lambda driver: driver.execute_script(_PRODUCT_CONTROLS_SCRIPT, self.ADD_TO_CART_BUTTON[1],
+                                                           selectors),
+                      message="Neither variant dropdowns nor the add to cart control were rendered")
+        with self.timeline.span("select variants script", kind="script"):
+            result = self.driver.execute_async_script(_SELECT_VARIANTS_SCRIPT, selectors, VARIANT_CACHE.get(listing_id))
+        if result is None:
+            print("No variant dropdowns found.")
+            return None
+        LOCATOR_STATS.record_hit(self.DROPDOWN_BUTTONS.name, candidates[result["selector"]])
 
-            print(f"Found {len(dropdown_buttons)} variant dropdowns.")
-
-            for i in range(len(dropdown_buttons)):
-                all_buttons = self.get_elements(self.DROPDOWN_BUTTONS)
-                button_to_click = all_buttons[i]
-                
-                options_container_id = button_to_click.get_attribute("aria-controls")
-                self.execute_script("arguments[0].click();", button_to_click)
-                
-                options_container_locator = (By.ID, options_container_id)
-                options_container = self.get_element(options_container_locator)
-                options_selector = (By.CSS_SELECTOR, "div.listbox__option:not([aria-disabled='true'])")
-                options = options_container.find_elements(options_selector[0], options_selector[1])
-
-                if len(options) > 1:
-                    second_option = options[1]
-                    print(f"Selecting option: '{second_option.text.strip()}'")
-                    self.execute_script("arguments[0].click();", second_option)
-                else:
-                    print("No selectable options were found in this dropdown.")
-                
-                time.sleep(2)
-
-        except TimeoutException:
-            print("Timeout while looking for variant dropdowns. Assuming no variants.")
+        print(f"Found {len(result['chosen'])} variant dropdowns.")
+        for choice in result["chosen"]:
+            if choice["option"] is None:
+                print(f"No selectable options were found in dropdown '{choice['label']}'.")
+            else:
+                print(f"Selecting option: '{choice['option']}'")
+        unapplied = [choice["label"] for choice in result["chosen"]
+                     if choice["option"] is not None and not choice["applied"]]
+        if unapplied:
+            # Transient: the page's scripts were not ready to handle the choice yet
+            raise TimeoutException(f"The page did not apply the options chosen in {unapplied}")
+
+        # Selecting variants refreshes price and stock, the add to cart control is enabled once that is done
+        self.wait_for("add to cart enabled",
+                      lambda driver: driver.execute_script(_CONTROL_ENABLED_SCRIPT, self.ADD_TO_CART_BUTTON[1]),
+                      message="Add to cart stayed disabled after selecting variants")
+        if any(choice["option"] is None for choice in result["chosen"]):
+            return None
+        return [choice["option"] for choice in result["chosen"]]
+
+    def _confirm_price(self):
+        """
+        Reads the price shown for the selected variant, plus its shipping when include_shipping is set,
+        and raises PriceAboveBudget if it is over max_price.
+        A price that cannot be read or is shown in another currency than the budget is let through,
+        the cart check still guards the budget.
+        """
+        price_text, shipping_text = self.driver.execute_script(_TEXTS_SCRIPT, self.PRICE[1], self.SHIPPING[1])
+        price = parse_price(price_text)
+        if price is None:
+            print("Could not read the product price, adding without confirming it.")
+            return
+        currency, amount = price
+        if currency and self.currency and currency != self.currency:
+            # Like BudgetScreen.tier, amounts in different currencies are not compared
+            print(f"Product price is in {currency}, the budget in {self.currency}, adding without confirming it.")
+            return
+        label = "price"
+        if self.include_shipping:
+            shipping = parse_shipping(shipping_text)
+            if shipping is None or (shipping[0] and shipping[0] != currency):
+                print("Could not read the shipping cost in the price's currency, confirming the price alone.")
+            else:
+                amount += shipping[1]
+                label = "price with shipping"
+        if amount > self.max_price:
+            raise PriceAboveBudget(f"Selected variant's {label} is {currency} {amount:.2f}, "
+                                   f"over the budget of {self.max_price:.2f}")
+        print(f"Confirmed {label} {currency} {amount:.2f} is within the budget of {self.max_price:.2f}")
 
+    @traced("click add to cart")
     def _click_add_to_cart_button(self):
         """
         Private method to click the 'Add to Cart' button.
         """
         print("Attempting to add item to cart...")
-        self.do_click(self.ADD_TO_CART_BUTTON)
-        time.sleep(2)
+        product_url = self.driver.current_url
+        cart_count = self.get_cart_count()
+        with self.timeline.span("click", kind="click", locator=self.ADD_TO_CART_BUTTON):
+            button = self.wait.until(EC.element_to_be_clickable(self.ADD_TO_CART_BUTTON))
+            self.add_clicked = True
+            try:
+                button.click()
+            except (ElementClickInterceptedException, StaleElementReferenceException):
+                # The click did not reach the button, nothing was added
+                self.add_clicked = False
+                raise
+        # Adding either redirects to the cart or bumps the header cart badge in place
+        self.wait_for("item added to cart",
+                      EC.any_of(EC.url_changes(product_url),
+                                lambda driver: self.get_cart_count() != cart_count),
+                      message="Neither the URL nor the cart badge changed after adding to cart")
 
+    @traced("add item to cart")
     def add_item_to_cart(self, index_for_pic):
         """
         Public method to select product variants (if any) and add the item to the cart.
         """
         try:
-            self._select_variants()
+            if self.ensure_loaded():
+                print(f"\n--- Navigated to Product Page ---")
+            print(f"URL: {self.URL}")
+            self.timeline.record_browser_metrics(self.driver, self.URL)
+            options = self._select_variants()
+            if self.max_price is not None:
+                # One script call that saves adding an item the cart check would reject
+                self._confirm_price()
             self._click_add_to_cart_button()
-            time.sleep(2)
+            if options:
+                # Only a combination that made it into the cart is worth trying first next time
+                VARIANT_CACHE.store(self.listing_id, options)
+            try:
+                self.wait_for_network_idle()
+            except TimeoutException as e:
+                # The add is already confirmed, a long-lived request (beacon, polling) must not fail it
+                print(f"Network did not go idle after adding to cart, continuing: {e}")
             print("Successfully processed 'add to cart'.")
         except Exception as e:
             print(f"An error occurred while trying to add item to cart: {e}")
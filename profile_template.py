@@ -0,0 +1,144 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urljoin
+
+# Where the prewarmed Chrome profile is kept between runs
+PROFILE_TEMPLATE_DIR = ".profile_template"
+
+# Describes how a template was built, written last so a half built template is never used
+_META_FILE = "template.json"
+
+# Files that tie a profile to the Chrome process using it, never copied into a clone
+_LOCK_FILES = ("SingletonLock", "SingletonSocket", "SingletonCookie", "lockfile")
+
+# Clicks the accept button of the cookie consent and similar banners, returns how many were clicked
+_DISMISS_BANNERS_SCRIPT = """
+var clicked = 0;
+document.querySelectorAll('#gdpr-banner-accept, button[id*="consent"][id*="accept"], #onetrust-accept-btn-handler')
+    .forEach(function (button) { button.click(); clicked++; });
+return clicked;
+"""
+
+
+def _clone_tree(source, target):
+    """
+    Copies a directory tree, sharing the file blocks with the source (copy-on-write)
+    where the filesystem supports it: reflinks on Linux btrfs/xfs, clonefile on macOS APFS.
+    """
+    if sys.platform == "darwin":
+        command = ["cp", "-cR", source, target]
+    elif sys.platform.startswith("linux"):
+        command = ["cp", "-R", "--reflink=auto", source, target]
+    else:
+        command = None
+    if command and subprocess.run(command, capture_output=True).returncode == 0:
+        for name in _LOCK_FILES:
+            path = os.path.join(target, name)
+            if os.path.lexists(path):
+                os.remove(path)
+        return
+    shutil.rmtree(target, ignore_errors=True)
+    shutil.copytree(source, target, symlinks=True, ignore=shutil.ignore_patterns(*_LOCK_FILES))
+
+
+def clone_profile(template_dir):
+    """
+    Copies a built template into a new temporary profile directory for one browser.
+
+    Returns:
+        str: The profile directory, owned by the caller
+    """
+    profile_dir = os.path.join(tempfile.mkdtemp(prefix="ebay-profile-"), "profile")
+    start = time.monotonic()
+    _clone_tree(template_dir, profile_dir)
+    print(f"Cloned browser profile template in {time.monotonic() - start:.2f}s")
+    return profile_dir
+
+
+class ProfileTemplate:
+    """
+    A Chrome profile prepared once and cloned for every browser: its HTTP cache already holds
+    eBay's static assets and the cookie consent banner is already dismissed.
+    """
+
+    def __init__(self, template_dir=PROFILE_TEMPLATE_DIR, max_age_seconds=24 * 60 * 60):
+        """
+        Args:
+            template_dir: Where the template profile is kept
+            max_age_seconds: Age after which the template is built again, so its cache follows site updates
+        """
+        self.template_dir = template_dir
+        self.max_age_seconds = max_age_seconds
+
+    def _read_meta(self):
+        try:
+            with open(os.path.join(self.template_dir, _META_FILE), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def is_fresh(self, base_url, block_resources=()):
+        """
+        Returns True if the template was built for this site and load profile within max_age_seconds.
+        """
+        meta = self._read_meta()
+        return (meta is not None and meta["base_url"] == base_url
+                and meta["block_resources"] == sorted(block_resources)
+                and time.time() - meta["built"] < self.max_age_seconds)
+
+    def ensure(self, base_url, block_resources=(), page_load_strategy="normal", warm_paths=("/",)):
+        """
+        Builds the template unless a fresh one exists.
+
+        Returns:
+            str: The template directory, to be passed to create_driver(profile_template=...)
+        """
+        if not self.is_fresh(base_url, block_resources):
+            self.build(base_url, block_resources, page_load_strategy, warm_paths)
+        return self.template_dir
+
+    def build(self, base_url, block_resources=(), page_load_strategy="normal", warm_paths=("/",)):
+        """
+        Visits warm_paths in a browser using a new profile, dismisses the consent banners
+        and replaces the template with that profile once the browser has quit.
+        """
+        # Imported here, driver_factory imports clone_profile from this module
+        from driver_factory import create_driver
+
+        start = time.monotonic()
+        building_dir = tempfile.mkdtemp(prefix=".profile_template-",
+                                        dir=os.path.dirname(os.path.abspath(self.template_dir)))
+        try:
+            driver = create_driver(block_resources, page_load_strategy, user_data_dir=building_dir)
+            try:
+                for path in warm_paths:
+                    driver.get(urljoin(base_url, path))
+                    # The banners are injected after load, give them a moment to show up
+                    deadline = time.monotonic() + 3
+                    while time.monotonic() < deadline:
+                        if driver.execute_script(_DISMISS_BANNERS_SCRIPT):
+                            print(f"Dismissed the consent banner on {path}")
+                            break
+                        time.sleep(0.25)
+            finally:
+                # Quitting flushes the cookies and the HTTP cache to the profile
+                driver.quit()
+        except Exception:
+            shutil.rmtree(building_dir, ignore_errors=True)
+            raise
+
+        with open(os.path.join(building_dir, _META_FILE), 'w') as f:
+            json.dump({"base_url": base_url, "block_resources": sorted(block_resources), "built": time.time()}, f)
+        old_dir = None
+        if os.path.exists(self.template_dir):
+            old_dir = self.template_dir + f".old-{os.getpid()}"
+            os.rename(self.template_dir, old_dir)
+        os.rename(building_dir, self.template_dir)
+        if old_dir:
+            shutil.rmtree(old_dir, ignore_errors=True)
+        print(f"Built browser profile template in {time.monotonic() - start:.2f}s")
@@ -0,0 +1,497 @@
+import functools
+import hashlib
+import html
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+from selenium.webdriver.remote.command import Command
+
+from base_page import rebase_urls
+from json_files import write_json_atomic
+from prices import parse_price
+
+# Recordings are described by this file inside the recording directory
+INDEX_FILE = "index.json"
+
+# Query parameters that pick a different recorded page for the same path (_pgn is matched separately)
+SIGNIFICANT_PARAMS = ("_nkw", "_sacat", "_udlo", "_udhi")
+
+# The recorder looks for a new page after these commands, i.e. whenever the page may have changed
+_CAPTURE_AFTER = {Command.GET, Command.REFRESH, Command.GO_BACK, Command.CLICK_ELEMENT,
+                  Command.W3C_EXECUTE_SCRIPT, Command.W3C_ACTIONS}
+
+_PAGE_STATE_SCRIPT = "return [window.location.href, document.readyState];"
+
+# Rendered DOM of the current page, its stylesheets and, on product pages, the listing's title and price
+_CAPTURE_SCRIPT = """
+var text = function (selector) {
+    var el = document.querySelector(selector);
+    return el ? el.textContent.trim() : null;
+};
+return {
+    html: document.documentElement.outerHTML,
+    stylesheets: Array.from(document.querySelectorAll("link[rel='stylesheet'][href]")).map(function (l) { return l.href; }),
+    title: text('h1.x-item-title__mainTitle') || document.title,
+    price: text('.x-price-primary')
+};
+"""
+
+_SCRIPT_TAG = re.compile(r"<script\b[^>]*>.*?</script\s*>", re.IGNORECASE | re.DOTALL)
+_ITEM_PATH = re.compile(r"/itm/(?:[^/]+/)?(\d+)")
+
+# Stands in for the eBay scripts stripped from replayed pages: variant listboxes,
+# the price filter, the header cart badge and the mini-cart flyout
+_STAND_IN_SCRIPT = """
+<script>
+(function () {
+    var badge = document.getElementById('gh-cart-n');
+    if (badge) { badge.textContent = '%(cart_count)s'; }
+    var show = function (el, visible) { el.hidden = !visible; el.style.display = visible ? 'block' : 'none'; };
+    document.addEventListener('click', function (event) {
+        var toggle = event.target.closest("button.listbox-button__control, button[aria-haspopup='listbox']");
+        if (toggle) {
+            var listbox = document.getElementById(toggle.getAttribute('aria-controls'));
+            if (listbox) { show(listbox, true); }
+            toggle.setAttribute('aria-expanded', 'true');
+            return;
+        }
+        var option = event.target.closest('.listbox__option');
+        if (option) {
+            Array.from(option.parentElement.children).forEach(function (o) { o.setAttribute('aria-selected', 'false'); });
+            option.setAttribute('aria-selected', 'true');
+            var container = option.parentElement;
+            while (container && !(container.id && document.querySelector("[aria-controls='" + container.id + "']"))) {
+                container = container.parentElement;
+            }
+            if (container) {
+                var owner = document.querySelector("[aria-controls='" + container.id + "']");
+                owner.setAttribute('aria-expanded', 'false');
+                owner.setAttribute('data-selected', option.textContent.trim());
+                show(container, false);
+            }
+            return;
+        }
+        var filter = event.target.closest('.x-textrange__button');
+        if (filter) {
+            event.preventDefault();
+            var inputs = (filter.closest('.x-textrange') || document).querySelectorAll('input');
+            var url = new URL(window.location.href);
+            var ranges = [['_udlo', inputs.length > 1 ? inputs[0] : null], ['_udhi', inputs[inputs.length - 1]]];
+            ranges.forEach(function (range) {
+                if (range[1] && range[1].value) { url.searchParams.set(range[0], range[1].value); }
+                else { url.searchParams.delete(range[0]); }
+            });
+            url.searchParams.delete('_pgn');
+            window.location.assign(url.toString());
+        }
+    }, true);
+    var cartIcon = document.querySelector("a.gh-flyout__target[href*='cart.ebay.com']");
+    if (cartIcon) {
+        cartIcon.addEventListener('mouseover', function () {
+            fetch('/_replay/minicart').then(function (r) { return r.text(); }).then(function (body) {
+                var flyout = document.getElementById('gh-minicart-hover-body');
+                if (!flyout) {
+                    flyout = document.createElement('div');
+                    flyout.id = 'gh-minicart-hover-body';
+                    cartIcon.parentElement.appendChild(flyout);
+                }
+                flyout.innerHTML = body;
+                show(flyout, true);
+            });
+        });
+    }
+})();
+</script>
+"""
+
+# Header used by the generated cart page
+_CART_HEADER = """<header id="gh">
+  <a class="gh-flyout__target" href="https://cart.ebay.com" aria-label="Your shopping cart contains {count} items">
+    Cart <span id="gh-cart-n">{count}</span></a>
+  <div id="gh-minicart-hover-body" hidden></div>
+</header>"""
+
+
+def _page_key(url):
+    """
+    Identifies a recorded page: host, path, the significant query parameters and the result page.
+    """
+    parts = urlsplit(url)
+    query = parse_qs(parts.query)
+    params = {name: query[name][0] for name in SIGNIFICANT_PARAMS + ("_pgn",) if name in query}
+    return parts.netloc.lower(), parts.path.rstrip("/") or "/", tuple(sorted(params.items()))
+
+
+def _load_index(directory):
+    try:
+        with open(os.path.join(directory, INDEX_FILE), 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"pages": [], "items": {}, "assets": {}}
+
+
+class Recorder:
+    """
+    Records the pages a flow visits on the live site so ReplayServer can serve them later.
+
+    Attached to a driver, it saves the rendered DOM of every new page once it has finished
+    loading, together with its stylesheets and, for product pages, the listing's title and price.
+    """
+
+    def __init__(self, directory, download_assets=True):
+        """
+        Args:
+            directory: Recording directory, an existing recording is extended
+            download_assets: Also save the stylesheets the pages link to
+        """
+        self.directory = directory
+        self.download_assets = download_assets
+        self.index = _load_index(directory)
+        self._recorded = {(page["host"], page["path"], tuple(sorted(page["params"].items())))
+                          for page in self.index["pages"]}
+        self._session = requests.Session()
+        self._lock = threading.Lock()
+
+    def attach(self, driver):
+        """
+        Wraps the driver's commands so every page it reaches is recorded.
+        Attach before Timeline.instrument() so the recorder's own scripts are not counted.
+        """
+        original_execute = driver.execute
+
+        @functools.wraps(original_execute)
+        def recording_execute(driver_command, params=None):
+            response = original_execute(driver_command, params)
+            if driver_command in _CAPTURE_AFTER:
+                try:
+                    self._capture(original_execute)
+                except Exception as e:
+                    print(f"Could not record page: {e}")
+            return response
+
+        recording_execute.previous = driver.__dict__.get("execute")
+        driver.execute = recording_execute
+
+    @staticmethod
+    def detach(driver):
+        """
+        Restores a driver passed to attach().
+        """
+        execute = driver.__dict__.pop("execute", None)
+        previous = getattr(execute, "previous", None)
+        if previous is not None:
+            driver.execute = previous
+
+    def _run_script(self, execute, script, *args):
+        return execute(Command.W3C_EXECUTE_SCRIPT, {"script": script, "args": list(args)})["value"]
+
+    def _capture(self, execute):
+        url, ready_state = self._run_script(execute, _PAGE_STATE_SCRIPT)
+        key = _page_key(url)
+        if ready_state != "complete" or not url.startswith("http") or key in self._recorded:
+            return
+        page = self._run_script(execute, _CAPTURE_SCRIPT)
+        with self._lock:
+            if key in self._recorded:
+                return
+            self._recorded.add(key)
+            self.record_page(url, page["html"], title=page.get("title"), price=page.get("price"))
+            if self.download_assets:
+                for stylesheet in page.get("stylesheets") or []:
+                    self._download_asset(stylesheet)
+
+    def record_page(self, url, page_html, title=None, price=None):
+        """
+        Adds one page to the recording.
+
+        Args:
+            url: The page's live URL
+            page_html: Rendered HTML of the page
+            title: Listing title, for product pages
+            price: Displayed listing price (e.g. "ILS 45.00"), for product pages
+        """
+        host, path, params = _page_key(url)
+        item = _ITEM_PATH.search(path)
+        if item:
+            file_name = f"itm_{item.group(1)}.html"
+            parsed_price = parse_price(price)
+            if parsed_price:
+                currency, amount = parsed_price
+                self.index["items"][item.group(1)] = {"title": title, "price": amount, "currency": currency}
+        else:
+            file_name = f"page_{len(self.index['pages']) + 1:03d}.html"
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, file_name), 'w', encoding='utf-8') as f:
+            f.write("<!DOCTYPE html>\n" + page_html)
+        self.index["pages"].append({"host": host, "path": path, "params": dict(params), "file": file_name})
+        print(f"Recorded {url} as {file_name}")
+
+    def _download_asset(self, url):
+        parts = urlsplit(url)
+        key = parts.netloc.lower() + parts.path
+        if key in self.index["assets"]:
+            return
+        try:
+            response = self._session.get(url, timeout=10)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            print(f"Could not record asset {url}: {e}")
+            return
+        file_name = f"assets/{hashlib.sha1(key.encode()).hexdigest()[:16]}{os.path.splitext(parts.path)[1]}"
+        os.makedirs(os.path.join(self.directory, "assets"), exist_ok=True)
+        with open(os.path.join(self.directory, file_name), 'wb') as f:
+            f.write(response.content)
+        self.index["assets"][key] = {"file": file_name,
+                                     "content_type": response.headers.get("Content-Type", "text/css")}
+
+    def save(self):
+        """
+        Writes the recording's index.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        write_json_atomic(os.path.join(self.directory, INDEX_FILE), self.index)
+        print(f"Saved recording of {len(self.index['pages'])} pages to {self.directory}")
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _parse_request(self):
+        """
+        Returns the (host, path, query) the request addresses on the recorded site.
+        """
+        replay = self.server.replay
+        if replay.latency_ms:
+            time.sleep(replay.latency_ms / 1000)
+        replay.requests_served += 1
+        parts = urlsplit(self.path)
+        query = {name: values[0] for name, values in parse_qs(parts.query).items()}
+        path = parts.path
+        if path.startswith("/_host/"):
+            host, _, rest = path[len("/_host/"):].partition("/")
+            return host.lower(), "/" + rest, query
+        return "www.ebay.com", path, query
+
+    def do_HEAD(self):
+        # Only answers whether a page or asset was recorded, so a liveness check never touches the cart
+        replay = self.server.replay
+        host, path, query = self._parse_request()
+        found = replay.find_asset(host, path) or replay.render_page(host, path, query) is not None
+        self.send_response(200 if found else 404)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        replay = self.server.replay
+        host, path, query = self._parse_request()
+        if path.startswith("/_replay/"):
+            self._control(replay, path, query)
+        elif host == "cart.payments.ebay.com" and path.startswith("/sc/add"):
+            replay.add_to_cart(query.get("item") or self._referring_item())
+            self._redirect("/_host/cart.ebay.com/")
+        elif host == "cart.ebay.com" and path.rstrip("/") == "/remove":
+            replay.remove_from_cart(query.get("item"))
+            self._redirect("/_host/cart.ebay.com/")
+        elif host == "cart.ebay.com":
+            self._send(200, replay.render_cart_page())
+        else:
+            asset = replay.find_asset(host, path)
+            if asset:
+                self._send(200, asset[0], asset[1])
+                return
+            page = replay.render_page(host, path, query)
+            if page is None:
+                self._send(404, f"<html><body>No recording of {html.escape(self.path)}</body></html>")
+            else:
+                self._send(200, page)
+
+    def _control(self, replay, path, query):
+        if path == "/_replay/cart.json":
+            self._send(200, json.dumps(replay.cart_summary()), "application/json")
+        elif path == "/_replay/minicart":
+            self._send(200, replay.render_mini_cart())
+        elif path == "/_replay/reset":
+            replay.reset_cart()
+            self._send(200, "ok", "text/plain")
+        else:
+            self._send(404, "unknown replay endpoint", "text/plain")
+
+    def _referring_item(self):
+        item = _ITEM_PATH.search(self.headers.get("Referer", ""))
+        return item.group(1) if item else None
+
+    def _redirect(self, location):
+        self.send_response(302)
+        self.send_header("Location", location)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _send(self, status, body, content_type="text/html; charset=utf-8"):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ReplayServer:
+    """
+    Serves a recording as a local stand-in for eBay, with a simulated cart.
+
+    Pages are served with their scripts removed and their eBay URLs pointed at the server
+    (other eBay hosts live under /_host/<host>/). A small stand-in script replaces the
+    behaviour the page objects rely on: variant listboxes, the price filter and the mini-cart.
+    """
+
+    def __init__(self, directory, latency_ms=0, host="127.0.0.1", port=0):
+        """
+        Args:
+            directory: Recording directory holding index.json
+            latency_ms: Artificial delay added to every response
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free one)
+        """
+        self.directory = directory
+        self.latency_ms = latency_ms
+        self.index = _load_index(directory)
+        # Simulated cart: item id -> quantity, in the order the items were added
+        self.cart = {}
+        self.requests_served = 0
+        self._cart_lock = threading.Lock()
+        self._page_cache = {}
+        self._server = ThreadingHTTPServer((host, port), _ReplayHandler)
+        self._server.replay = self
+        self._thread = None
+        self.base_url = f"http://{host}:{self._server.server_address[1]}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05},
+                                        name="replay-server", daemon=True)
+        self._thread.start()
+        print(f"Replaying {self.directory} on {self.base_url}")
+        return self
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # --- Recorded pages ---
+
+    def find_page(self, host, path, query):
+        """
+        Picks the recorded page for a request: same host and path, same result page,
+        and the most significant query parameters in common.
+        """
+        path = path.rstrip("/") or "/"
+        result_page = query.get("_pgn", "1")
+        best, best_score = None, -1
+        for page in self.index["pages"]:
+            if page["host"] != host or page["path"] != path or page["params"].get("_pgn", "1") != result_page:
+                continue
+            score = sum(1 for name in SIGNIFICANT_PARAMS if page["params"].get(name) == query.get(name))
+            if score > best_score:
+                best, best_score = page, score
+        return best
+
+    def find_asset(self, host, path):
+        """
+        Returns (body, content type) of a recorded asset, or None.
+        """
+        asset = self.index["assets"].get(host + path)
+        if asset is None:
+            return None
+        with open(os.path.join(self.directory, asset["file"]), 'r', encoding='utf-8') as f:
+            return rebase_urls(f.read(), self.base_url), asset["content_type"]
+
+    def render_page(self, host, path, query):
+        """
+        Returns the replayed HTML for a request, or None if nothing was recorded for it.
+        """
+        page = self.find_page(host, path, query)
+        if page is None:
+            return None
+        if page["file"] not in self._page_cache:
+            with open(os.path.join(self.directory, page["file"]), 'r', encoding='utf-8') as f:
+                body = _SCRIPT_TAG.sub("", f.read())
+            self._page_cache[page["file"]] = rebase_urls(body, self.base_url)
+        return self._with_stand_in(self._page_cache[page["file"]])
+
+    def _with_stand_in(self, body):
+        script = _STAND_IN_SCRIPT % {"cart_count": sum(self.cart.values())}
+        position = body.lower().rfind("</body>")
+        if position == -1:
+            return body + script
+        return body[:position] + script + body[position:]
+
+    # --- Simulated cart ---
+
+    def add_to_cart(self, item_id):
+        if not item_id:
+            print("Add to cart request without an item id, ignored")
+            return
+        with self._cart_lock:
+            self.cart[item_id] = self.cart.get(item_id, 0) + 1
+
+    def remove_from_cart(self, item_id):
+        with self._cart_lock:
+            self.cart.pop(item_id, None)
+
+    def reset_cart(self):
+        with self._cart_lock:
+            self.cart.clear()
+
+    def cart_summary(self):
+        """
+        The simulated cart: its line items (id, title, quantity, unit price) and total.
+        """
+        with self._cart_lock:
+            lines = list(self.cart.items())
+        items, currency = [], ""
+        for item_id, quantity in lines:
+            item = self.index["items"].get(item_id, {})
+            currency = currency or item.get("currency", "")
+            items.append({"id": item_id, "title": item.get("title") or f"Item {item_id}",
+                          "quantity": quantity, "price": item.get("price", 0.0)})
+        return {"items": items, "count": sum(item["quantity"] for item in items), "currency": currency,
+                "total": round(sum(item["price"] * item["quantity"] for item in items), 2)}
+
+    def render_mini_cart(self):
+        cart = self.cart_summary()
+        lines = "".join(f'<div class="gh-minicart-item">{html.escape(item["title"])}</div>' for item in cart["items"])
+        return f'{lines}<div class="gh-subtotal">{cart["currency"]} {cart["total"]:.2f}</div>'
+
+    def render_cart_page(self):
+        cart = self.cart_summary()
+        line_items = "".join(
+            f'<div class="cart-bucket-lineitem" data-item-id="{item["id"]}">'
+            f'<a class="item-title" href="https://www.ebay.com/itm/{item["id"]}">{html.escape(item["title"])}</a>'
+            f'<select data-test-id="qty-dropdown"><option value="{item["quantity"]}" selected>'
+            f'{item["quantity"]}</option></select>'
+            f'<span class="item-price">{cart["currency"]} {item["price"]:.2f}</span>'
+            f'<form method="get" action="/_host/cart.ebay.com/remove">'
+            f'<input type="hidden" name="item" value="{item["id"]}">'
+            f'<button type="submit" data-test-id="cart-remove-item">Remove</button></form></div>'
+            for item in cart["items"])
+        body = (f'<!DOCTYPE html>\n<html lang="en"><head><meta charset="utf-8"><title>eBay shopping cart</title>'
+                f'</head><body>{_CART_HEADER.format(count=cart["count"])}<main class="cart">{line_items}'
+                f'<div class="cart-summary">Subtotal <span data-test-id="cart-total">'
+                f'{cart["currency"]} {cart["total"]:.2f}</span></div></main></body></html>')
+        return self._with_stand_in(rebase_urls(body, self.base_url))
@@ -0,0 +1,127 @@
+from json_files import read_json, write_json_atomic
+
+# Measured run time of each scenario, persisted between runs to balance shards
+SCENARIO_DURATIONS_FILE = ".scenario_durations.json"
+
+# Seconds assumed for a scenario that has never run when no other duration is known
+DEFAULT_SCENARIO_SECONDS = 60.0
+
+
+def load_scenarios(data):
+    """
+    Turns the test data into a list of scenarios.
+
+    data.json either lists "scenarios" that name one of its "accounts", or holds a single
+    scenario at the top level with its own username and password.
+
+    Returns:
+        list: Dicts with name, search_term, max_price, item_limit, account, username and password
+    """
+    if "scenarios" not in data:
+        scenario = {key: data.get(key) for key in ("search_term", "max_price", "item_limit")}
+        scenario["account"] = "default"
+        data = {"scenarios": [scenario],
+                "accounts": {"default": {"username": data.get("username"), "password": data.get("password")}}}
+
+    accounts = data.get("accounts", {})
+    scenarios = []
+    for scenario in data["scenarios"]:
+        account = scenario.get("account")
+        if account not in accounts:
+            raise ValueError(f"Scenario {scenario.get('name') or scenario.get('search_term')!r} "
+                             f"uses unknown account {account!r}, expected one of {list(accounts)}")
+        for key in ("username", "password"):
+            value = accounts[account].get(key)
+            if not isinstance(value, str) or not value.strip():
+                raise ValueError(f"Account {account!r} needs a non-empty '{key}'")
+        scenario = {**scenario, "name": scenario.get("name") or str(scenario.get("search_term")),
+                    "username": accounts[account].get("username"),
+                    "password": accounts[account].get("password")}
+        if any(other["name"] == scenario["name"] for other in scenarios):
+            raise ValueError(f"Duplicate scenario name {scenario['name']!r}")
+        scenarios.append(scenario)
+    return scenarios
+
+
+class ScenarioDurations:
+    """
+    Smoothed run time of each scenario, used to pack shards of similar length.
+    """
+
+    def __init__(self, file_path=SCENARIO_DURATIONS_FILE, smoothing=0.5):
+        """
+        Args:
+            file_path: JSON file the durations are kept in
+            smoothing: Weight of a new measurement against the stored duration (1 keeps only the latest)
+        """
+        self.file_path = file_path
+        self.smoothing = smoothing
+        self.measured = {}
+        self.durations = self._read()
+
+    def _read(self):
+        return read_json(self.file_path, {})
+
+    def get(self, name):
+        """
+        Expected seconds for a scenario, the mean of the known durations when it never ran.
+        """
+        if name in self.durations:
+            return self.durations[name]
+        if self.durations:
+            return sum(self.durations.values()) / len(self.durations)
+        return DEFAULT_SCENARIO_SECONDS
+
+    def record(self, name, seconds):
+        self.measured[name] = seconds
+
+    def save(self):
+        """
+        Merges this run's measurements into the file, other shards' updates are kept.
+        """
+        if not self.measured:
+            return
+        durations = self._read()
+        for name, seconds in self.measured.items():
+            previous = durations.get(name)
+            durations[name] = round(seconds if previous is None
+                                    else previous + self.smoothing * (seconds - previous), 2)
+        write_json_atomic(self.file_path, durations)
+        self.measured.clear()
+
+
+def shard_scenarios(scenarios, shard_count, durations):
+    """
+    Splits scenarios into shard_count shards of similar expected run time.
+
+    Scenarios of one account always land in the same shard, so two parallel workers never
+    share a cart. Accounts are placed longest first on the least loaded shard; the result
+    only depends on the inputs, so every worker computes the same split.
+
+    Args:
+        scenarios: Scenarios as returned by load_scenarios
+        shard_count: Number of parallel workers
+        durations: ScenarioDurations with the expected seconds per scenario
+
+    Returns:
+        list: shard_count lists of scenarios, each in data.json order
+    """
+    if shard_count < 1:
+        raise ValueError(f"shard_count must be at least 1, got {shard_count}")
+    groups = {}
+    for scenario in scenarios:
+        groups.setdefault(scenario["account"], []).append(scenario)
+    ranked = sorted(groups.items(),
+                    key=lambda group: (-sum(durations.get(s["name"]) for s in group[1]), group[0]))
+
+    loads = [0.0] * shard_count
+    shard_of_account = {}
+    for account, members in ranked:
+        shard = loads.index(min(loads))
+        shard_of_account[account] = shard
+        loads[shard] += sum(durations.get(s["name"]) for s in members)
+
+    shards = [[] for _ in range(shard_count)]
+    for scenario in scenarios:
+        shards[shard_of_account[scenario["account"]]].append(scenario)
+    return shards
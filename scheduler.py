@@ -0,0 +1,202 @@
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from selenium.common.exceptions import (ElementClickInterceptedException, StaleElementReferenceException,
+                                        TimeoutException)
+
+# Failures that may go away on a second try: slow loads, re-rendered elements, overlays
+TRANSIENT_ERRORS = (TimeoutException, StaleElementReferenceException, ElementClickInterceptedException)
+
+OUTCOMES = ("success", "retried", "timed out", "failed")
+
+
+class DeadlineExceeded(TimeoutException):
+    """
+    Raised by a page object wait started after the driver's deadline has passed.
+    """
+
+
+class ItemAlreadyAdded(Exception):
+    """
+    Raised by add_item when a step failed after the item may already have reached the cart.
+    Retrying or replacing it could add a second item, so the run stops instead.
+    """
+
+
+class Deadline:
+    """
+    A point in time after which the work it guards is given up.
+    """
+
+    def __init__(self, seconds):
+        """
+        Args:
+            seconds: Time from now until the deadline (float("inf") for none)
+        """
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires - time.monotonic())
+
+    @property
+    def expired(self):
+        return self.remaining() == 0.0
+
+    def check(self):
+        """
+        Returns the seconds left, raising DeadlineExceeded when there are none.
+        """
+        remaining = self.remaining()
+        if remaining == 0.0:
+            raise DeadlineExceeded("Deadline exceeded")
+        return remaining
+
+
+def deadline_of(driver):
+    """
+    Returns the Deadline the driver's current work must finish by, or None.
+    """
+    return getattr(driver, "_deadline", None)
+
+
+@contextmanager
+def enforce_deadline(driver, deadline, page_load_timeout, implicit_wait=0):
+    """
+    Makes page object waits on the driver end by the deadline, and page loads too.
+
+    Args:
+        page_load_timeout: The driver's usual page load timeout, kept if it ends earlier.
+            The caller restores it afterwards.
+        implicit_wait: The driver's usual implicit wait, restored afterwards
+    """
+    driver._deadline = deadline
+    # A page load is a single blocking command, only the driver can cut it short
+    driver.set_page_load_timeout(max(1, min(page_load_timeout, deadline.remaining())))
+    # Every find_element poll of a wait would block for the implicit wait, past the deadline.
+    # The waits poll on their own, so a missing element is reported right away instead.
+    driver.implicitly_wait(0)
+    try:
+        yield deadline
+    finally:
+        driver._deadline = None
+        driver.implicitly_wait(implicit_wait)
+
+
+class ItemScheduler:
+    """
+    Adds items one at a time within a time budget per item and for the whole run.
+
+    An item whose failure looks transient is retried with exponential backoff while its
+    budget lasts. An item that times out or fails is replaced by the next candidate, until
+    target items were added, the candidates run out or the run's budget is spent.
+    """
+
+    def __init__(self, driver, candidates, target, item_timeout=60, run_timeout=None, max_retries=1,
+                 backoff_seconds=2.0):
+        """
+        Args:
+            driver: The WebDriver the items are added with, its waits are cut short at the deadlines
+            candidates: Item URLs in order of preference, the ones beyond target are replacements
+            target: Number of items to add
+            item_timeout: Seconds one item may take, retries included
+            run_timeout: Seconds all items may take (None: no limit)
+            max_retries: Further attempts after a transient failure
+            backoff_seconds: Delay before the first retry, doubled for every further one
+        """
+        self.driver = driver
+        self.candidates = list(candidates)
+        self.target = min(target, len(self.candidates))
+        self.item_timeout = item_timeout
+        self.run_timeout = run_timeout
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.records = []
+        self.run_deadline_reached = False
+
+    @property
+    def added(self):
+        """
+        URLs of the items added so far.
+        """
+        return [record["url"] for record in self.records if record["outcome"] in ("success", "retried")]
+
+    def run(self, add_item):
+        """
+        Calls add_item(index, url, attempt) for candidates until target items were added.
+        add_item signals a failed attempt by raising an Exception, and ItemAlreadyAdded
+        (re-raised here) when the item may be in the cart and must not be tried again.
+
+        Returns:
+            list: One record per candidate tried: index, url, outcome, attempts, seconds, replacement, error
+        """
+        run_deadline = Deadline(self.run_timeout if self.run_timeout else float("inf"))
+        page_load_timeout = self.driver.timeouts.page_load
+        implicit_wait = self.driver.timeouts.implicit_wait
+        queue = deque(enumerate(self.candidates, start=1))
+        try:
+            while len(self.added) < self.target and queue:
+                if run_deadline.expired:
+                    self.run_deadline_reached = True
+                    print(f"Run deadline reached with {len(self.added)}/{self.target} items added")
+                    break
+                index, url = queue.popleft()
+                self._run_item(add_item, index, url, run_deadline, page_load_timeout, implicit_wait)
+        finally:
+            self.driver.set_page_load_timeout(page_load_timeout)
+        return self.records
+
+    def _run_item(self, add_item, index, url, run_deadline, page_load_timeout, implicit_wait):
+        start = time.monotonic()
+        deadline = Deadline(min(self.item_timeout, run_deadline.remaining()))
+        record = {"index": index, "url": url, "outcome": None, "attempts": 0,
+                  "replacement": index > self.target, "error": None, "seconds": 0.0}
+        self.records.append(record)
+        while record["outcome"] is None:
+            record["attempts"] += 1
+            try:
+                with enforce_deadline(self.driver, deadline, page_load_timeout, implicit_wait):
+                    add_item(index, url, record["attempts"])
+            except ItemAlreadyAdded as e:
+                record["error"] = f"{type(e).__name__}: {e}"
+                record["outcome"] = "failed"
+                record["seconds"] = time.monotonic() - start
+                print(f"Item {index} may already be in the cart, not retrying or replacing it: {e}")
+                raise
+            except Exception as e:
+                record["error"] = f"{type(e).__name__}: {e}"
+                if deadline.expired:
+                    record["outcome"] = "timed out"
+                    continue
+                delay = self.backoff_seconds * 2 ** (record["attempts"] - 1)
+                if (not isinstance(e, TRANSIENT_ERRORS) or record["attempts"] > self.max_retries
+                        or delay >= deadline.remaining()):
+                    record["outcome"] = "failed"
+                    continue
+                print(f"Item {index} failed ({record['error']}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+            else:
+                record["outcome"] = "success" if record["attempts"] == 1 else "retried"
+        record["seconds"] = time.monotonic() - start
+        print(f"Item {index}: {record['outcome']} after {record['attempts']} attempts, {record['seconds']:.2f}s")
+        return record
+
+    def format_summary(self):
+        """
+        Formats the items and time spent per outcome as a human readable report.
+        """
+        total = sum(record["seconds"] for record in self.records)
+        lines = [f"Added {len(self.added)}/{self.target} items in {total:.2f}s"]
+        for outcome in OUTCOMES:
+            records = [record for record in self.records if record["outcome"] == outcome]
+            lines.append(f"{outcome}: {len(records)} items, {sum(r['seconds'] for r in records):.2f}s")
+        # Every item given up on before the last one made room for the next candidate
+        replaced = [record for record in self.records[:-1] if record["outcome"] in ("timed out", "failed")]
+        lines.append(f"replaced: {len(replaced)} items, {sum(r['seconds'] for r in replaced):.2f}s")
+        lines.append(f"Replacement candidates tried: {sum(record['replacement'] for record in self.records)}")
+        if self.run_deadline_reached:
+            lines.append("The run deadline was reached before all items were added")
+        for record in self.records:
+            if record["error"]:
+                lines.append(f"Item {record['index']} ({record['outcome']}): {record['error']}")
+        return "\n".join(lines)
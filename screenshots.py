@@ -0,0 +1,203 @@
+import hashlib
+import io
+import queue
+import threading
+import time
+from uuid import uuid4
+
+from allure_commons import plugin_manager
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is in requirements.txt, without it screenshots are attached as captured PNGs
+    Image = None
+
+# Output formats: Pillow format name -> (mime type, file extension)
+FORMATS = {
+    "JPEG": ("image/jpeg", "jpg"),
+    "WEBP": ("image/webp", "webp"),
+    "PNG": ("image/png", "png"),
+}
+
+
+def _allure_reporter():
+    """
+    Returns the active Allure reporter, or None when the run is not writing Allure results.
+    """
+    for plugin in plugin_manager.get_plugins():
+        reporter = getattr(plugin, "allure_logger", None)
+        if reporter is not None:
+            return reporter
+    return None
+
+
+class ScreenshotService:
+    """
+    Captures screenshots for the Allure report and encodes/writes them on a background worker.
+
+    Only the capture itself blocks the driver. The attachment is registered on the current
+    Allure step right away, so it shows up in the right place, while a worker thread
+    downscales, re-encodes and writes the file.
+    """
+
+    def __init__(self, image_format="JPEG", quality=70, max_width=1280, every_nth_success=1, queue_size=8):
+        """
+        Args:
+            image_format: "JPEG", "WEBP" or "PNG" (PNG is used when Pillow is not installed)
+            quality: Encoder quality for JPEG/WEBP (1-100)
+            max_width: Screenshots wider than this are downscaled (0 keeps the original size)
+            every_nth_success: Keep one success screenshot out of N (0 keeps none), failures are always kept
+            queue_size: Screenshots waiting to be encoded before capture blocks
+        """
+        image_format = image_format.upper()
+        if image_format not in FORMATS:
+            raise ValueError(f"Unknown screenshot format '{image_format}', expected one of {list(FORMATS)}")
+        self.image_format = image_format if Image is not None else "PNG"
+        self.quality = quality
+        self.max_width = max_width
+        self.every_nth_success = every_nth_success
+        self.stats = {"captured": 0, "sampled_out": 0, "duplicates": 0,
+                      "png_bytes": 0, "written_bytes": 0, "capture_seconds": 0.0}
+        self._successes = 0
+        self._seen_hashes = set()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._worker = threading.Thread(target=self._run, name="screenshot-writer", daemon=True)
+        self._worker.start()
+
+    def _should_keep(self, failure):
+        if failure:
+            return True
+        self._successes += 1
+        if not self.every_nth_success or self._successes % self.every_nth_success:
+            self.stats["sampled_out"] += 1
+            return False
+        return True
+
+    def capture(self, driver, name, failure=False, element=None):
+        """
+        Takes a screenshot of the window (or of element only) and queues it for the report.
+
+        Args:
+            driver: The WebDriver to capture
+            name: Attachment name, without extension
+            failure: Failure screenshots bypass sampling
+            element: Optional WebElement to clip the screenshot to
+
+        Returns:
+            bool: True if the screenshot was kept
+        """
+        if not self._should_keep(failure):
+            return False
+        start = time.monotonic()
+        png = element.screenshot_as_png if element is not None else driver.get_screenshot_as_png()
+        self.stats["capture_seconds"] += time.monotonic() - start
+        return self._submit(png, name)
+
+    def submit(self, png, name, failure=False):
+        """
+        Queues an already captured PNG (e.g. from a pool worker) for the report.
+
+        Returns:
+            bool: True if the screenshot was kept
+        """
+        if not self._should_keep(failure):
+            return False
+        return self._submit(png, name)
+
+    def _submit(self, png, name):
+        # Identical frames produce identical PNG bytes, attach them only once
+        digest = hashlib.sha1(png).hexdigest()
+        if digest in self._seen_hashes:
+            self.stats["duplicates"] += 1
+            return False
+        self._seen_hashes.add(digest)
+        self.stats["captured"] += 1
+        self.stats["png_bytes"] += len(png)
+
+        reporter = _allure_reporter()
+        if reporter is None:
+            return True
+        mime_type, extension = FORMATS[self.image_format]
+        # AllureReporter has no public call that registers an attachment without writing it.
+        # The private one is stable in the allure-python-commons version pinned in requirements.txt.
+        register = getattr(reporter, "_attach", None)
+        if register is None:
+            # Another Allure version: encode here and attach through the public hook, synchronously
+            body = self._encoded(png, name)
+            plugin_manager.hook.attach_data(body=body, name=f"{name}.{extension}", attachment_type=mime_type,
+                                            extension=extension)
+            self.stats["written_bytes"] += len(body)
+            return True
+        # Register the attachment on the current step now, the worker only writes the file
+        file_name = register(uuid4(), name=f"{name}.{extension}", attachment_type=mime_type, extension=extension)
+        self._queue.put((png, file_name))
+        return True
+
+    def _encode(self, png):
+        if self.image_format == "PNG" and not self.max_width:
+            return png
+        image = Image.open(io.BytesIO(png))
+        if self.max_width and image.width > self.max_width:
+            height = round(image.height * self.max_width / image.width)
+            image = image.resize((self.max_width, height), Image.LANCZOS)
+        if self.image_format == "JPEG":
+            image = image.convert("RGB")
+        output = io.BytesIO()
+        image.save(output, format=self.image_format, quality=self.quality, optimize=True)
+        return output.getvalue()
+
+    def _encoded(self, png, name):
+        """
+        The screenshot in the output format, or the captured PNG if it cannot be encoded.
+        """
+        if Image is None:
+            return png
+        try:
+            return self._encode(png)
+        except Exception as e:
+            print(f"Could not encode screenshot {name}, writing the original: {e}")
+            return png
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                png, file_name = job
+                body = self._encoded(png, file_name)
+                plugin_manager.hook.report_attached_data(body=body, file_name=file_name)
+                self.stats["written_bytes"] += len(body)
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """
+        Blocks until every queued screenshot has been written.
+        """
+        self._queue.join()
+
+    def close(self):
+        """
+        Writes the remaining screenshots and stops the worker.
+        """
+        self._queue.put(None)
+        self._worker.join()
+
+    def format_stats(self):
+        """
+        Formats what the service captured, skipped and saved as a human readable report.
+        """
+        stats = self.stats
+        return (f"Kept: {stats['captured']}\n"
+                f"Skipped by sampling: {stats['sampled_out']}\n"
+                f"Skipped as duplicates: {stats['duplicates']}\n"
+                f"Captured PNG size: {stats['png_bytes'] / 1024:.0f} KB\n"
+                f"Written size ({self.image_format}): {stats['written_bytes'] / 1024:.0f} KB\n"
+                f"Time blocked capturing: {stats['capture_seconds']:.2f}s")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,121 @@
+import json
+import time
+
+from json_files import read_json, write_json_atomic
+
+# Listing responses that mean the listing is gone
+_DEAD_STATUSES = {404, 410}
+
+
+class SearchCache:
+    """
+    On-disk cache of the item URLs found for a search, keyed by the search parameters.
+
+    Entries expire after a TTL, the least recently used ones are evicted beyond max_entries,
+    and cached listing URLs are checked with a HEAD request before an entry is reused.
+    """
+
+    def __init__(self, cache_file=".search_cache.json", ttl_seconds=60 * 60, max_entries=50,
+                 bypass=False, check_liveness=True):
+        """
+        Args:
+            cache_file: JSON file holding the cached searches
+            ttl_seconds: Age after which a cached search is searched again
+            max_entries: Number of searches kept, least recently used first out
+            bypass: Always search, fresh results still replace the cached ones
+            check_liveness: Check cached listing URLs before reusing them
+        """
+        self.cache_file = cache_file
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.bypass = bypass
+        self.check_liveness = check_liveness
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "dead_listings": 0, "bypassed": 0}
+
+    @staticmethod
+    def key(base_url, item_name, max_price, limit, price_screening=None):
+        return json.dumps([base_url.rstrip("/"), item_name.strip().lower(), float(max_price), int(limit),
+                           price_screening])
+
+    def _read(self):
+        return read_json(self.cache_file, {})
+
+    def _write(self, entries):
+        write_json_atomic(self.cache_file, entries)
+
+    def get(self, key):
+        """
+        Returns the cached item URLs for a search, or None if they have to be searched again.
+        """
+        if self.bypass:
+            self.stats["bypassed"] += 1
+            return None
+        entries = self._read()
+        entry = entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+
+        age = time.time() - entry["created"]
+        if age > self.ttl_seconds:
+            print(f"Cached search is {age / 60:.0f} minutes old, past its TTL")
+            self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            del entries[key]
+            self._write(entries)
+            return None
+
+        dead = self.dead_urls(entry["urls"]) if self.check_liveness else []
+        if dead:
+            print(f"Cached search has {len(dead)} listings that are gone, searching again")
+            self.stats["dead_listings"] += len(dead)
+            self.stats["misses"] += 1
+            del entries[key]
+            self._write(entries)
+            return None
+
+        self.stats["hits"] += 1
+        entry["used"] = time.time()
+        self._write(entries)
+        return entry["urls"]
+
+    def put(self, key, urls):
+        """
+        Stores a search's item URLs, evicting the least recently used searches beyond max_entries.
+        """
+        entries = self._read()
+        now = time.time()
+        entries[key] = {"urls": urls, "created": now, "used": now}
+        for stale_key in sorted(entries, key=lambda k: entries[k]["used"])[:max(0, len(entries) - self.max_entries)]:
+            del entries[stale_key]
+        self._write(entries)
+
+    @staticmethod
+    def dead_urls(urls, timeout=5):
+        """
+        Returns the listing URLs that answer a HEAD request with "gone" or not at all.
+        Other errors (e.g. bot protection) do not say the listing is gone and are accepted.
+        """
+        # Imported here so runs without a cached search never load requests
+        import requests
+
+        dead = []
+        with requests.Session() as session:
+            for url in urls:
+                try:
+                    if session.head(url, timeout=timeout, allow_redirects=True).status_code in _DEAD_STATUSES:
+                        dead.append(url)
+                except requests.RequestException:
+                    dead.append(url)
+        return dead
+
+    def format_stats(self):
+        """
+        Formats the cache hits and misses as a human readable report.
+        """
+        stats = self.stats
+        return (f"Hits: {stats['hits']}\n"
+                f"Misses: {stats['misses']}\n"
+                f"Expired entries: {stats['expired']}\n"
+                f"Dead cached listings: {stats['dead_listings']}\n"
+                f"Bypassed: {stats['bypassed']}")
@@ -1,21 +1,93 @@
-import time
 from selenium.webdriver.common.by import By
 from selenium.webdriver.remote.webdriver import WebDriver
+from selenium.common.exceptions import TimeoutException
 from base_page import BasePage
+from locators import MultiLocator
+from composite_actions import CompositeAction
+from timeline import traced
 from home_page import HomePage
+from prices import BudgetScreen
+
+# Pulls every card's fields in one round trip. arguments: card selector, link selector
+_EXTRACT_CARDS_SCRIPT = """
+var linkSelector = arguments[1];
+var textOf = function (root, selector) {
+    var node = root.querySelector(selector);
+    return node ? node.textContent.trim() : '';
+};
+return Array.from(document.querySelectorAll(arguments[0])).map(function (card) {
+    var link = card.querySelector(linkSelector);
+    var title = textOf(card, '.s-card__title');
+    var shipping = '';
+    card.querySelectorAll('.s-card__attribute-row, .s-item__shipping').forEach(function (row) {
+        if (!shipping && /delivery|shipping/i.test(row.textContent)) {
+            shipping = row.textContent.trim();
+        }
+    });
+    // "Shop on eBay" placeholder cards and promoted listings are not real results
+    var sponsored = title.indexOf('Shop on eBay') === 0 ||
+        !!card.querySelector('[aria-label*="Sponsored"], .s-card__footer--sponsored') ||
+        /^\\s*Sponsored/.test(textOf(card, '.s-card__footer, .su-card-container__attributes__secondary'));
+    return {
+        url: link ? link.href : null,
+        title: title.replace(/^New Listing/, '').replace(/Opens in a new window or tab$/, '').trim(),
+        price: textOf(card, '.s-card__price, .s-item__price'),
+        shipping: shipping,
+        sponsored: sponsored
+    };
+});
+"""
+
+# Returns the next result page URL, or null on the last page
+_NEXT_PAGE_SCRIPT = """
+var next = document.querySelector(arguments[0]);
+return next && next.getAttribute('aria-disabled') !== 'true' && next.href ? next.href : null;
+"""
 
 class SearchResultsPage(BasePage):
     # Locators
     MAX_PRICE_INPUT = (By.XPATH, "//label[contains(text(), 'Max')]/following::input[1]")
     PRICE_FILTER_BUTTON = (By.CLASS_NAME, "x-textrange__button")
-    ITEM_CARDS = (By.CLASS_NAME, "s-card")
-    ITEM_LINK_SELECTOR = (By.CLASS_NAME, "su-link")
+    ITEM_CARDS = MultiLocator("search.item_cards",
+                              (By.CSS_SELECTOR, "li.s-card"),
+                              (By.CSS_SELECTOR, ".s-card"),
+                              (By.CSS_SELECTOR, "li.s-item"))
+    ITEM_LINK_SELECTOR = (By.CSS_SELECTOR, "a.su-link, a.s-item__link")
+    NEXT_PAGE_LINK = (By.CSS_SELECTOR, "a.pagination__next")
+
+    SEARCH_BACKENDS = ("browser", "http")
+    PRICE_SCREENING = (None, "price", "price+shipping")
+    # With price screening, cards are read until limit of them pass, at most this many times limit
+    SCREENING_SCAN_FACTOR = 3
 
-    def __init__(self, driver: WebDriver):
+    def __init__(self, driver: WebDriver, search_backend: str = "browser", base_url: str = None,
+                 search_cache=None, price_screening: str = None, budget_currency: str = None):
+        """
+        Args:
+            driver: The WebDriver used for browser searches
+            search_backend: "browser" drives the search UI, "http" fetches the filtered results without the browser
+            base_url: Site root used by the http backend (default: BASE_URL)
+            search_cache: Optional SearchCache that reuses the item URLs of a recent identical search
+            price_screening: "price" or "price+shipping" prefilters and ranks the result cards by the prices
+                they show (see prices.BudgetScreen), None keeps eBay's results as they are
+            budget_currency: Currency of max_price for price screening (default: the most common among the cards)
+        """
         super().__init__(driver)
-        self.home_page = HomePage(driver)
+        if search_backend not in self.SEARCH_BACKENDS:
+            raise ValueError(f"Unknown search backend '{search_backend}', expected one of {self.SEARCH_BACKENDS}")
+        if price_screening not in self.PRICE_SCREENING:
+            raise ValueError(f"Unknown price screening '{price_screening}', expected one of {self.PRICE_SCREENING}")
+        self.search_backend = search_backend
+        self.base_url = base_url or self.BASE_URL
+        self.home_page = HomePage(driver) if search_backend == "browser" else None
+        self.search_cache = search_cache
+        self.price_screening = price_screening
+        self.budget_currency = budget_currency
+        self.budget_screen = None
 
-    def search_item_by_name_under_price(self, item_name: str, max_price: float, limit: int = 5) -> list:
+    @traced("search and filter")
+    def search_item_by_name_under_price(self, item_name: str, max_price: float, limit: int = 5,
+                                        budget_items: int = None) -> list:
         """
         Searches for an item by name and filters results by maximum price.
         
@@ -23,21 +95,70 @@ class SearchResultsPage(BasePage):
             item_name: The name of the item to search for
             max_price: The maximum price to filter by
             limit: Maximum number of items to return (default: 5)
+            budget_items: With price screening, how many of the items have to fit in
+                max_price * budget_items together (default: limit)
             
         Returns:
             list: URLs of the filtered items
         """
-        # Perform the initial search
-        self.home_page.search_for_item(item_name)
-        
-        # Apply price filter
-        time.sleep(3)  # Wait for search results to load
-        self.do_send_keys(self.MAX_PRICE_INPUT, str(max_price))
-        self.do_click(self.PRICE_FILTER_BUTTON)
-        time.sleep(3)  # Wait for the filter to apply
-        
-        # Get the filtered item URLs
-        return self.get_item_urls(limit)
+        if self.price_screening:
+            budget_items = budget_items or limit
+            self.budget_screen = BudgetScreen(max_price, total_budget=float(max_price) * budget_items,
+                                              currency=self.budget_currency,
+                                              include_shipping=self.price_screening == "price+shipping")
+        if self.search_cache is None:
+            return self._search(item_name, max_price, limit, budget_items)
+
+        screening = self.price_screening if self.budget_currency is None else [self.price_screening,
+                                                                               self.budget_currency]
+        cache_key = self.search_cache.key(self.base_url, item_name, max_price, limit, screening)
+        item_urls = self.search_cache.get(cache_key)
+        if item_urls is not None:
+            print(f"Reusing {len(item_urls)} cached results for '{item_name}' under {max_price}")
+            return item_urls
+        item_urls = self._search(item_name, max_price, limit, budget_items)
+        # A short list may be a transient failure, only full results are worth reusing
+        if len(item_urls) >= limit:
+            self.search_cache.put(cache_key, item_urls)
+        return item_urls
+
+    def _search(self, item_name, max_price, limit, budget_items):
+        # Screening rejects cards, so more of them are read than will be returned
+        read_limit = limit * self.SCREENING_SCAN_FACTOR if self.budget_screen else limit
+        if self.search_backend == "http":
+            # Only the http backend needs requests, browser runs skip importing it
+            from http_search import HttpSearchClient
+            with HttpSearchClient(self.base_url) as client:
+                items = client.search_items(item_name, max_price, read_limit)
+        else:
+            # Perform the initial search, this waits for the results page
+            self.home_page.search_for_item(item_name)
+
+            # Apply price filter
+            self._apply_max_price(max_price)
+
+            items = self.iter_items(read_limit)
+
+        if not self.budget_screen:
+            return [item["url"] for item in items]
+        return self.screen_item_urls(items, limit, budget_items)
+
+    def screen_item_urls(self, items, limit, budget_items):
+        """
+        Reads items until limit of them pass the budget screen, then ranks them.
+        Nothing is read past the last item needed, so lazily fetched result pages stay unvisited.
+
+        Returns:
+            list: URLs of the passing items, the likeliest to fit the budget first
+        """
+        accepted = []
+        for item in items:
+            if self.budget_screen.accept(item):
+                accepted.append(item)
+                if len(accepted) >= limit:
+                    break
+        print(f"{len(accepted)} of {self.budget_screen.screened} result cards fit the budget")
+        return [item["url"] for item in self.budget_screen.rank(accepted, slots=budget_items)]
         
     def set_max_price(self, max_price):
         """
@@ -46,33 +167,77 @@ class SearchResultsPage(BasePage):
         Note: This method is kept for backward compatibility.
         Consider using search_item_by_name_under_price instead.
         """
-        time.sleep(3)  # Allowing time for elements to be fully ready
-        self.do_send_keys(self.MAX_PRICE_INPUT, str(max_price))
-        self.do_click(self.PRICE_FILTER_BUTTON)
-        time.sleep(3)  # Wait for the filter to apply
+        self.wait_for_network_idle()
+        self._apply_max_price(max_price)
 
-    def get_item_urls(self, limit):
+    @traced("apply max price")
+    def _apply_max_price(self, max_price):
         """
-        Gets the URLs of the items on the page up to a given limit.
-        Skips the first 2 results as they are often ads.
+        Types the max price, submits the filter and waits for the filtered results.
+        """
+        results_url = self.driver.current_url
+        # Filling and submitting the filter is a single script call
+        self.perform(CompositeAction("filter by max price")
+                     .fill(self.MAX_PRICE_INPUT, max_price)
+                     .click(self.PRICE_FILTER_BUTTON))
+        # The filter reloads the results with the price in the query string
+        self.wait_for_url_change(results_url)
+        self.wait_for_network_idle()
+
+    @traced("extract result cards")
+    def extract_items(self) -> list:
+        """
+        Reads every result card on the current page in a single script execution.
+
+        Returns:
+            list: One dict per card with url, title, price, shipping and sponsored keys
         """
-        urls = []
         try:
-            items = self.get_elements(self.ITEM_CARDS)
-            # Process only up to the limit or the number of items found
-            num_to_process = min(limit, len(items))
-            
-            for i in range(num_to_process):
-                try:
-                    card = items[i]
-                    # Find the link element within each item card
-                    url_element = card.find_element(self.ITEM_LINK_SELECTOR[0], self.ITEM_LINK_SELECTOR[1])
-                    url = url_element.get_attribute("href")
-                    urls.append(url)
-                except Exception as e:
-                    print(f"Could not get URL for item {i + 1}: {e}")
-        except Exception as e:
-            print(f"Could not find item cards: {e}")
-
-        # Remove the first 2 URLs as they are likely ads, per original logic
-        return urls[2:] if len(urls) > 2 else []
+            _, cards_locator = self.find_first(self.ITEM_CARDS, visible=False)
+        except TimeoutException:
+            print("Could not find item cards on this page.")
+            return []
+        return self.driver.execute_script(_EXTRACT_CARDS_SCRIPT, cards_locator[1], self.ITEM_LINK_SELECTOR[1])
+
+    def iter_items(self, limit: int, max_pages: int = 5):
+        """
+        Lazily walks the result pages and yields organic (non-sponsored) items until limit is met.
+
+        The generator drives the browser to the following result pages, so it must be
+        exhausted or closed before the driver is used for anything else.
+
+        Args:
+            limit: Number of items to yield
+            max_pages: Maximum number of result pages to visit (default: 5)
+
+        Yields:
+            dict: Item as returned by extract_items
+        """
+        if limit <= 0:
+            return
+        seen_urls = set()
+        yielded = 0
+        for page_number in range(1, max_pages + 1):
+            items = self.extract_items()
+            print(f"Results page {page_number}: {len(items)} cards")
+            for item in items:
+                if item["sponsored"] or not item["url"] or item["url"] in seen_urls:
+                    continue
+                seen_urls.add(item["url"])
+                yield item
+                yielded += 1
+                if yielded >= limit:
+                    return
+
+            next_page_url = self.driver.execute_script(_NEXT_PAGE_SCRIPT, self.NEXT_PAGE_LINK[1])
+            if not next_page_url:
+                return
+            # Result pages share their path and differ in the _pgn parameter only
+            self.open(next_page_url, compare_query=True)
+
+    def get_item_urls(self, limit):
+        """
+        Gets the URLs of organic (non-sponsored) items up to a given limit,
+        continuing on the following result pages when the current one runs short.
+        """
+        return [item["url"] for item in self.iter_items(limit)]
@@ -0,0 +1,71 @@
+import hashlib
+import os
+import time
+
+from json_files import read_json, write_json_atomic
+
+
+class SessionCache:
+    """
+    On-disk cache of authenticated browser sessions (cookies and web storage), one file per username.
+
+    Point several workers at the same cache_dir to let them share one warm session.
+    """
+
+    def __init__(self, cache_dir=".session_cache", ttl_seconds=12 * 60 * 60):
+        """
+        Args:
+            cache_dir: Directory holding the cached sessions
+            ttl_seconds: Age after which a cached session is no longer used
+        """
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+
+    def _path(self, username):
+        # Hash the username so e-mail addresses do not end up in file names
+        digest = hashlib.sha256(username.lower().encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def load(self, username):
+        """
+        Returns the cached session for username, or None if there is none or it has expired.
+
+        Returns:
+            dict: cookies, local_storage, session_storage and saved_at keys
+        """
+        session = read_json(self._path(username))
+        if session is None:
+            return None
+
+        age = time.time() - session.get("saved_at", 0)
+        if age > self.ttl_seconds:
+            print(f"Cached session is {age / 60:.0f} minutes old, past its TTL")
+            self.invalidate(username)
+            return None
+
+        now = time.time()
+        session["cookies"] = [cookie for cookie in session.get("cookies", [])
+                              if cookie.get("expiry") is None or cookie["expiry"] > now]
+        return session
+
+    def save(self, username, cookies, local_storage=None, session_storage=None):
+        """
+        Stores a session for username, replacing any previous one atomically.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        session = {
+            "saved_at": time.time(),
+            "cookies": cookies,
+            "local_storage": local_storage or {},
+            "session_storage": session_storage or {},
+        }
+        write_json_atomic(self._path(username), session, indent=None)
+
+    def invalidate(self, username):
+        """
+        Removes the cached session for username, if any.
+        """
+        try:
+            os.remove(self._path(username))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,105 @@
+"""
+Measures how long a test takes to get going: importing the test module, launching the
+browser and getting the first page ready, with an empty profile and with the profile template.
+
+    python startup_benchmark.py --runs 3
+    python startup_benchmark.py --replay-dir saved_pages    # offline, against a recording
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+from config import load_settings
+
+_IMPORT_SNIPPET = "import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+
+
+def measure_import(module, runs):
+    """
+    Imports module in fresh interpreters, so nothing is already loaded.
+
+    Returns:
+        list: Seconds per run
+    """
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", _IMPORT_SNIPPET.format(module=module)],
+                                capture_output=True, text=True, check=True).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return timings
+
+
+def measure_browser(runs, settings, profile_template=None):
+    """
+    Launches a browser and opens the home page until its search box is there.
+
+    Returns:
+        tuple: (launch seconds per run, first page ready seconds per run)
+    """
+    from driver_factory import create_driver
+    from home_page import HomePage
+
+    launches, first_pages = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        driver = create_driver(settings['block_resources'], settings['page_load_strategy'], profile_template)
+        launches.append(time.perf_counter() - start)
+        try:
+            start = time.perf_counter()
+            home_page = HomePage(driver)
+            home_page.open()
+            home_page.wait_for("search box", lambda _: home_page.has_element_now(HomePage.SEARCH_BOX))
+            first_pages.append(time.perf_counter() - start)
+        finally:
+            driver.quit()
+    return launches, first_pages
+
+
+def format_row(name, timings):
+    return f"{name:<40} median {statistics.median(timings):7.3f}s   min {min(timings):7.3f}s   max {max(timings):7.3f}s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="repetitions of every measurement")
+    parser.add_argument("--module", default="test_ebay_flow", help="module whose import is timed")
+    parser.add_argument("--replay-dir", help="serve this recording locally instead of using the live site")
+    parser.add_argument("--skip-browser", action="store_true", help="only time the import")
+    args = parser.parse_args()
+
+    rows = [format_row(f"import {args.module}", measure_import(args.module, args.runs))]
+    if not args.skip_browser:
+        from base_page import BasePage, set_base_url
+        from profile_template import PROFILE_TEMPLATE_DIR, ProfileTemplate
+
+        settings = load_settings()
+        replay_server = None
+        if args.replay_dir:
+            from replay import ReplayServer
+            replay_server = ReplayServer(args.replay_dir).start()
+            set_base_url(replay_server.base_url)
+        try:
+            launches, first_pages = measure_browser(args.runs, settings)
+            rows.append(format_row("launch, empty profile", launches))
+            rows.append(format_row("first page ready, empty profile", first_pages))
+
+            template = ProfileTemplate(settings['profile_template_dir'] or PROFILE_TEMPLATE_DIR,
+                                       max_age_seconds=settings['profile_template_max_age_hours'] * 60 * 60)
+            start = time.perf_counter()
+            template_dir = template.ensure(BasePage.BASE_URL, settings['block_resources'],
+                                           settings['page_load_strategy'])
+            rows.append(format_row("template ready (built or reused)", [time.perf_counter() - start]))
+            launches, first_pages = measure_browser(args.runs, settings, template_dir)
+            rows.append(format_row("launch, profile template", launches))
+            rows.append(format_row("first page ready, profile template", first_pages))
+        finally:
+            if replay_server:
+                replay_server.close()
+
+    print("\n".join(rows))
+
+
+if __name__ == "__main__":
+    main()
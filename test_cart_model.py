@@ -0,0 +1,63 @@
+import pytest
+
+import cart_page
+from base_page import _CART_COUNT_SCRIPT
+from cart_page import CartMismatch, CartModel, CartPage
+
+
+def test_cart_model_totals_quantities_and_keeps_currency():
+    cart = CartModel.from_extracted([
+        {"id": "1", "title": "Chinos", "quantity": 2, "price": "ILS 45.00"},
+        {"id": "2", "title": "Trousers", "quantity": 1, "price": "ILS 1,030.50"},
+    ])
+
+    assert (cart.total, cart.currency, len(cart)) == (1120.5, "ILS", 3)
+    assert cart.exceeds(1000)
+    assert not cart.exceeds(1200)
+
+
+def test_cart_model_refuses_totals_it_cannot_compare():
+    mixed = CartModel.from_extracted([{"title": "A", "quantity": 1, "price": "ILS 10.00"},
+                                      {"title": "B", "quantity": 1, "price": "USD 10.00"}])
+    unpriced = CartModel.from_extracted([{"title": "A", "quantity": 1, "price": None}])
+
+    with pytest.raises(ValueError):
+        mixed.total
+    with pytest.raises(ValueError):
+        unpriced.total
+
+
+class StubCartDriver:
+    """
+    Stays on the cart page and answers the cart page's scripts from a list of line rows.
+    """
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.current_url = CartPage(self).site_url(CartPage.CART_URL)
+
+    def execute_script(self, script, *args):
+        if script == cart_page._EXTRACT_CART_SCRIPT:
+            return list(self.lines)
+        if script == cart_page._LINE_ITEM_COUNT_SCRIPT:
+            return len(self.lines)
+        if script == _CART_COUNT_SCRIPT:
+            return sum(line["quantity"] for line in self.lines)
+        raise AssertionError(f"Unexpected script {script[:40]!r}")
+
+    def get_screenshot_as_png(self):
+        return b""
+
+
+def test_items_left_in_the_cart_are_not_counted_as_added():
+    driver = StubCartDriver([{"id": "1", "title": "Old", "quantity": 1, "price": "ILS 500.00"}])
+    page = CartPage(driver)
+    page.read_starting_cart()
+
+    driver.lines.append({"id": "2", "title": "New", "quantity": 1, "price": "ILS 45.00"})
+    page.read_cart(added_items=1)
+    assert page.added_total == 45.0
+    page.assert_cart_total_not_exceeds(50, added_items=1)
+
+    with pytest.raises(CartMismatch):
+        page.read_cart(added_items=2)
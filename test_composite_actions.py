@@ -0,0 +1,56 @@
+from selenium.webdriver.common.by import By
+
+from composite_actions import CompositeAction
+from locators import LocatorStats, MultiLocator
+from timeline import Timeline
+
+USERNAME = MultiLocator("test.username", (By.ID, "userid"), (By.NAME, "userid"))
+CONTINUE = (By.ID, "signin-continue-btn")
+
+
+def test_native_steps_end_a_script_call():
+    action = (CompositeAction("sign in")
+              .read_text("heading", (By.CSS_SELECTOR, "h1"))
+              .fill(USERNAME, "user@example.com", native=True)
+              .click(CONTINUE, native=True)
+              .read_attribute("action", (By.ID, "signin-form"), "action"))
+
+    assert [[step["op"] for step in batch] for batch in action.batches()] == \
+        [["text", "fill"], ["click"], ["attribute"]]
+
+
+def test_script_steps_carry_every_candidate():
+    steps = CompositeAction.script_steps(CompositeAction("fill").fill(USERNAME, 42).steps)
+
+    assert steps == [{"op": "fill", "native": False, "text": "42",
+                      "candidates": [["id", "userid"], ["name", "userid"]]}]
+
+
+def test_commands_are_counted_per_step():
+    timeline = Timeline()
+    with timeline.span("login"):
+        with timeline.span("enter username"):
+            timeline.count_command("executeScript")
+            timeline.count_command("sendKeysToElement")
+    with timeline.span("enter username"):
+        timeline.count_command("executeScript")
+
+    assert timeline.commands_by_step() == {"login": 2, "enter username": 3}
+    assert timeline.format_command_counts(["login"]).startswith("Total: 3\nlogin: 2\n")
+
+
+def test_locator_stats_of_parallel_workers_add_up(tmp_path):
+    file_path = str(tmp_path / "locator_stats.json")
+    first, second = LocatorStats(file_path), LocatorStats(file_path)
+    first.record_hit(USERNAME.name, (By.NAME, "userid"))
+    second.record_hit(USERNAME.name, (By.NAME, "userid"))
+    second.record_hit(USERNAME.name, (By.ID, "userid"))
+    first.save()
+    second.save()
+    second.save()
+
+    stats = LocatorStats(file_path)
+    assert stats.hit_count(USERNAME.name, (By.NAME, "userid")) == 2
+    assert stats.hit_count(USERNAME.name, (By.ID, "userid")) == 1
+    assert USERNAME.ordered_candidates(stats)[0] == (By.NAME, "userid")
+    assert list(tmp_path.iterdir()) == [tmp_path / "locator_stats.json"]
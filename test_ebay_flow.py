@@ -1,22 +1,22 @@
 
 import json
+import time
 import pytest
 import allure
-from selenium import webdriver
 from selenium.webdriver.remote.webdriver import WebDriver
 
 # Import all the page objects
-from home_page import HomePage
 from search_results_page import SearchResultsPage
 from product_page import ProductPage
 from cart_page import CartPage
 from login_page import LoginPage
-
-
-def load_test_data(file_path):
-    """Loads test data from the specified JSON file."""
-    with open(file_path, 'r') as f:
-        return json.load(f)
+from base_page import format_wait_timings, format_navigation_stats
+from config import load_settings
+from session_cache import SessionCache
+from search_cache import SearchCache
+from screenshots import ScreenshotService
+from timeline import Timeline
+from scheduler import ItemAlreadyAdded, ItemScheduler
 
 
 def validate_test_data(data):
@@ -38,91 +38,226 @@ def validate_test_data(data):
     except (ValueError, TypeError):
         pytest.fail("Test data error: 'item_limit' must be a valid integer.")
 
-    if 'username' not in data or 'password' not in data:
-        pytest.fail("Test data error: 'username' and 'password' are required for login.")
+    for key in ('username', 'password'):
+        if not isinstance(data.get(key), str) or not data[key].strip():
+            pytest.fail(f"Test data error: '{key}' must be a non-empty string, it is required for login.")
+
+
+def add_items_with_pool(driver, item_urls, settings, screenshots):
+    """Adds the items to the cart with a pool of browsers cloned from the logged-in driver, returns how many were added."""
+    # Optional features import their modules only when enabled, to keep the test's startup short
+    from driver_pool import DriverPool
+    with DriverPool(driver.get_cookies(),
+                    size=settings['workers'],
+                    backend=settings['worker_backend'],
+                    pages_per_worker=settings['pages_per_worker'],
+                    block_resources=settings['block_resources'],
+                    page_load_strategy=settings['page_load_strategy'],
+                    profile_template=driver.load_profile.get('profile_template')) as pool:
+        results = pool.add_items_to_cart(item_urls)
+
+    for result in results:
+        index = result['index']
+        with allure.step(f"Processing item {index}/{len(item_urls)}"):
+            if result['success']:
+                name = f"item{index}"
+            else:
+                name = f"item{index}_error"
+                allure.attach(result['error'], name=f"item{index}_error")
+            if result['screenshot']:
+                screenshots.submit(result['screenshot'], name, failure=not result['success'])
+    # The cart lives on the account, reload so the main session sees the workers' additions
+    driver.refresh()
+    return sum(1 for result in results if result['success'])
 
 
 @allure.title("Ebay Shopping Flow Test")
 @allure.description("This test simulates a full user journey: logging in, searching for an item, filtering by price, adding multiple items to the cart, and verifying the total.")
-def test_ebay_shopping_journey():
-    """Main function to run the automation flow."""
-    driver: WebDriver = None
+def test_ebay_shopping_journey(driver: WebDriver, scenario, site):
+    """Main function to run the automation flow for one scenario of data.json (see conftest.py)."""
+    # The replay server, if any, is started by the site fixture and outlives the driver's cart cleanup
+    replay_server = site
+    screenshots = None
+    timeline = None
+    recorder = None
+    prefetcher = None
+    search_cache = None
+    scheduler = None
     try:
         # --- Load and Validate Test Data ---
-        with allure.step("Load and validate test data from data.json"):
+        with allure.step(f"Load and validate scenario '{scenario['name']}' from data.json"):
             try:
-                test_data = load_test_data('data.json')
-                validate_test_data(test_data)
-                search_term = test_data['search_term']
-                max_price = test_data['max_price']
-                item_limit = test_data['item_limit'] + 2
-                username = test_data['username']
-                password = test_data['password']
-                allure.attach(json.dumps(test_data, indent=4), name="Test Data", attachment_type=allure.attachment_type.JSON)
+                validate_test_data(scenario)
+                search_term = scenario['search_term']
+                max_price = scenario['max_price']
+                item_limit = scenario['item_limit']
+                username = scenario['username']
+                password = scenario['password']
+                settings = load_settings('data.json')
+                report_data = {key: value for key, value in scenario.items() if key != 'password'}
+                allure.attach(json.dumps(report_data, indent=4), name="Test Data", attachment_type=allure.attachment_type.JSON)
+                screenshots = ScreenshotService(image_format=settings['screenshot_format'],
+                                                quality=settings['screenshot_quality'],
+                                                max_width=settings['screenshot_max_width'],
+                                                every_nth_success=settings['screenshot_every_nth_success'])
+                if settings['record_dir'] and not replay_server:
+                    # Attached before the timeline so the recorder's scripts are not counted
+                    from replay import Recorder
+                    recorder = Recorder(settings['record_dir'])
+                    recorder.attach(driver)
+                timeline = Timeline(budgets=settings['step_budgets'])
+                timeline.instrument(driver)
             except (FileNotFoundError, KeyError) as e:
                 pytest.fail(f"Failed to load or parse test data: {e}")
 
-        # --- Initialize WebDriver ---
-        with allure.step("Initialize Chrome WebDriver"):
-            driver = webdriver.Chrome()
-            driver.maximize_window()
-            driver.implicitly_wait(10)
-
         # --- Login Step ---
         with allure.step(f"Log in with user: {username}"):
-            login_page = LoginPage(driver)
-            login_page.login(username, password)
-            # You might want to add an assertion here to verify login was successful
-
-        # --- Start of the automation flow ---
-        home_page = HomePage(driver)
+            if replay_server:
+                # The replayed site has no sign-in, its cart works without one
+                allure.attach(settings['replay_dir'], name="Login skipped, replaying recording")
+            else:
+                session_cache = SessionCache(settings['session_cache_dir'], ttl_seconds=settings['session_ttl_minutes'] * 60)
+                login_page = LoginPage(driver, session_cache=session_cache)
+                login_page.login(username, password)
+                # You might want to add an assertion here to verify login was successful
 
         # --- Search for Items and Filter by Price ---
         with allure.step(f"Search for '{search_term}' with max price {max_price}"):
-            search_results_page = SearchResultsPage(driver)
-            item_urls = search_results_page.search_item_by_name_under_price(
+            search_cache = SearchCache(settings['search_cache_file'],
+                                       ttl_seconds=settings['search_cache_ttl_minutes'] * 60,
+                                       max_entries=settings['search_cache_max_entries'],
+                                       bypass=settings['search_cache_bypass'])
+            search_results_page = SearchResultsPage(driver, search_backend=settings['search_backend'],
+                                                    search_cache=search_cache,
+                                                    price_screening=settings['price_screening'],
+                                                    budget_currency=settings['budget_currency'])
+            # The results beyond item_limit replace items that fail or time out
+            candidate_urls = search_results_page.search_item_by_name_under_price(
                 item_name=search_term,
                 max_price=max_price,
-                limit=item_limit
+                limit=item_limit + settings['replacement_candidates'],
+                budget_items=item_limit
             )
-            if not item_urls:
+            if search_results_page.budget_screen and search_results_page.budget_screen.screened:
+                allure.attach(search_results_page.budget_screen.format_report(), name="Price Screening")
+            if not candidate_urls:
                 pytest.fail("No item URLs were found after filtering.")
-            allure.attach(f"Found {len(item_urls)} items to process.", name="Item URLs Count")
+            item_urls = candidate_urls[:item_limit]
+            allure.attach(f"Found {len(item_urls)} items to process "
+                          f"and {len(candidate_urls) - len(item_urls)} replacements.", name="Item URLs Count")
 
 
         # --- Add Items to Cart ---
+        cart_page = CartPage(driver, screenshots=screenshots)
+        # The currency the result cards were screened in, product prices are only confirmed in it
+        budget_screen = search_results_page.budget_screen
+        budget_currency = budget_screen.budget_currency if budget_screen else settings['budget_currency']
+        max_budget = float(max_price) * len(item_urls)
+        with allure.step("Read the cart before adding items"):
+            # Items left from earlier runs are neither counted as added nor against the budget
+            start_cart = cart_page.read_starting_cart()
+            if start_cart.items:
+                allure.attach(f"{len(start_cart)} items, total {start_cart.currency} {start_cart.total:.2f}",
+                              name="Starting Cart")
         with allure.step(f"Visit each product page and add items to cart"):
-            for index, url in enumerate(item_urls, start=1):
-                with allure.step(f"Processing item {index}/{len(item_urls)}"):
-                    try:
-                        product_page = ProductPage(driver, url)
-                        product_page.add_item_to_cart(index)
-                        allure.attach(driver.get_screenshot_as_png(), name=f"item{index}.png", attachment_type=allure.attachment_type.PNG)
-                    except Exception as e:
-                        allure.attach(driver.get_screenshot_as_png(), name=f"item{index}_error.png", attachment_type=allure.attachment_type.PNG)
-                        print(f"Error adding item {index}: {e}")
-                        continue
+            if settings['workers'] > 1:
+                added_count = add_items_with_pool(driver, item_urls, settings, screenshots)
+            else:
+                if settings['prefetch_depth'] > 0:
+                    from prefetch import TabPrefetcher
+                    prefetcher = TabPrefetcher(driver, candidate_urls, depth=settings['prefetch_depth'])
+                scheduler = ItemScheduler(driver, candidate_urls, target=len(item_urls),
+                                          item_timeout=settings['item_timeout_seconds'],
+                                          run_timeout=settings['run_timeout_seconds'],
+                                          max_retries=settings['item_retries'],
+                                          backoff_seconds=settings['retry_backoff_seconds'])
+
+                def add_item(index, url, attempt):
+                    with allure.step(f"Processing item {index}/{len(candidate_urls)}, attempt {attempt}"), \
+                            timeline.span("process item", index=index, url=url, attempt=attempt):
+                        product_page = None
+                        try:
+                            if prefetcher:
+                                prefetcher.activate(index - 1)
+                            # With price screening the selected variant's price is confirmed before adding
+                            product_page = ProductPage(driver, url,
+                                                       max_price=max_price if settings['price_screening'] else None,
+                                                       include_shipping=settings['price_screening'] == "price+shipping",
+                                                       currency=budget_currency)
+                            product_page.add_item_to_cart(index)
+                            screenshots.capture(driver, f"item{index}")
+                            # The item being added is not counted in scheduler.added yet
+                            cart_page.read_cart(added_items=len(scheduler.added) + 1)
+                        except Exception as e:
+                            screenshots.capture(driver, f"item{index}_error", failure=True)
+                            print(f"Error adding item {index}: {e}")
+                            if product_page is not None and product_page.add_clicked:
+                                # A retry or replacement could put a second item in the cart
+                                raise ItemAlreadyAdded(f"Item {index} was clicked into the cart, "
+                                                       f"then: {type(e).__name__}: {e}") from e
+                            raise
+                        finally:
+                            if prefetcher:
+                                prefetcher.finish(index - 1)
+                        if cart_page.added_total > max_budget:
+                            message = (f"Added items total {cart_page.model.currency} {cart_page.added_total:.2f} "
+                                       f"exceeds budget {max_budget:.2f} after item {index}, "
+                                       f"the remaining items were not visited")
+                            allure.attach(message, name="Budget Verification")
+                            pytest.fail(message)
+
+                scheduler.run(add_item)
+                added_count = len(scheduler.added)
+            if item_urls and not added_count:
+                pytest.fail("No item could be added to the cart, there is no total to verify.")
 
         # --- View Cart and Assert Total ---
         with allure.step("Verify cart total does not exceed budget"):
-            cart_page = CartPage(driver)
-            max_budget = float(max_price) * len(item_urls)
-            
-            # This will take a screenshot and assert the total
-            cart_page.assert_cart_total_not_exceeds(max_budget)
+            # Reads the cart's line items and takes a screenshot before asserting the total
+            cart_page.assert_cart_total_not_exceeds(max_budget, added_items=added_count)
             
             # Attach the budget info to the report
-            allure.attach(f"Cart Total: {cart_page.cart_total}\nMax Budget: {max_budget}", 
+            allure.attach(f"Cart Total: {cart_page.cart_total}\nAdded Items Total: {cart_page.added_total}\n"
+                          f"Max Budget: {max_budget}", 
                          name="Budget Verification")
 
+        # --- Check Step Time Budgets ---
+        if timeline.budget_violations:
+            message = "Steps over their time budget:\n" + "\n".join(timeline.budget_violations)
+            allure.attach(message, name="Budget Violations")
+            if settings['fail_on_budget']:
+                pytest.fail(message)
+
 
     except Exception as e:
         # Attach a screenshot on any failure in the main flow
-        if driver:
+        if screenshots:
+            screenshots.capture(driver, "test_failure_screenshot", failure=True)
+        else:
             allure.attach(driver.get_screenshot_as_png(), name="test_failure_screenshot.png", attachment_type=allure.attachment_type.PNG)
         pytest.fail(f"An unexpected error occurred during the main flow: {e}")
 
     finally:
-        # --- Clean up ---
-        if driver:
-            driver.quit()
+        # --- Report how long each page wait actually took ---
+        allure.attach(format_wait_timings(), name="Wait Timings")
+        allure.attach(format_navigation_stats(), name="Navigation Stats")
+        if screenshots:
+            screenshots.close()
+            allure.attach(screenshots.format_stats(), name="Screenshot Stats")
+        if scheduler:
+            allure.attach(scheduler.format_summary(), name="Item Scheduler Summary")
+        if search_cache:
+            allure.attach(search_cache.format_stats(), name="Search Cache Stats")
+        if prefetcher:
+            prefetcher.close()
+            allure.attach(prefetcher.format_stats(), name="Prefetch Stats")
+        if timeline:
+            Timeline.uninstrument(driver)
+            timeline.save(settings['timeline_dir'], f"timeline_{time.strftime('%Y%m%d_%H%M%S')}")
+            allure.attach(timeline.to_json(), name="Performance Timeline", attachment_type=allure.attachment_type.JSON)
+            allure.attach(timeline.format_command_counts(("login", "search and filter", "apply max price",
+                                                          "add item to cart", "read cart")),
+                          name="WebDriver Commands")
+        if recorder:
+            recorder.detach(driver)
+            recorder.save()
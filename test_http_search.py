@@ -0,0 +1,119 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from conftest import SAVED_PAGES_DIR
+from http_search import HttpSearchClient
+from search_results_page import SearchResultsPage
+
+
+
+@pytest.fixture
+def stand_in_server():
+    """Serves the saved search result pages from a local keep-alive HTTP server."""
+    requests_seen = []
+
+    class SearchHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            requests_seen.append({"path": self.path, "query": query, "client_port": self.client_address[1]})
+            page = query.get("_pgn", ["1"])[0]
+            file_path = os.path.join(SAVED_PAGES_DIR, f"search_results_page{page}.html")
+            if not os.path.exists(file_path):
+                self.send_error(404)
+                return
+            with open(file_path, "rb") as f:
+                body = f.read()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SearchHandler)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    server.requests_seen = requests_seen
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_parses_result_cards(stand_in_server):
+    with HttpSearchClient(stand_in_server.base_url) as client:
+        items, next_page_url = client.fetch_page(client.build_search_url("pants", 200))
+
+    assert [item["sponsored"] for item in items] == [True, True, False, False, False]
+    assert items[2] == {
+        "url": "https://www.ebay.com/itm/222222222222?hash=def",
+        "title": "Men's Slim Chino Pants",
+        "price": "ILS 45.00",
+        "shipping": "+ILS 12.50 delivery",
+        "sponsored": False,
+    }
+    assert items[3]["url"] == f"{stand_in_server.base_url}/itm/333333333333"
+    assert items[3]["price"] == "ILS 30.00 to ILS 55.00"
+    assert next_page_url == f"{stand_in_server.base_url}/sch/i.html?_nkw=pants&_udhi=200&_pgn=2"
+
+
+def test_search_applies_max_price_and_paginates(stand_in_server):
+    with HttpSearchClient(stand_in_server.base_url) as client:
+        urls = client.search_item_urls("pants", 200, limit=4)
+
+    assert urls == [
+        "https://www.ebay.com/itm/222222222222?hash=def",
+        f"{stand_in_server.base_url}/itm/333333333333",
+        "https://www.ebay.com/itm/444444444444",
+        "https://www.ebay.com/itm/555555555555",
+    ]
+    first_request = stand_in_server.requests_seen[0]["query"]
+    assert first_request["_nkw"] == ["pants"]
+    assert first_request["_udhi"] == ["200"]
+    assert len(stand_in_server.requests_seen) == 2
+
+
+def test_search_stops_on_last_page(stand_in_server):
+    with HttpSearchClient(stand_in_server.base_url) as client:
+        urls = client.search_item_urls("pants", 200, limit=50)
+
+    assert len(urls) == 5
+    assert len(stand_in_server.requests_seen) == 2
+
+
+def test_pages_are_fetched_over_one_connection(stand_in_server):
+    with HttpSearchClient(stand_in_server.base_url) as client:
+        client.search_item_urls("pants", 200, limit=5)
+
+    assert len({request["client_port"] for request in stand_in_server.requests_seen}) == 1
+
+
+def test_search_results_page_http_backend_does_not_use_browser(stand_in_server):
+    # No driver at all: the http backend must not touch the browser
+    search_results_page = SearchResultsPage(None, search_backend="http", base_url=stand_in_server.base_url)
+
+    urls = search_results_page.search_item_by_name_under_price("pants", 200, limit=2)
+
+    assert urls == ["https://www.ebay.com/itm/222222222222?hash=def", f"{stand_in_server.base_url}/itm/333333333333"]
+
+
+@pytest.mark.parametrize("price_screening, expected", [
+    ("price", ["222222222222", "666666666666", "333333333333"]),
+    ("price+shipping", ["666666666666", "333333333333"]),
+])
+def test_price_screening_skips_and_ranks_cards_by_shown_prices(stand_in_server, price_screening, expected):
+    search_results_page = SearchResultsPage(None, search_backend="http", base_url=stand_in_server.base_url,
+                                            price_screening=price_screening)
+
+    urls = search_results_page.search_item_by_name_under_price("pants", 50, limit=3)
+
+    assert [url.split("/itm/")[1].split("?")[0] for url in urls] == expected
+    assert search_results_page.budget_screen.screened == 5
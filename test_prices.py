@@ -0,0 +1,65 @@
+import pytest
+
+from prices import BudgetScreen, parse_price, parse_price_range, parse_shipping
+from product_page import PriceAboveBudget, ProductPage
+
+
+def test_prices_ranges_and_shipping_are_parsed_with_their_currency():
+    assert parse_price("US $1,045.50") == ("USD", 1045.5)
+    assert parse_price("C $10") == ("CAD", 10.0)
+    assert parse_price_range("ILS 30.00 to ILS 55.00") == ("ILS", 30.0, 55.0)
+    assert parse_price_range("ILS 30.00 to USD 55.00") is None
+    assert parse_shipping("+ILS 12.50 delivery") == ("ILS", 12.5)
+    assert parse_shipping("Free delivery") == ("", 0.0)
+    assert parse_shipping("Shipping not specified") is None
+
+
+def test_cheapest_cards_go_first_when_the_total_budget_is_at_risk():
+    def card(name, price):
+        return {"url": name, "price": price, "shipping": ""}
+
+    screen = BudgetScreen(50, total_budget=100)
+    cards = [card("range", "ILS 40.00 to ILS 90.00"), card("dear", "ILS 48.00"), card("cheap", "ILS 20.00"),
+             card("euro", "EUR 10.00"), card("over", "ILS 51.00")]
+    accepted = [item for item in cards if screen.accept(item)]
+
+    assert [item["url"] for item in screen.rank(accepted)] == ["dear", "cheap", "range", "euro"]
+    # dear + cheap fit, but range could cost 90 alone: with three slots the cheapest lead
+    assert [item["url"] for item in screen.rank(accepted, slots=3)] == ["cheap", "dear", "range", "euro"]
+    assert [item["url"] for item in screen.rejected] == ["over"]
+
+
+def test_budget_currency_is_the_most_common_among_the_cards():
+    def card(name, price):
+        return {"url": name, "price": price, "shipping": ""}
+
+    screen = BudgetScreen(50)
+    cards = [card("usd", "USD 45.00"), card("dear", "ILS 70.00"), card("ils", "ILS 40.00"), card("cheap", "ILS 20.00")]
+    accepted = [item for item in cards if screen.accept(item)]
+
+    # Accepted while its currency was not yet known to be the budget's
+    assert "dear" in [item["url"] for item in accepted]
+    assert screen.budget_currency == "ILS"
+    assert [item["url"] for item in screen.rank(accepted)] == ["ils", "cheap", "usd"]
+    assert [item["url"] for item in screen.rejected] == ["dear"]
+    assert BudgetScreen(50, currency="USD").budget_currency == "USD"
+
+
+@pytest.mark.parametrize("price, shipping, over", [
+    ("ILS 60.00", "Free delivery", True),
+    ("ILS 45.00", "ILS 10.00 delivery", True),
+    ("ILS 45.00", None, False),
+    ("US $60.00", None, False),
+])
+def test_product_price_is_confirmed_with_shipping_in_the_budget_currency(price, shipping, over):
+    class StubDriver:
+        def execute_script(self, script, *selectors):
+            return [price, shipping]
+
+    page = ProductPage(StubDriver(), "https://www.ebay.com/itm/1", max_price=50, include_shipping=True,
+                       currency="ILS")
+    if over:
+        with pytest.raises(PriceAboveBudget):
+            page._confirm_price()
+    else:
+        page._confirm_price()
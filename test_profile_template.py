@@ -0,0 +1,39 @@
+import json
+import os
+import shutil
+import time
+
+from profile_template import ProfileTemplate, clone_profile
+
+
+def make_template(tmp_path, base_url="https://www.ebay.com", block_resources=("images",), age=0):
+    template_dir = tmp_path / "template"
+    (template_dir / "Default" / "Cache").mkdir(parents=True)
+    (template_dir / "Default" / "Cache" / "data_0").write_text("cached")
+    (template_dir / "SingletonLock").write_text("host-1234")
+    (template_dir / "template.json").write_text(json.dumps(
+        {"base_url": base_url, "block_resources": sorted(block_resources), "built": time.time() - age}))
+    return str(template_dir)
+
+
+def test_clone_is_a_separate_copy_without_locks(tmp_path):
+    template_dir = make_template(tmp_path)
+
+    profile_dir = clone_profile(template_dir)
+    with open(os.path.join(profile_dir, "Default", "Cache", "data_0"), "a") as f:
+        f.write(" and changed")
+
+    assert not os.path.lexists(os.path.join(profile_dir, "SingletonLock"))
+    assert open(os.path.join(template_dir, "Default", "Cache", "data_0")).read() == "cached"
+    shutil.rmtree(os.path.dirname(profile_dir))
+
+
+def test_template_is_rebuilt_for_another_site_profile_or_age(tmp_path):
+    template = ProfileTemplate(make_template(tmp_path, age=120), max_age_seconds=60)
+    assert not template.is_fresh("https://www.ebay.com", ["images"])
+
+    template.max_age_seconds = 600
+    assert template.is_fresh("https://www.ebay.com", ["images"])
+    assert not template.is_fresh("http://127.0.0.1:8000", ["images"])
+    assert not template.is_fresh("https://www.ebay.com", ["images", "fonts"])
+    assert not ProfileTemplate(str(tmp_path / "missing")).is_fresh("https://www.ebay.com")
@@ -0,0 +1,198 @@
+import time
+
+import allure
+import pytest
+import requests
+
+from base_page import BasePage, set_base_url
+from conftest import SAVED_PAGES_DIR
+from cart_page import CartPage
+from driver_factory import blocked_url_patterns, create_driver
+from product_page import VARIANT_CACHE, ProductPage
+from prefetch import TabPrefetcher
+from replay import Recorder, ReplayServer
+from search_results_page import SearchResultsPage
+from timeline import Timeline
+
+@pytest.fixture
+def replay_base_url(replay_server):
+    """Points the page objects at the replay server for one test."""
+    original = BasePage.BASE_URL
+    set_base_url(replay_server.base_url)
+    yield replay_server.base_url
+    set_base_url(original)
+
+
+def test_replayed_pages_are_rebased_and_scriptless(replay_server):
+    body = requests.get(f"{replay_server.base_url}/").text
+
+    assert "globalheader.js" not in body
+    assert "window.analytics" not in body
+    assert f'action="{replay_server.base_url}/sch/i.html"' in body
+    assert f'href="{replay_server.base_url}/_host/cart.ebay.com"' in body
+    assert "/_replay/minicart" in body
+
+
+def test_search_request_picks_recorded_result_page(replay_server):
+    first = requests.get(f"{replay_server.base_url}/sch/i.html", params={"_nkw": "pants"}).text
+    second = requests.get(f"{replay_server.base_url}/sch/i.html",
+                          params={"_nkw": "pants", "_udhi": "200", "_pgn": "2"}).text
+    missing = requests.get(f"{replay_server.base_url}/itm/999999999999")
+
+    assert "Men's Slim Chino Pants" in first
+    assert "Corduroy Pants Vintage" in second
+    assert missing.status_code == 404
+
+
+def test_simulated_cart(replay_server):
+    base_url = replay_server.base_url
+    with requests.Session() as session:
+        added = session.get(f"{base_url}/_host/cart.payments.ebay.com/sc/add",
+                            params={"item": "222222222222"}, allow_redirects=False)
+        session.get(f"{base_url}/_host/cart.payments.ebay.com/sc/add", params={"item": "333333333333"})
+        cart = session.get(f"{base_url}/_replay/cart.json").json()
+        cart_page = session.get(f"{base_url}/_host/cart.ebay.com/").text
+        session.get(f"{base_url}/_host/cart.ebay.com/remove", params={"item": "222222222222"})
+        after_remove = session.get(f"{base_url}/_replay/cart.json").json()
+
+    assert added.status_code == 302
+    assert added.headers["Location"] == "/_host/cart.ebay.com/"
+    assert (cart["count"], cart["total"], cart["currency"]) == (2, 75.0, "ILS")
+    assert cart_page.count("data-test-id=\"cart-remove-item\"") == 2
+    assert [item["id"] for item in after_remove["items"]] == ["333333333333"]
+
+
+def test_latency_is_added_to_every_response():
+    with ReplayServer(SAVED_PAGES_DIR, latency_ms=100) as server:
+        start = time.monotonic()
+        requests.get(f"{server.base_url}/")
+        elapsed = time.monotonic() - start
+
+    assert elapsed >= 0.1
+
+
+def test_recording_replays(tmp_path):
+    recorder = Recorder(str(tmp_path), download_assets=False)
+    recorder.record_page("https://www.ebay.com/itm/Some-Title/777777777777?hash=x",
+                         "<html><body><a href='https://www.ebay.com/'>Home</a></body></html>",
+                         title="Some Title", price="ILS 1,250.00")
+    recorder.save()
+
+    with ReplayServer(str(tmp_path)) as server:
+        body = requests.get(f"{server.base_url}/itm/Some-Title/777777777777").text
+        requests.get(f"{server.base_url}/_host/cart.payments.ebay.com/sc/add", params={"item": "777777777777"})
+        cart = requests.get(f"{server.base_url}/_replay/cart.json").json()
+
+    assert f"href='{server.base_url}/'" in body
+    assert cart["total"] == 1250.0
+
+
+def test_blocking_profiles_combine_without_duplicates():
+    patterns = blocked_url_patterns(["images", "fonts", "images"])
+
+    assert "*i.ebayimg.com/*" in patterns and "*.woff*" in patterns
+    assert len(patterns) == len(set(patterns))
+    with pytest.raises(ValueError):
+        blocked_url_patterns(["stylesheets"])
+
+
+# (blocked resources, page load strategy) the benchmark compares
+LOAD_PROFILES = {
+    "default": ((), "normal"),
+    "lean": (("images", "media", "fonts", "ads"), "eager"),
+}
+
+
+@pytest.fixture(params=list(LOAD_PROFILES))
+def browser(request, monkeypatch):
+    """A headless Chrome per load profile, the benchmark is skipped where Chrome is not available."""
+    monkeypatch.setenv("HEADLESS", "True")
+    try:
+        driver = create_driver(*LOAD_PROFILES[request.param])
+    except Exception as e:
+        pytest.skip(f"Chrome is not available: {e}")
+    yield driver
+    driver.quit()
+
+
+def test_page_objects_replay_benchmark(request, browser, replay_base_url):
+    timings = {}
+    timeline = Timeline()
+    timeline.instrument(browser)
+
+    start = time.monotonic()
+    item_urls = SearchResultsPage(browser).search_item_by_name_under_price("pants", 200, limit=2)
+    timings["search and filter"] = time.monotonic() - start
+
+    for index, url in enumerate(item_urls, start=1):
+        start = time.monotonic()
+        ProductPage(browser, url).add_item_to_cart(index)
+        timings[f"add item {index}"] = time.monotonic() - start
+
+    cart_page = CartPage(browser)
+    start = time.monotonic()
+    cart = cart_page.read_cart(added_items=len(item_urls))
+    timings["read cart"] = time.monotonic() - start
+    start = time.monotonic()
+    flyout_total = cart_page.get_cart_total()
+    timings["get cart total (flyout)"] = time.monotonic() - start
+    start = time.monotonic()
+    removed = cart_page.clear_cart()
+    timings["clear cart"] = time.monotonic() - start
+
+    Timeline.uninstrument(browser)
+    request.node.user_properties.append(("load_profile", browser.load_profile))
+    request.node.user_properties.append(("webdriver_commands", timeline.commands_by_step()))
+    for name, seconds in timings.items():
+        request.node.user_properties.append((name, round(seconds, 3)))
+    allure.attach("\n".join(f"{name}: {seconds:.2f}s" for name, seconds in timings.items()),
+                  name="Replay Benchmark")
+    assert item_urls == [f"{replay_base_url}/itm/222222222222?hash=def", f"{replay_base_url}/itm/333333333333"]
+    assert [(item["id"], item["quantity"], item["unit_price"]) for item in cart.items] == \
+        [("222222222222", 1, 45.0), ("333333333333", 1, 30.0)]
+    assert cart.total == flyout_total == 75.0
+    # The price filter is filled and submitted with a single command
+    assert timeline.commands_by_step()["filter by max price"] == 1
+    # Size 30 is out of stock on the first listing
+    assert VARIANT_CACHE.get("222222222222") == ["32", "Khaki"]
+    assert removed == 2
+
+
+def test_result_pages_are_told_apart_by_their_query():
+    class StubDriver:
+        current_url = "https://www.ebay.com/sch/i.html?_nkw=pants&_udhi=200"
+
+        def get(self, url):
+            self.current_url = url
+
+    driver = StubDriver()
+    page = BasePage(driver)
+    next_page = "https://www.ebay.com/sch/i.html?_nkw=pants&_udhi=200&_pgn=2"
+
+    assert not page.open(next_page)
+    assert page.open(next_page, compare_query=True)
+    assert driver.current_url == next_page
+    assert not page.open(next_page, compare_query=True)
+
+
+def test_browser_search_continues_on_the_next_result_page(browser, replay_base_url):
+    item_urls = SearchResultsPage(browser).search_item_by_name_under_price("pants", 200, limit=4)
+
+    assert len(item_urls) == 4
+    assert item_urls[-1] == f"{replay_base_url}/itm/555555555555"
+
+
+def test_prefetched_product_tabs_replay(browser, replay_server, replay_base_url):
+    item_urls = [f"{replay_base_url}/itm/{item_id}" for item_id in ("222222222222", "333333333333", "444444444444")]
+    browser.get(replay_base_url)
+    prefetcher = TabPrefetcher(browser, item_urls, depth=2)
+
+    for index, url in enumerate(item_urls):
+        prefetcher.activate(index)
+        assert len(browser.window_handles) <= 1 + 1 + prefetcher.depth
+        ProductPage(browser, url).add_item_to_cart(index + 1)
+        prefetcher.finish(index)
+
+    assert browser.window_handles == [prefetcher.main_handle]
+    assert prefetcher.stats["items"] == 3
+    assert replay_server.cart_summary()["count"] == 3
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from scenarios import ScenarioDurations, load_scenarios, shard_scenarios
+
+
+def make_scenarios(*pairs):
+    return [{"name": name, "search_term": name, "max_price": "100", "item_limit": 1, "account": account}
+            for name, account in pairs]
+
+
+def durations_file(tmp_path, durations):
+    path = tmp_path / "durations.json"
+    path.write_text(json.dumps(durations))
+    return ScenarioDurations(str(path))
+
+
+def test_single_scenario_data_is_still_accepted():
+    scenarios = load_scenarios({"search_term": "pants", "max_price": "200", "item_limit": 2,
+                                "username": "user@example.com", "password": "secret"})
+
+    assert scenarios == [{"search_term": "pants", "max_price": "200", "item_limit": 2, "account": "default",
+                          "name": "pants", "username": "user@example.com", "password": "secret"}]
+
+
+def test_scenarios_take_credentials_from_their_account():
+    data = {"accounts": {"a": {"username": "a@example.com", "password": "pa"}},
+            "scenarios": make_scenarios(("pants", "a"))}
+
+    assert load_scenarios(data)[0]["username"] == "a@example.com"
+    with pytest.raises(ValueError):
+        load_scenarios({"accounts": {}, "scenarios": make_scenarios(("pants", "missing"))})
+    with pytest.raises(ValueError):
+        load_scenarios({"accounts": {"a": {"username": "a@example.com", "password": ""}},
+                        "scenarios": make_scenarios(("pants", "a"))})
+
+
+def test_shards_are_balanced_by_duration_and_keep_accounts_together(tmp_path):
+    scenarios = make_scenarios(("pants", "a"), ("shirts", "a"), ("shoes", "b"), ("hats", "c"), ("socks", "d"))
+    durations = durations_file(tmp_path, {"pants": 50, "shirts": 40, "shoes": 80, "hats": 30, "socks": 20})
+
+    shards = shard_scenarios(scenarios, 2, durations)
+
+    assert [[s["name"] for s in shard] for shard in shards] == [["pants", "shirts", "socks"], ["shoes", "hats"]]
+
+
+def test_durations_are_smoothed_and_merged_with_other_shards(tmp_path):
+    durations = durations_file(tmp_path, {"pants": 40})
+    other_shard = ScenarioDurations(durations.file_path)
+    other_shard.record("shoes", 90)
+    other_shard.save()
+
+    durations.record("pants", 60)
+    durations.save()
+
+    assert ScenarioDurations(durations.file_path).durations == {"pants": 50, "shoes": 90}
+    assert durations.get("never ran") == 40
@@ -0,0 +1,120 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+
+from base_page import BasePage
+from product_page import ProductPage
+from scheduler import ItemAlreadyAdded, ItemScheduler
+
+
+class FakeDriver:
+    def __init__(self):
+        self.timeouts = SimpleNamespace(page_load=300, implicit_wait=2)
+        self.page_load_timeouts = []
+
+    def set_page_load_timeout(self, seconds):
+        self.page_load_timeouts.append(seconds)
+
+    def implicitly_wait(self, seconds):
+        self.timeouts.implicit_wait = seconds
+
+    def find_element(self, by, value):
+        # Like a browser, a missing element is only reported once the implicit wait is over
+        time.sleep(self.timeouts.implicit_wait)
+        raise NoSuchElementException(value)
+
+
+def test_transient_failures_are_retried_and_broken_items_replaced():
+    driver = FakeDriver()
+    calls = []
+
+    def add_item(index, url, attempt):
+        calls.append((url, attempt))
+        if url == "stale" and attempt == 1:
+            raise StaleElementReferenceException("re-rendered")
+        if url == "broken":
+            raise ValueError("no add to cart button")
+
+    scheduler = ItemScheduler(driver, ["stale", "broken", "spare", "unused"], target=2, backoff_seconds=0.01)
+    scheduler.run(add_item)
+
+    assert calls == [("stale", 1), ("stale", 2), ("broken", 1), ("spare", 1)]
+    assert [record["outcome"] for record in scheduler.records] == ["retried", "failed", "success"]
+    assert scheduler.added == ["stale", "spare"]
+    assert driver.page_load_timeouts[-1] == 300
+    summary = scheduler.format_summary()
+    assert "Added 2/2 items" in summary and "replaced: 1 items" in summary
+
+
+def test_item_that_may_be_in_the_cart_is_neither_retried_nor_replaced():
+    driver = FakeDriver()
+    calls = []
+
+    def add_item(index, url, attempt):
+        calls.append((url, attempt))
+        raise ItemAlreadyAdded("cart did not load after adding")
+
+    scheduler = ItemScheduler(driver, ["added", "spare"], target=1, backoff_seconds=0.01)
+    with pytest.raises(ItemAlreadyAdded):
+        scheduler.run(add_item)
+
+    assert calls == [("added", 1)]
+    assert [record["outcome"] for record in scheduler.records] == ["failed"]
+    assert driver.page_load_timeouts[-1] == 300
+
+
+def test_waits_stop_at_the_item_deadline():
+    driver = FakeDriver()
+    page = BasePage(driver)
+
+    def add_item(index, url, attempt):
+        assert page.wait_timeout(30) <= 0.2
+        if url == "slow":
+            time.sleep(0.25)
+            page.wait_timeout()
+
+    scheduler = ItemScheduler(driver, ["slow", "fast"], target=1, item_timeout=0.2)
+    scheduler.run(add_item)
+
+    assert [(record["url"], record["outcome"], record["attempts"]) for record in scheduler.records] == \
+        [("slow", "timed out", 1), ("fast", "success", 1)]
+    assert scheduler.records[0]["error"].startswith("DeadlineExceeded")
+    # Outside the scheduler waits are not cut short
+    assert page.wait_timeout() == BasePage.DEFAULT_TIMEOUT
+
+
+def test_implicit_wait_does_not_outlast_the_item_deadline():
+    driver = FakeDriver()
+    page = BasePage(driver)
+
+    def add_item(index, url, attempt):
+        page.wait_for("missing element", EC.presence_of_element_located((By.ID, "missing")))
+
+    scheduler = ItemScheduler(driver, ["missing"], target=1, item_timeout=0.3)
+    scheduler.run(add_item)
+
+    assert scheduler.records[0]["outcome"] == "timed out"
+    assert scheduler.records[0]["seconds"] < 1
+    assert driver.timeouts.implicit_wait == 2
+
+
+def test_added_item_is_not_failed_by_requests_that_never_finish():
+    page = ProductPage(FakeDriver(), "https://www.ebay.com/itm/1")
+    page.driver.current_url = page.URL
+
+    def click_add_to_cart():
+        page.add_clicked = True
+
+    def busy_network():
+        raise TimeoutException("Requests were still pending when the timeout expired")
+
+    page._select_variants = lambda: None
+    page._click_add_to_cart_button = click_add_to_cart
+    page.wait_for_network_idle = busy_network
+    page.add_item_to_cart(1)
+
+    assert page.add_clicked
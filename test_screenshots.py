@@ -0,0 +1,114 @@
+import io
+import os
+from types import SimpleNamespace
+
+import allure_commons
+import pytest
+from allure_commons import plugin_manager
+
+import screenshots
+from screenshots import ScreenshotService
+
+
+class FakeAllure:
+    """
+    Stands in for the Allure reporter, keeps what was registered and written.
+    """
+
+    def __init__(self, register=True):
+        self.allure_logger = self if register else SimpleNamespace()
+        self.registered = []
+        self.written = {}
+
+    def _attach(self, uuid, name=None, attachment_type=None, extension=None):
+        file_name = f"{uuid}-attachment.{extension}"
+        self.registered.append((name, file_name))
+        return file_name
+
+    @allure_commons.hookimpl
+    def report_attached_data(self, body, file_name):
+        self.written[file_name] = body
+
+    @allure_commons.hookimpl
+    def attach_data(self, body, name, attachment_type, extension):
+        self.registered.append((name, None))
+        self.written[name] = body
+
+
+@pytest.fixture
+def allure_results():
+    fake = FakeAllure()
+    plugin_manager.register(fake)
+    yield fake
+    plugin_manager.unregister(fake)
+
+
+def test_success_screenshots_are_sampled_and_failures_always_kept(allure_results):
+    with ScreenshotService(image_format="PNG", max_width=0, every_nth_success=2) as service:
+        kept = [service.submit(b"success 1", "s1"), service.submit(b"success 2", "s2"),
+                service.submit(b"failure", "f1", failure=True)]
+
+    assert kept == [False, True, True]
+    assert [name for name, _ in allure_results.registered] == ["s2.png", "f1.png"]
+    assert service.stats["sampled_out"] == 1
+
+
+def test_identical_screenshots_are_attached_once(allure_results):
+    with ScreenshotService(image_format="PNG", max_width=0) as service:
+        assert service.submit(b"same frame", "first")
+        assert not service.submit(b"same frame", "second", failure=True)
+
+    assert [name for name, _ in allure_results.registered] == ["first.png"]
+    assert service.stats["duplicates"] == 1
+
+
+@pytest.mark.parametrize("image_format", ["JPEG", "WEBP"])
+def test_wide_screenshot_is_downscaled_and_compressed(allure_results, image_format):
+    Image = pytest.importorskip("PIL.Image")
+    captured = io.BytesIO()
+    Image.frombytes("RGB", (2000, 400), os.urandom(2000 * 400 * 3)).save(captured, format="PNG")
+    png = captured.getvalue()
+
+    with ScreenshotService(image_format=image_format, quality=70, max_width=1280) as service:
+        service.submit(png, "wide")
+
+    (name, file_name), = allure_results.registered
+    written = allure_results.written[file_name]
+    image = Image.open(io.BytesIO(written))
+    assert name == f"wide.{screenshots.FORMATS[image_format][1]}"
+    assert (image.format, image.size) == (image_format, (1280, 256))
+    assert len(written) < len(png)
+    assert service.stats["written_bytes"] == len(written)
+
+
+def test_screenshot_that_cannot_be_encoded_is_written_as_captured(allure_results, monkeypatch):
+    # Pillow that fails on every image
+    monkeypatch.setattr(screenshots, "Image", SimpleNamespace(open=lambda data: 1 / 0))
+    with ScreenshotService(image_format="JPEG") as service:
+        service.submit(b"not a png", "broken")
+
+    assert list(allure_results.written.values()) == [b"not a png"]
+
+
+def test_close_writes_every_queued_screenshot(allure_results):
+    service = ScreenshotService(image_format="PNG", max_width=0)
+    for index in range(20):
+        service.submit(f"frame {index}".encode(), f"item{index}")
+    service.close()
+
+    assert len(allure_results.written) == 20
+    assert all(allure_results.written[file_name] == f"frame {index}".encode()
+               for index, (_, file_name) in enumerate(allure_results.registered))
+    assert service.stats["written_bytes"] == sum(len(body) for body in allure_results.written.values())
+
+
+def test_reporter_without_attach_split_gets_a_synchronous_attachment():
+    fake = FakeAllure(register=False)
+    plugin_manager.register(fake)
+    try:
+        with ScreenshotService(image_format="PNG", max_width=0) as service:
+            service.submit(b"frame", "item1")
+    finally:
+        plugin_manager.unregister(fake)
+
+    assert fake.written == {"item1.png": b"frame"}
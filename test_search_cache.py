@@ -0,0 +1,58 @@
+import json
+
+from search_cache import SearchCache
+
+
+def make_cache(tmp_path, **kwargs):
+    return SearchCache(str(tmp_path / "search_cache.json"), check_liveness=False, **kwargs)
+
+
+def test_cached_search_is_reused_until_it_expires(tmp_path):
+    cache = make_cache(tmp_path, ttl_seconds=60)
+    key = cache.key("https://www.ebay.com/", " Pants", "200", 2)
+    assert cache.get(key) is None
+
+    cache.put(key, ["https://www.ebay.com/itm/1", "https://www.ebay.com/itm/2"])
+    assert cache.get(cache.key("https://www.ebay.com", "pants", 200.0, 2)) == ["https://www.ebay.com/itm/1",
+                                                                               "https://www.ebay.com/itm/2"]
+
+    entries = json.loads(open(cache.cache_file).read())
+    entries[key]["created"] -= 61
+    with open(cache.cache_file, "w") as f:
+        json.dump(entries, f)
+    assert cache.get(key) is None
+    assert cache.stats == {"hits": 1, "misses": 2, "expired": 1, "dead_listings": 0, "bypassed": 0}
+
+
+def test_least_recently_used_search_is_evicted(tmp_path):
+    cache = make_cache(tmp_path, max_entries=2)
+    cache.put("pants", ["a"])
+    cache.put("shirts", ["b"])
+    cache.get("pants")
+    cache.put("shoes", ["c"])
+
+    assert cache.get("shirts") is None
+    assert cache.get("pants") == ["a"]
+    assert cache.get("shoes") == ["c"]
+
+
+def test_bypass_searches_again_but_still_refreshes(tmp_path):
+    make_cache(tmp_path).put("pants", ["a"])
+    cache = make_cache(tmp_path, bypass=True)
+
+    assert cache.get("pants") is None
+    cache.put("pants", ["b"])
+    assert make_cache(tmp_path).get("pants") == ["b"]
+    assert cache.stats["bypassed"] == 1
+
+
+def test_search_with_a_gone_listing_is_not_reused(tmp_path, replay_server):
+    cache = SearchCache(str(tmp_path / "search_cache.json"))
+    live = [replay_server.base_url + "/itm/222222222222", replay_server.base_url + "/itm/333333333333"]
+    cache.put("pants", live)
+    cache.put("shirts", live + [replay_server.base_url + "/itm/999999999999"])
+
+    assert cache.get("pants") == live
+    assert cache.get("shirts") is None
+    assert cache.stats["dead_listings"] == 1
+    assert replay_server.cart_summary()["count"] == 0
@@ -0,0 +1,213 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Browser-side navigation timing of the current document, in milliseconds from navigation start
+_NAVIGATION_TIMING_SCRIPT = """
+var entry = performance.getEntriesByType('navigation')[0];
+if (!entry) { return null; }
+return {
+    url: entry.name,
+    dns: entry.domainLookupEnd - entry.domainLookupStart,
+    connect: entry.connectEnd - entry.connectStart,
+    ttfb: entry.responseStart - entry.startTime,
+    response: entry.responseEnd - entry.responseStart,
+    dom_interactive: entry.domInteractive,
+    dom_content_loaded: entry.domContentLoadedEventEnd,
+    load: entry.loadEventEnd,
+    transfer_size: entry.transferSize,
+    resources: performance.getEntriesByType('resource').length
+};
+"""
+
+# Chrome performance metrics worth keeping from Performance.getMetrics
+_CDP_METRICS = ("Nodes", "JSHeapUsedSize", "LayoutCount", "RecalcStyleCount", "ScriptDuration", "TaskDuration")
+
+
+class Timeline:
+    """
+    Nested timeline of the steps of a run, with the WebDriver commands each step issued.
+
+    Spans nest per thread; the driver's commands are counted on every open span.
+    """
+
+    def __init__(self, budgets=None):
+        """
+        Args:
+            budgets: Optional {span name: max seconds}, spans over budget are listed in budget_violations
+        """
+        self.budgets = budgets or {}
+        self.budget_violations = []
+        self.command_counts = {}
+        self._start = time.monotonic()
+        self.root = self._new_span("run", "run")
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _new_span(self, name, kind, **details):
+        return {"name": name, "kind": kind, "start": round(time.monotonic() - self._start, 4),
+                "duration": None, "commands": 0, "details": details, "children": []}
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = [self.root]
+        return self._local.stack
+
+    @contextmanager
+    def span(self, name, kind="step", **details):
+        """
+        Records a (possibly nested) step of the run.
+
+        Args:
+            name: Step name, also the key looked up in budgets
+            kind: Category, e.g. "click", "wait", "navigate", "script", "step"
+            details: Extra values stored with the span (locator, URL, ...)
+        """
+        stack = self._stack()
+        node = self._new_span(name, kind, **{k: str(v) for k, v in details.items()})
+        with self._lock:
+            stack[-1]["children"].append(node)
+        stack.append(node)
+        start = time.monotonic()
+        try:
+            yield node
+        finally:
+            node["duration"] = round(time.monotonic() - start, 4)
+            stack.pop()
+            budget = self.budgets.get(name)
+            if budget is not None and node["duration"] > budget:
+                self.budget_violations.append(f"'{name}' took {node['duration']:.2f}s, budget is {budget:.2f}s")
+
+    def count_command(self, command):
+        """
+        Counts one WebDriver command on every open span of the calling thread.
+        """
+        with self._lock:
+            self.command_counts[command] = self.command_counts.get(command, 0) + 1
+            for node in self._stack():
+                node["commands"] += 1
+
+    def instrument(self, driver):
+        """
+        Attaches the timeline to a driver and counts every command it sends.
+        """
+        original_execute = driver.execute
+
+        @functools.wraps(original_execute)
+        def counting_execute(driver_command, params=None):
+            self.count_command(driver_command)
+            return original_execute(driver_command, params)
+
+        # Whatever wrapped execute before (e.g. a replay Recorder) is put back by uninstrument()
+        counting_execute.previous = driver.__dict__.get("execute")
+        driver.execute = counting_execute
+        driver._timeline = self
+
+    @staticmethod
+    def uninstrument(driver):
+        """
+        Restores a driver instrumented by instrument().
+        """
+        execute = driver.__dict__.pop("execute", None)
+        previous = getattr(execute, "previous", None)
+        if previous is not None:
+            driver.execute = previous
+        driver.__dict__.pop("_timeline", None)
+
+    def record_browser_metrics(self, driver, label):
+        """
+        Stores navigation timing and Chrome performance metrics of the current page on the open span.
+        """
+        metrics = {"label": label}
+        try:
+            metrics["navigation"] = driver.execute_script(_NAVIGATION_TIMING_SCRIPT)
+        except Exception as e:
+            print(f"Could not read navigation timing: {e}")
+        if hasattr(driver, "execute_cdp_cmd"):
+            try:
+                driver.execute_cdp_cmd("Performance.enable", {})
+                values = driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]
+                metrics["chrome"] = {m["name"]: m["value"] for m in values if m["name"] in _CDP_METRICS}
+            except Exception as e:
+                print(f"Could not read Chrome performance metrics: {e}")
+        self._stack()[-1].setdefault("browser_metrics", []).append(metrics)
+
+    def commands_by_step(self):
+        """
+        Total WebDriver commands per span name, summed over every occurrence of that span.
+        """
+        totals = {}
+        pending = list(self.root["children"])
+        while pending:
+            node = pending.pop()
+            totals[node["name"]] = totals.get(node["name"], 0) + node["commands"]
+            pending.extend(node["children"])
+        return totals
+
+    def format_command_counts(self, steps=()):
+        """
+        Formats the run's WebDriver command count, overall and for the given steps, as a human readable report.
+        """
+        by_step = self.commands_by_step()
+        lines = [f"Total: {sum(self.command_counts.values())}"]
+        lines += [f"{step}: {by_step[step]}" for step in steps if step in by_step]
+        lines += ["By command:"] + [f"  {command}: {count}" for command, count in
+                  sorted(self.command_counts.items(), key=lambda pair: -pair[1])]
+        return "\n".join(lines)
+
+    def to_dict(self):
+        self.root["duration"] = round(time.monotonic() - self._start, 4)
+        return {"timeline": self.root, "command_counts": self.command_counts,
+                "budget_violations": self.budget_violations}
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
+
+    def save(self, directory, name):
+        """
+        Writes the timeline as JSON and returns the file path.
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{name}.json")
+        with open(path, 'w') as f:
+            f.write(self.to_json())
+        return path
+
+
+class _NullTimeline:
+    """
+    Stand-in used when a driver is not instrumented, every call is a no-op.
+    """
+
+    @contextmanager
+    def span(self, name, kind="step", **details):
+        yield None
+
+    def record_browser_metrics(self, driver, label):
+        pass
+
+
+NULL_TIMELINE = _NullTimeline()
+
+
+def timeline_of(driver):
+    """
+    Returns the Timeline attached to a driver, or a no-op timeline.
+    """
+    return getattr(driver, "_timeline", None) or NULL_TIMELINE
+
+
+def traced(name):
+    """
+    Decorator for page object methods: records the call as a span on the page's driver timeline.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with timeline_of(self.driver).span(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator